@@ -1,30 +1,39 @@
+import argparse
+import base64
+import concurrent.futures
+import dataclasses
+import functools
+import glob
+import html
+import importlib
 import json
+import os
+import re
+import shutil
 import sys
+import tempfile
+import unicodedata
+import zlib
+from collections.abc import Mapping
+from dataclasses import dataclass
 from pathlib import Path #
+from typing import Optional
 
-def create_html_quiz_page(quiz_data): #
-    """
-    Generates a single HTML page string for an interactive quiz based on the provided quiz_data.
-    """ #
-    if not isinstance(quiz_data, dict): #
-        raise ValueError("Quiz data must be a dictionary (keyed by exam number string)") #
-    
-    if not quiz_data: 
-        raise ValueError("Quiz data dictionary is empty")
-
-    try: #
-        quiz_data_embedded_json = json.dumps(quiz_data, ensure_ascii=False, indent=None) 
-    except (TypeError, ValueError) as e: #
-        raise ValueError(f"Cannot serialize quiz data to JSON: {e}") #
+import quiz_minify
+from quiz_cache import BuildCache, content_hash, hash_file, parse_size
+from quiz_profile import NULL_PROFILE, BuildProfile
 
-    html_content = f"""<!DOCTYPE html>
+# The page template is plain text with %%SLOT%% markers; it is split once at
+# import so rendering only has to stream the static parts and fill the slots
+# (render_page also reuses them pre-encoded, see _TEMPLATE_SEGMENTS).
+_PAGE_TEMPLATE = """<!DOCTYPE html>
 <html lang="zh-TW">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>金融科技力知識檢定測驗 (完整版 - 隨機出題)</title>
     <style>
-        body {{
+        body {
             font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
             line-height: 1.6;
             margin: 0;
@@ -34,37 +43,37 @@ def create_html_quiz_page(quiz_data): #
             display: flex;
             flex-direction: column;
             align-items: center;
-        }}
+        }
         
-        #quiz-container {{
+        #quiz-container {
             background: #fff;
             padding: 25px;
             border-radius: 8px;
             box-shadow: 0 0 15px rgba(0,0,0,0.1);
             width: 100%;
             max-width: 800px;
-        }}
+        }
         
-        h1, h2, h3 {{
+        h1, h2, h3 {
             color: #333;
             text-align: center;
-        }}
+        }
         
-        h1 {{
+        h1 {
             font-size: 1.8em;
             margin-bottom: 15px;
-        }}
+        }
         
-        h2 {{
+        h2 {
             font-size: 1.5em;
             margin-bottom: 10px;
-        }}
+        }
         
-        #exam-selection, #question-area, #results-area {{
+        #exam-selection, #question-area, #results-area {
             margin-top: 20px;
-        }}
+        }
         
-        #exam-selector {{
+        #exam-selector {
             display: block;
             width: 100%;
             padding: 12px;
@@ -73,9 +82,9 @@ def create_html_quiz_page(quiz_data): #
             border-radius: 4px;
             box-sizing: border-box;
             font-size: 1em;
-        }}
+        }
         
-        button {{
+        button {
             display: block;
             width: 100%;
             padding: 12px 18px;
@@ -87,24 +96,24 @@ def create_html_quiz_page(quiz_data): #
             font-size: 1.1em;
             transition: background-color 0.3s ease;
             margin-top: 10px;
-        }}
+        }
         
-        button:hover {{
+        button:hover {
             background-color: #0056b3;
-        }}
+        }
         
-        button:disabled {{
+        button:disabled {
             background-color: #6c757d;
             cursor: not-allowed;
-        }}
+        }
         
-        #question-text {{
+        #question-text {
             margin-bottom: 18px;
             font-size: 1.1em;
             white-space: pre-wrap;
-        }}
+        }
         
-        .option {{
+        .option {
             background: #f9f9f9;
             border: 1px solid #eee;
             padding: 12px;
@@ -113,95 +122,159 @@ def create_html_quiz_page(quiz_data): #
             cursor: pointer;
             transition: background-color 0.2s ease;
             font-size: 1em;
-        }}
+        }
         
-        .option:hover {{
+        .option:hover {
             background: #e9e9e9;
-        }}
+        }
         
-        .option.selected {{
+        .option.selected {
             background: #e7f3ff;
             border-color: #007bff;
-        }}
+        }
         
-        .option input[type="radio"] {{
+        .option input[type="radio"] {
             margin-right: 10px;
             vertical-align: middle;
-        }}
+        }
         
-        .option label {{
+        .option label {
             vertical-align: middle;
             cursor: pointer;
             display: inline-block;
             width: calc(100% - 25px);
-        }}
+        }
         
-        #feedback {{
+        #feedback {
             color: #d9534f;
             font-weight: bold;
             margin-top: 10px;
             text-align: center;
-        }}
+        }
         
-        #progress-text {{
+        #progress-text {
             text-align: center;
             margin-top: 15px;
             font-style: italic;
             color: #555;
-        }}
+        }
         
-        #score-text {{
+        #score-text {
             font-size: 1.3em;
             font-weight: bold;
             text-align: center;
             color: #007bff;
             margin-bottom: 20px;
-        }}
+        }
         
-        .review-item {{
+        .review-item {
             margin-bottom: 20px;
             padding: 15px;
             border: 1px solid #ddd;
             border-radius: 4px;
             background-color: #fdfdfd;
-        }}
+        }
         
-        .review-item p {{
+        .review-item p {
             margin: 5px 0;
-        }}
+        }
         
-        .review-question {{
+        .review-question {
             font-weight: bold;
             white-space: pre-wrap;
-        }}
+        }
         
-        .user-answer.correct {{
+        .user-answer.correct {
             color: #5cb85c;
-        }}
+        }
         
-        .user-answer.incorrect {{
+        .user-answer.incorrect {
             color: #d9534f;
-        }}
+        }
         
-        .correct-answer-text {{
+        .correct-answer-text {
             color: #3c763d;
             font-weight: bold;
-        }}
+        }
         
-        .loading {{
+        .loading {
             text-align: center;
             color: #666;
             font-style: italic;
-        }}
+        }
         
-        .error {{
+        #practice-options {
+            margin-top: 20px;
+            padding: 12px;
+            border: 1px solid #ddd;
+            border-radius: 4px;
+        }
+        
+        #practice-options summary {
+            cursor: pointer;
+            font-weight: bold;
+        }
+        
+        #practice-exam-list label, .practice-field {
+            display: block;
+            margin: 8px 0;
+        }
+        
+        .practice-field input, .practice-field select {
+            margin-left: 8px;
+            padding: 4px;
+        }
+        
+        #search-area {
+            margin-top: 20px;
+        }
+        
+        #search-input {
+            width: 100%;
+            box-sizing: border-box;
+            padding: 8px;
+            font-size: 1em;
+        }
+        
+        #search-summary {
+            color: #555;
+            font-size: 0.9em;
+        }
+        
+        .search-hit {
+            margin-bottom: 12px;
+        }
+        
+        .search-hit p {
+            margin: 4px 0;
+        }
+        
+        .search-hit-source {
+            color: #555;
+            font-size: 0.9em;
+        }
+        
+        #seed-text {
+            text-align: center;
+            color: #555;
+        }
+        
+        #abandon-quiz-btn {
+            background-color: #6c757d;
+        }
+        
+        #abandon-quiz-btn:hover {
+            background-color: #5a6268;
+        }
+        
+        .error {
             color: #d9534f;
             background-color: #f9f2f4;
             border: 1px solid #d1ecf1; 
             padding: 10px;
             border-radius: 4px;
             margin: 10px 0;
-        }}
+        }
     </style>
 </head>
 <body>
@@ -211,10 +284,31 @@ def create_html_quiz_page(quiz_data): #
         <div id="exam-selection">
             <h2>請選擇測驗：</h2>
             <select id="exam-selector">
-                <option value="">-- 選擇一個測驗 --</option>
+                <option value="">-- 選擇一個測驗 --</option>%%EXAM_OPTIONS%%
             </select>
             <button id="start-quiz-btn">開始測驗</button>
+
+            <details id="practice-options">
+                <summary>綜合練習 (跨屆隨機抽題)</summary>
+                <div id="practice-exam-list">%%PRACTICE_EXAMS%%</div>
+                <label class="practice-field">題數<input type="number" id="practice-count" min="1" value="20"></label>
+                <label class="practice-field">分層抽樣<select id="practice-stratify">
+                    <option value="">不分層</option>
+                    <option value="exam">依屆別 (各屆按題數比例)</option>
+                    <option value="band">依題號區段 (第1-40題 / 第41-60題)</option>
+                </select></label>
+                <label class="practice-field" id="practice-duplicates-field" hidden><input type="checkbox" id="practice-avoid-duplicates" checked>近似題只抽一題</label>
+                <label class="practice-field">亂數種子<input type="text" id="practice-seed" placeholder="留空則自動產生"></label>
+                <button id="start-practice-btn">開始綜合練習</button>
+            </details>
+
+            <div id="search-area" hidden>
+                <input type="search" id="search-input" placeholder="搜尋題庫 (例如：開放銀行、API)">
+                <p id="search-summary"></p>
+                <ol id="search-results"></ol>
+            </div>
         </div>
+%%EXAM_PREVIEWS%%
 
         <div id="question-area" style="display:none;">
             <h2 id="quiz-title"></h2>
@@ -223,73 +317,197 @@ def create_html_quiz_page(quiz_data): #
             <p id="feedback" style="display:none;"></p>
             <button id="next-question-btn">下一題</button>
             <p id="progress-text"></p>
+            <button id="abandon-quiz-btn">放棄本次測驗</button>
         </div>
 
         <div id="results-area" style="display:none;">
             <h2>測驗結果</h2>
             <p id="score-text"></p>
+            <p id="seed-text"></p>
             <h3>題目回顧：</h3>
             <div id="review-area"></div>
+            <button id="export-attempts-btn">匯出作答紀錄 (JSONL)</button>
             <button id="restart-quiz-btn">返回測驗選擇</button>
         </div>
     </div>
 
+%%EXAM_CHUNKS%%
     <script>
-        const rawQuizData = {quiz_data_embedded_json};
-        let processedQuizData = {{ exams: [] }}; 
-
-        // --- Data Transformation (same as before, includes point assignment) ---
-        if (rawQuizData && typeof rawQuizData === 'object') {{
-            processedQuizData.exams = Object.keys(rawQuizData).map(examKey => {{
-                const originalExam = rawQuizData[examKey]; 
-                const examNumber = originalExam.exam_number || parseInt(examKey);
-                
-                if (!originalExam.questions || !Array.isArray(originalExam.questions)) {{
-                    console.error(`Exam "${{examKey}}" has no questions or questions are not an array.`);
-                    return null; 
-                }}
-
-                return {{
-                    exam_id: examKey,
-                    title: `第 ${{examNumber}} 屆金融科技力知識檢定測驗`,
-                    scoring_info: "第1-40題每題1.5分，第41-60題每題2分",
-                    questions: originalExam.questions.map(q => {{
-                        const questionNumber = q.question_number;
-                        let points = 1.5; 
-                        if (questionNumber >= 41 && questionNumber <= 60) {{ 
-                            points = 2.0;
-                        }}
-                        
-                        if (!q.options || typeof q.options !== 'object') {{
-                             console.error(`Question ${{questionNumber}} in exam "${{examKey}}" has invalid options.`);
-                             return {{ 
-                                id: questionNumber,
-                                text: q.question_text || "題目文字遺失",
-                                options: [],
-                                answer: parseInt(q.answer) || 0, 
-                                points: points
-                             }};
-                        }}
-
-                        return {{
-                            id: questionNumber,
-                            text: q.question_text || "題目文字遺失",
-                            options: Object.keys(q.options).map(optKey => ({{
-                                option_id: parseInt(optKey),
-                                text: q.options[optKey]
-                            }})),
-                            answer: parseInt(q.answer), 
-                            points: points 
-                        }};
-                    }}).filter(q => q && q.options && q.options.length > 0), 
-                    answer_sheet_source_id: `Exam ${{examKey}} data`
-                }};
-            }}).filter(exam => exam !== null && exam.questions && exam.questions.length > 0); 
-        }}
-        // --- End Data Transformation ---
-        
-        let currentExamData = null;
+        // Exams are normalized, scored and validated by create_quiz_page.py at build time.
+        const quizExamData = %%QUIZ_DATA%%;
+        const quizManifest = %%EXAM_MANIFEST%%;
+        const quizConfig = %%PAGE_CONFIG%%;
+        const quizSearchIndex = %%SEARCH_INDEX%%;
+        const examCache = new Map();
+
+        // --- Performance Telemetry (performance.mark/measure entries named quiz:*) ---
+        // window.quizTelemetry.metrics() returns every measure so far, summary() aggregates
+        // them by name and subscribe(callback) is called with each new one, for field telemetry.
+        const canMeasure = typeof performance !== 'undefined' && typeof performance.mark === 'function' &&
+            typeof performance.measure === 'function';
+        const telemetrySubscribers = new Set();
+        let measureSequence = 0;
+
+        function startMeasure(name) {
+            if (!canMeasure) {
+                return null;
+            }
+            const mark = `${name}#${++measureSequence}`;
+            performance.mark(mark);
+            return { name, mark };
+        }
+
+        function endMeasure(handle, detail) {
+            if (!handle) {
+                return;
+            }
+            try {
+                const entry = performance.measure(handle.name, handle.mark) ||
+                    performance.getEntriesByName(handle.name, 'measure').pop();
+                performance.clearMarks(handle.mark);
+                if (entry && telemetrySubscribers.size > 0) {
+                    const metric = { name: entry.name, startTime: entry.startTime, duration: entry.duration, detail };
+                    telemetrySubscribers.forEach(callback => {
+                        try {
+                            callback(metric);
+                        } catch (error) {
+                            console.error('quizTelemetry subscriber failed:', error);
+                        }
+                    });
+                }
+            } catch (error) {
+                // measuring must never break the quiz
+            }
+        }
+
+        function measured(name, fn, detail) {
+            const handle = startMeasure(name);
+            try {
+                return fn();
+            } finally {
+                endMeasure(handle, detail);
+            }
+        }
+
+        window.quizTelemetry = {
+            metrics() {
+                if (!canMeasure) {
+                    return [];
+                }
+                return performance.getEntriesByType('measure')
+                    .filter(entry => entry.name.startsWith('quiz:'))
+                    .map(entry => ({ name: entry.name, startTime: entry.startTime, duration: entry.duration }));
+            },
+            summary() {
+                const summary = {};
+                this.metrics().forEach(metric => {
+                    const item = summary[metric.name] || (summary[metric.name] = { count: 0, total: 0, max: 0 });
+                    item.count++;
+                    item.total += metric.duration;
+                    item.max = Math.max(item.max, metric.duration);
+                });
+                return summary;
+            },
+            subscribe(callback) {
+                telemetrySubscribers.add(callback);
+                return () => telemetrySubscribers.delete(callback);
+            }
+        };
+        // --- End Performance Telemetry ---
+
+        // --- Exam Loading (embedded literal, inline JSON blocks or sidecar files) ---
+        // Reverses encode_exam_compact: [id, text, options, answer, points, optionIds?] with string-table indexes
+        function decodeExam(exam) {
+            if (quizConfig.encoding !== 'compact') {
+                return exam;
+            }
+            const strings = exam.strings;
+            return {
+                exam_id: exam.exam_id,
+                title: exam.title,
+                scoring_info: exam.scoring_info,
+                answer_sheet_source_id: exam.answer_sheet_source_id,
+                questions: exam.questions.map(q => ({
+                    id: q[0],
+                    text: strings[q[1]],
+                    options: q[2].map((textIndex, i) => ({
+                        option_id: q[5] ? q[5][i] : i + 1,
+                        text: strings[textIndex]
+                    })),
+                    answer: q[3],
+                    points: q[4]
+                }))
+            };
+        }
+
+        function fetchExam(entry) {
+            if (quizConfig.chunks === 'files') {
+                const url = `${quizConfig.chunk_dir}/exam-${encodeURIComponent(entry.exam_id)}.json`;
+                return fetch(url).then(response => {
+                    if (!response.ok) {
+                        throw new Error(`無法載入測驗資料 ${url} (HTTP ${response.status})`);
+                    }
+                    return response.text();
+                }).then(text => measured('quiz:parse', () => JSON.parse(text), entry.exam_id));
+            }
+            if (quizConfig.chunks === 'inline') {
+                return new Promise(resolve => {
+                    const chunkEl = document.getElementById(`exam-${entry.exam_id}`);
+                    if (!chunkEl) {
+                        throw new Error(`找不到測驗 "${entry.title}" 的資料區塊`);
+                    }
+                    resolve(measured('quiz:parse', () => JSON.parse(chunkEl.textContent), entry.exam_id));
+                });
+            }
+            return Promise.resolve(quizExamData[entry.exam_id]);
+        }
+
+        // Pages built with compress hold each exam as base64 of its deflated JSON (see compress_payload)
+        function inflateExam(data, examId) {
+            if (quizConfig.compression !== 'deflate') {
+                return data;
+            }
+            if (typeof DecompressionStream === 'undefined') {
+                throw new Error('此瀏覽器不支援 DecompressionStream，無法解壓縮測驗資料，請更新瀏覽器或改用未壓縮的頁面');
+            }
+            const handle = startMeasure('quiz:inflate');
+            const bytes = Uint8Array.from(atob(data), char => char.charCodeAt(0));
+            const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('deflate'));
+            return new Response(stream).text().then(text => {
+                endMeasure(handle, examId);
+                return measured('quiz:parse', () => JSON.parse(text), examId);
+            });
+        }
+
+        function loadExam(examIndex) {
+            const entry = quizManifest[examIndex];
+            if (!entry) {
+                return Promise.reject(new Error(`無效的測驗索引 ${examIndex}`));
+            }
+            if (!examCache.has(entry.exam_id)) {
+                const pending = fetchExam(entry)
+                    .then(data => inflateExam(data, entry.exam_id))
+                    .then(exam => measured('quiz:decode', () => decodeExam(exam), entry.exam_id))
+                    .then(exam => {
+                        // the decoded exam is cached now, drop the source text; kept until here so a failed load can be retried
+                        const chunkEl = quizConfig.chunks === 'inline' && document.getElementById(`exam-${entry.exam_id}`);
+                        if (chunkEl) {
+                            chunkEl.remove();
+                        }
+                        return exam;
+                    });
+                pending.catch(() => examCache.delete(entry.exam_id)); // allow a retry after a failed load
+                examCache.set(entry.exam_id, pending);
+            }
+            return examCache.get(entry.exam_id);
+        }
+        // --- End Exam Loading ---
+        
+        // The running quiz: exams it draws from and an index array into their pooled questions
+        let currentQuiz = null;
         let currentQuestionIndex = 0;
+        let selectedOptionIndex = -1;
+        let reviewRenderToken = 0;
         let userAnswers = [];
         let totalScore = 0;
 
@@ -307,8 +525,21 @@ def create_html_quiz_page(quiz_data): #
         const scoreTextEl = document.getElementById('score-text');
         const reviewAreaEl = document.getElementById('review-area');
         const restartQuizBtn = document.getElementById('restart-quiz-btn');
+        const abandonQuizBtn = document.getElementById('abandon-quiz-btn');
+        const exportAttemptsBtn = document.getElementById('export-attempts-btn');
+        const practiceExamListEl = document.getElementById('practice-exam-list');
+        const practiceCountEl = document.getElementById('practice-count');
+        const practiceStratifyEl = document.getElementById('practice-stratify');
+        const practiceSeedEl = document.getElementById('practice-seed');
+        const practiceAvoidDuplicatesEl = document.getElementById('practice-avoid-duplicates');
+        const startPracticeBtn = document.getElementById('start-practice-btn');
+        const seedTextEl = document.getElementById('seed-text');
+        const searchAreaEl = document.getElementById('search-area');
+        const searchInputEl = document.getElementById('search-input');
+        const searchSummaryEl = document.getElementById('search-summary');
+        const searchResultsEl = document.getElementById('search-results');
         
-        function showError(message) {{ 
+        function showError(message) { 
             console.error(message); 
             const errorDivOld = document.querySelector('.error');
             if(errorDivOld) errorDivOld.remove(); 
@@ -316,348 +547,2476 @@ def create_html_quiz_page(quiz_data): #
             errorDiv.className = 'error'; 
             errorDiv.textContent = message; 
             const container = document.getElementById('quiz-container'); 
-            if (container) {{ 
+            if (container) { 
                  container.insertBefore(errorDiv, container.firstChild); 
-            }}
-        }}
+            }
+        }
 
-        function hideError() {{ 
+        function hideError() { 
             const errorDiv = document.querySelector('.error'); 
-            if (errorDiv) {{ 
+            if (errorDiv) { 
                 errorDiv.remove(); 
-            }}
-        }}
+            }
+        }
 
-        function validateProcessedQuizData() {{ 
-            if (!processedQuizData || typeof processedQuizData !== 'object') {{ 
-                throw new Error('無效的已處理測驗資料格式'); 
-            }}
-            
-            if (!processedQuizData.exams || !Array.isArray(processedQuizData.exams)) {{ 
+        function validateManifest() { 
+            if (!Array.isArray(quizManifest)) { 
                 throw new Error('已處理測驗資料中缺少有效的測驗列表'); 
-            }}
+            }
             
-            if (processedQuizData.exams.length === 0) {{ 
-                const rawExamCount = rawQuizData ? Object.keys(rawQuizData).length : 0;
-                if (rawExamCount > 0) {{
-                    throw new Error('所有原始測驗資料轉換後均無效或沒有題目。請檢查 quiz_data.json 的內容與結構。');
-                }} else {{
-                    throw new Error('沒有可用的測驗'); 
-                }}
-            }}
-            
-            processedQuizData.exams.forEach((exam, examIndex) => {{ 
-                if (!exam.title || typeof exam.title !== 'string') {{ 
-                    throw new Error(`測驗索引 ${{examIndex}} 缺少有效的標題`); 
-                }}
-                if (!exam.questions || !Array.isArray(exam.questions) || exam.questions.length === 0) {{ 
-                     throw new Error(`測驗 "${{exam.title}}" 沒有題目或題目列表無效`);
-                }}
-                exam.questions.forEach((question, questionIndex) => {{ 
-                    if (typeof question.id === 'undefined' || typeof question.text !== 'string') {{ 
-                        throw new Error(`測驗 "${{exam.title}}" 第 ${{questionIndex + 1}} 題缺少必要資訊 (ID or text)`); 
-                    }}
-                    if (!question.options || !Array.isArray(question.options) || question.options.length === 0) {{ 
-                        throw new Error(`測驗 "${{exam.title}}" 第 ${{questionIndex + 1}} 題缺少選項`); 
-                    }}
-                    if (typeof question.points !== 'number' || question.points <= 0) {{ 
-                        throw new Error(`測驗 "${{exam.title}}" 第 ${{questionIndex + 1}} 題分數無效 (得到: ${{question.points}})`); 
-                    }}
-                    if (typeof question.answer !== 'number') {{ 
-                        throw new Error(`測驗 "${{exam.title}}" 第 ${{questionIndex + 1}} 題缺少正確答案(或非數字格式)`); 
-                    }}
-                    const answerExists = question.options.some(opt => opt.option_id === question.answer); 
-                    if (!answerExists) {{ 
-                        throw new Error(`測驗 "${{exam.title}}" 第 ${{questionIndex + 1}} 題的正確答案 (${{question.answer}}) 不在選項中`); 
-                    }}
-                }});
-            }});
-        }}
+            if (quizManifest.length === 0) { 
+                throw new Error('沒有可用的測驗'); 
+            }
+        }
+
+        // --- Seeded sampling (questions are never copied, only indexes are shuffled) ---
+        function seedFromText(text) {
+            const trimmed = String(text || '').trim();
+            if (trimmed === '') {
+                const buffer = new Uint32Array(1);
+                if (window.crypto && window.crypto.getRandomValues) {
+                    window.crypto.getRandomValues(buffer);
+                } else {
+                    buffer[0] = Math.floor(Math.random() * 4294967296);
+                }
+                return buffer[0];
+            }
+            if (/^\\d+$/.test(trimmed)) {
+                return Number(trimmed) >>> 0;
+            }
+            let hash = 0x811c9dc5; // FNV-1a, so any text can be used as a seed
+            for (let i = 0; i < trimmed.length; i++) {
+                hash ^= trimmed.charCodeAt(i);
+                hash = Math.imul(hash, 0x01000193);
+            }
+            return hash >>> 0;
+        }
+
+        // mulberry32: a small seedable PRNG returning floats in [0, 1)
+        function createRandom(seed) {
+            let state = seed >>> 0;
+            return function() {
+                state = (state + 0x6D2B79F5) >>> 0;
+                let t = state;
+                t = Math.imul(t ^ (t >>> 15), t | 1);
+                t ^= t + Math.imul(t ^ (t >>> 7), t | 61);
+                return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+            };
+        }
 
         // Fisher-Yates (Knuth) Shuffle function
-        function shuffleArray(array) {{
-            for (let i = array.length - 1; i > 0; i--) {{
-                const j = Math.floor(Math.random() * (i + 1));
-                [array[i], array[j]] = [array[j], array[i]]; // Swap elements
-            }}
-        }}
-
-        function populateExamSelector() {{ 
-            try {{ 
+        function shuffleArray(array, random = Math.random) {
+            for (let i = array.length - 1; i > 0; i--) {
+                const j = Math.floor(random() * (i + 1));
+                const swap = array[i]; // Swap elements
+                array[i] = array[j];
+                array[j] = swap;
+            }
+        }
+
+        // Partial Fisher-Yates: moves up to `count` random elements of array[start, end) that
+        // accept (if given) lets through to array[start, start + taken). Returns taken.
+        function sampleRange(array, start, end, count, random, accept) {
+            let taken = start;
+            for (let i = start; i < end && taken < start + count; i++) {
+                const j = i + Math.floor(random() * (end - i));
+                const picked = array[j];
+                array[j] = array[i];
+                array[i] = picked;
+                if (!accept || accept(picked)) {
+                    array[i] = array[taken];
+                    array[taken++] = picked;
+                }
+            }
+            return taken - start;
+        }
+
+        // Splits count across strata in proportion to their sizes (largest remainder method)
+        function allocateQuotas(sizes, count) {
+            const total = sizes.reduce((sum, size) => sum + size, 0);
+            const quotas = sizes.map(size => Math.floor(count * size / total));
+            let remaining = count - quotas.reduce((sum, quota) => sum + quota, 0);
+            const byRemainder = sizes.map((size, i) => i)
+                .sort((a, b) => (count * sizes[b] / total - quotas[b]) - (count * sizes[a] / total - quotas[a]));
+            for (let k = 0; remaining > 0; k = (k + 1) % byRemainder.length) {
+                const i = byRemainder[k];
+                if (quotas[i] < sizes[i]) {
+                    quotas[i]++;
+                    remaining--;
+                }
+            }
+            return quotas;
+        }
+
+        // Scoring bands: questions 1-40 and 41-60
+        function questionBand(question) {
+            return question.id >= 41 && question.id <= 60 ? 1 : 0;
+        }
+
+        // Near-duplicate groups found by `create_quiz_page.py dedupe`, keyed by exam id and question number
+        const duplicateGroups = new Map();
+        (quizConfig.duplicate_groups || []).forEach((group, g) => {
+            group.forEach(([examId, questionId]) => duplicateGroups.set(`${examId}:${questionId}`, g));
+        });
+
+        // Draws count questions from the pooled questions of exams, optionally stratified by
+        // exam or by question-number band, and with avoidDuplicates at most one question of
+        // each near-duplicate group. The same arguments and seed always give the same
+        // questions in the same order.
+        function buildQuiz(title, exams, count, stratify, seed, avoidDuplicates = false) {
+            const random = createRandom(seed);
+            const offsets = poolOffsets(exams);
+            const total = offsets[exams.length];
+            const pool = new Uint32Array(total);
+            let strata;
+            if (stratify === 'band') {
+                // counting sort of the pooled indexes by band, so each band is a contiguous range
+                const bandSizes = [0, 0];
+                exams.forEach(exam => exam.questions.forEach(q => { bandSizes[questionBand(q)]++; }));
+                const next = [0, bandSizes[0]];
+                exams.forEach((exam, e) => exam.questions.forEach((q, i) => { pool[next[questionBand(q)]++] = offsets[e] + i; }));
+                strata = [[0, bandSizes[0]], [bandSizes[0], total]];
+            } else {
+                for (let i = 0; i < total; i++) {
+                    pool[i] = i;
+                }
+                strata = stratify === 'exam' ? exams.map((exam, e) => [offsets[e], offsets[e + 1]]) : [[0, total]];
+            }
+            strata = strata.filter(([start, end]) => end > start);
+
+            let accept = null;
+            if (avoidDuplicates && duplicateGroups.size > 0) {
+                const drawnGroups = new Set();
+                accept = pooled => {
+                    let e = 0;
+                    while (pooled >= offsets[e + 1]) {
+                        e++;
+                    }
+                    const group = duplicateGroups.get(`${exams[e].exam_id}:${exams[e].questions[pooled - offsets[e]].id}`);
+                    if (group === undefined) {
+                        return true;
+                    }
+                    if (drawnGroups.has(group)) {
+                        return false;
+                    }
+                    drawnGroups.add(group);
+                    return true;
+                };
+            }
+
+            let order = new Uint32Array(Math.min(count, total));
+            const quotas = allocateQuotas(strata.map(([start, end]) => end - start), order.length);
+            let filled = 0;
+            strata.forEach(([start, end], s) => {
+                const taken = sampleRange(pool, start, end, quotas[s], random, accept);
+                order.set(pool.subarray(start, start + taken), filled);
+                filled += taken;
+            });
+            order = order.slice(0, filled); // skipped duplicates can leave a stratum short
+            shuffleArray(order, random);
+            return { title, seed, exams, offsets, order };
+        }
+
+        // offsets[e] is the pooled index of exams[e]'s first question, offsets[exams.length] the total
+        function poolOffsets(exams) {
+            const offsets = new Uint32Array(exams.length + 1);
+            exams.forEach((exam, e) => { offsets[e + 1] = offsets[e] + exam.questions.length; });
+            return offsets;
+        }
+
+        function quizLength() {
+            return currentQuiz ? currentQuiz.order.length : 0;
+        }
+
+        // Index into currentQuiz.exams of the exam the index-th quiz question comes from
+        function quizExamIndex(index) {
+            const pooled = currentQuiz.order[index];
+            let e = 0;
+            while (pooled >= currentQuiz.offsets[e + 1]) {
+                e++;
+            }
+            return e;
+        }
+
+        function quizQuestion(index) {
+            const e = quizExamIndex(index);
+            return currentQuiz.exams[e].questions[currentQuiz.order[index] - currentQuiz.offsets[e]];
+        }
+        // --- End Seeded Sampling ---
+
+        // --- Question Search (prebuilt inverted index, see build_search_index) ---
+        const SEARCH_RUN_PATTERN = /[0-9a-z]+|[\\u3040-\\u30ff\\u3400-\\u9fff\\uf900-\\ufaff]+/g;
+        const SEARCH_RESULT_LIMIT = 20;
+        const decodedPostings = new Map();
+        let searchTermList = null;
+        let examOffsets = null;
+        let searchToken = 0;
+
+        // Mirrors search_tokens in create_quiz_page.py
+        function searchTokens(text) {
+            const tokens = [];
+            const runs = text.normalize('NFKC').toLowerCase().match(SEARCH_RUN_PATTERN) || [];
+            runs.forEach(run => {
+                if (run.charCodeAt(0) < 0x80 || run.length === 1) {
+                    tokens.push(run);
+                } else {
+                    for (let i = 0; i + 1 < run.length; i++) {
+                        tokens.push(run.slice(i, i + 2));
+                    }
+                }
+            });
+            return tokens;
+        }
+
+        // Undoes the delta encoding of one token's postings: entries are doc * 2 + inText
+        function postingsFor(token) {
+            let postings = decodedPostings.get(token);
+            if (!postings) {
+                const encoded = quizSearchIndex.terms[token] || [];
+                postings = new Uint32Array(encoded.length);
+                let doc = 0;
+                for (let i = 0; i < encoded.length; i++) {
+                    doc += encoded[i] >>> 1;
+                    postings[i] = doc * 2 + (encoded[i] & 1);
+                }
+                decodedPostings.set(token, postings);
+            }
+            return postings;
+        }
+
+        // A lone CJK character is not indexed by itself, so it matches every bigram containing it
+        function expandToken(token) {
+            if (token.length !== 1 || token.charCodeAt(0) < 0x80) {
+                return [token];
+            }
+            searchTermList = searchTermList || Object.keys(quizSearchIndex.terms);
+            return searchTermList.filter(term => term.includes(token));
+        }
+
+        // Returns up to limit [doc, matchedTokens, score], best first: documents matching more
+        // query tokens rank higher, then by idf weighted score (question text counts double).
+        function searchQuestions(query, limit) {
+            const hits = new Map();
+            const tokens = [...new Set(searchTokens(query))];
+            tokens.forEach(token => {
+                const seen = new Set();
+                expandToken(token).forEach(term => {
+                    const postings = postingsFor(term);
+                    const idf = Math.log(1 + quizSearchIndex.docs / Math.max(postings.length, 1));
+                    for (let i = 0; i < postings.length; i++) {
+                        const doc = postings[i] >>> 1;
+                        if (seen.has(doc)) {
+                            continue;
+                        }
+                        seen.add(doc);
+                        const hit = hits.get(doc) || [doc, 0, 0];
+                        hit[1] += 1;
+                        hit[2] += idf * ((postings[i] & 1) ? 2 : 1);
+                        hits.set(doc, hit);
+                    }
+                });
+            });
+            const ranked = [...hits.values()].sort((a, b) => (b[1] - a[1]) || (b[2] - a[2]) || (a[0] - b[0]));
+            return { total: ranked.length, tokens: tokens.length, hits: ranked.slice(0, limit) };
+        }
+
+        // Maps a document number to [examIndex, questionIndex] using the manifest's question counts
+        function locateDocument(doc) {
+            if (!examOffsets) {
+                examOffsets = [0];
+                quizManifest.forEach(entry => examOffsets.push(examOffsets[examOffsets.length - 1] + entry.question_count));
+            }
+            let examIndex = 0;
+            while (doc >= examOffsets[examIndex + 1]) {
+                examIndex++;
+            }
+            return [examIndex, doc - examOffsets[examIndex]];
+        }
+
+        function runSearch() {
+            const token = ++searchToken;
+            const query = searchInputEl.value;
+            if (!query.trim()) {
+                searchSummaryEl.textContent = '';
+                searchResultsEl.innerHTML = '';
+                return;
+            }
+            const started = performance.now();
+            const result = searchQuestions(query, SEARCH_RESULT_LIMIT);
+            const elapsed = performance.now() - started;
+            const locations = result.hits.map(hit => locateDocument(hit[0]));
+            const examIndexes = [...new Set(locations.map(location => location[0]))];
+            // Hits only need their own exams loaded, never the whole bank
+            Promise.all(examIndexes.map(loadExam)).then(exams => {
+                if (token !== searchToken) {
+                    return;
+                }
+                const loaded = new Map(examIndexes.map((examIndex, i) => [examIndex, exams[i]]));
+                const fragment = document.createDocumentFragment();
+                locations.forEach(([examIndex, questionIndex], i) => {
+                    const exam = loaded.get(examIndex);
+                    const question = exam.questions[questionIndex];
+                    const item = document.createElement('li');
+                    item.classList.add('search-hit');
+                    const partial = result.hits[i][1] < result.tokens ? ' (部分符合)' : '';
+                    item.innerHTML = `<p class="search-hit-source">${escapeHtml(exam.title)} 第 ${question.id} 題${partial}</p>` +
+                        `<p>${escapeHtml(question.text)}</p>` +
+                        `<p class="correct-answer-text">答案：${escapeHtml(optionDisplayText(question, question.answer, 'N/A'))}</p>`;
+                    fragment.appendChild(item);
+                });
+                searchResultsEl.innerHTML = '';
+                searchResultsEl.appendChild(fragment);
+                const shown = result.total > result.hits.length ? `，顯示前 ${result.hits.length} 題` : '';
+                searchSummaryEl.textContent = `找到 ${result.total} 題${shown} (搜尋耗時 ${elapsed.toFixed(2)} 毫秒)`;
+            }).catch(error => {
+                showError(`搜尋時發生錯誤：${error.message}`);
+            });
+        }
+        // --- End Question Search ---
+
+        function populateExamSelector() { 
+            try { 
                 hideError(); 
-                validateProcessedQuizData(); 
-                examSelector.innerHTML = '<option value="">-- 選擇一個測驗 --</option>'; 
-                processedQuizData.exams.forEach((exam, index) => {{ 
-                    const optionElement = document.createElement('option'); 
-                    optionElement.value = index; 
-                    optionElement.textContent = `${{exam.title}} (${{exam.questions.length}} 題)`; 
-                    examSelector.appendChild(optionElement); 
-                }});
+                measured('quiz:validate', validateManifest); 
+                // A prerendered page already has the options and checkboxes, the script only enables it
+                if (!quizConfig.prerendered) {
+                    buildExamLists();
+                }
                 startQuizBtn.disabled = false; 
-            }} catch (error) {{ 
-                showError(`載入測驗資料時發生錯誤：${{error.message}}`); 
+                searchAreaEl.hidden = !quizSearchIndex; 
+                document.getElementById('practice-duplicates-field').hidden = duplicateGroups.size === 0; 
+            } catch (error) { 
+                showError(`載入測驗資料時發生錯誤：${error.message}`); 
                 startQuizBtn.disabled = true; 
-            }}
-        }}
-
-        function startQuiz() {{ 
-            try {{ 
-                const selectedExamIndex = examSelector.value; 
-                if (selectedExamIndex === "") {{ 
-                    showError("請先選擇一個測驗！"); 
-                    return; 
-                }}
+            }
+        }
 
-                hideError(); 
-                // Create a deep copy of the selected exam's data to shuffle
-                // This prevents modifying the original processedQuizData structure if the user re-selects the same exam
-                let selectedExamObject = JSON.parse(JSON.stringify(processedQuizData.exams[parseInt(selectedExamIndex)]));
-                
-                // Shuffle the questions array of the copied exam data
-                if (selectedExamObject.questions && selectedExamObject.questions.length > 0) {{
-                    shuffleArray(selectedExamObject.questions);
-                }}
-                currentExamData = selectedExamObject; // Use the exam with shuffled questions
+        function buildExamLists() {
+            examSelector.innerHTML = '<option value="">-- 選擇一個測驗 --</option>'; 
+            quizManifest.forEach((entry, index) => { 
+                const optionElement = document.createElement('option'); 
+                optionElement.value = index; 
+                optionElement.textContent = `${entry.title} (${entry.question_count} 題)`; 
+                examSelector.appendChild(optionElement); 
 
-                currentQuestionIndex = 0; 
-                userAnswers = new Array(currentExamData.questions.length).fill(null); 
-                totalScore = 0; 
+                const checkboxLabel = document.createElement('label'); 
+                const checkbox = document.createElement('input'); 
+                checkbox.type = 'checkbox'; 
+                checkbox.value = index; 
+                checkbox.checked = true; 
+                checkboxLabel.appendChild(checkbox); 
+                checkboxLabel.append(` ${entry.title} (${entry.question_count} 題)`); 
+                practiceExamListEl.appendChild(checkboxLabel); 
+            });
+        }
 
-                quizTitleEl.textContent = currentExamData.title; 
-                examSelectionDiv.style.display = 'none'; 
-                resultsAreaDiv.style.display = 'none'; 
-                questionAreaDiv.style.display = 'block'; 
-                
-                displayQuestion(); 
-            }} catch (error) {{ 
-                showError(`開始測驗時發生錯誤：${{error.message}}`); 
-            }}
-        }}
-
-        function displayQuestion() {{ 
-            try {{ 
-                if (!currentExamData || currentQuestionIndex >= currentExamData.questions.length) {{ 
+        function startQuiz() { 
+            const selectedExamIndex = examSelector.value; 
+            if (selectedExamIndex === "") { 
+                showError("請先選擇一個測驗！"); 
+                return; 
+            }
+
+            hideError(); 
+            startQuizBtn.disabled = true; 
+            loadExam(parseInt(selectedExamIndex)).then(exam => { 
+                // Shuffle an index array over the cached exam instead of copying its questions
+                beginQuiz(buildQuiz(exam.title, [exam], exam.questions.length, '', seedFromText('')), 'exam'); 
+            }).catch(error => { 
+                showError(`開始測驗時發生錯誤：${error.message}`); 
+            }).finally(() => { 
+                startQuizBtn.disabled = false; 
+            });
+        }
+
+        function startPractice() { 
+            const selectedIndexes = practiceExamListEl.querySelectorAll('input[type="checkbox"]:checked'); 
+            const examIndexes = Array.prototype.map.call(selectedIndexes, checkbox => parseInt(checkbox.value)); 
+            if (examIndexes.length === 0) { 
+                showError("請至少選擇一屆測驗！"); 
+                return; 
+            }
+            const count = parseInt(practiceCountEl.value); 
+            if (!(count > 0)) { 
+                showError("請輸入有效的題數！"); 
+                return; 
+            }
+
+            hideError(); 
+            startPracticeBtn.disabled = true; 
+            const seed = seedFromText(practiceSeedEl.value); 
+            Promise.all(examIndexes.map(loadExam)).then(exams => { 
+                const title = exams.length === 1 ? `${exams[0].title} (練習)` : `綜合練習 (${exams.length} 屆)`; 
+                beginQuiz(buildQuiz(title, exams, count, practiceStratifyEl.value, seed, practiceAvoidDuplicatesEl.checked), 'practice'); 
+            }).catch(error => { 
+                showError(`開始測驗時發生錯誤：${error.message}`); 
+            }).finally(() => { 
+                startPracticeBtn.disabled = false; 
+            });
+        }
+
+        // saved, a session read back by resumeSession, restores the position and answers
+        function beginQuiz(quiz, mode, saved = null) { 
+            currentQuiz = quiz; 
+            currentQuiz.mode = mode; 
+            currentQuestionIndex = saved ? saved.index : 0; 
+            userAnswers = saved ? saved.answers : new Array(quizLength()).fill(null); 
+            totalScore = 0; 
+
+            quizTitleEl.textContent = currentQuiz.title; 
+            examSelectionDiv.style.display = 'none'; 
+            resultsAreaDiv.style.display = 'none'; 
+            questionAreaDiv.style.display = 'block'; 
+            
+            displayQuestion(); 
+            if (!saved) { 
+                saveSessionNow(); // the drawn order is written once, answers follow in coalesced saves
+            }
+        }
+
+        function displayQuestion() { 
+            const measure = startMeasure('quiz:render-question'); 
+            try { 
+                if (!currentQuiz || currentQuestionIndex >= quizLength()) { 
                     showResults(); 
                     return; 
-                }}
+                }
 
-                const question = currentExamData.questions[currentQuestionIndex]; 
-                questionTextEl.textContent = `${{question.id}}. ${{question.text}} (${{question.points.toFixed(1)}}分)`; 
-                optionsContainerEl.innerHTML = ''; 
+                const question = quizQuestion(currentQuestionIndex); 
+                questionTextEl.textContent = `${question.id}. ${question.text} (${question.points.toFixed(1)}分)`; 
                 feedbackEl.style.display = 'none'; 
 
-                question.options.forEach(opt => {{ 
-                    const div = document.createElement('div'); 
-                    div.classList.add('option'); 
-                    
-                    const radio = document.createElement('input'); 
-                    radio.type = 'radio'; 
-                    radio.name = 'question_option'; 
-                    radio.value = opt.option_id; 
-                    radio.id = `q${{currentQuestionIndex}}_opt${{opt.option_id}}`; 
-
-                    const label = document.createElement('label'); 
-                    label.htmlFor = radio.id; 
-                    label.textContent = `(${{opt.option_id}}) ${{opt.text}}`; 
-                    
-                    div.appendChild(radio); 
-                    div.appendChild(label); 
-                    
-                    div.addEventListener('click', function() {{ 
-                        radio.checked = true; 
-                        document.querySelectorAll('.option').forEach(el => el.classList.remove('selected')); 
-                        div.classList.add('selected'); 
-                    }});
-                    
-                    radio.addEventListener('change', function() {{ 
-                        document.querySelectorAll('.option').forEach(el => el.classList.remove('selected')); 
-                        div.classList.add('selected'); 
-                    }});
-                    
-                    optionsContainerEl.appendChild(div); 
-                }});
-
-                progressTextEl.textContent = `第 ${{currentQuestionIndex + 1}} / ${{currentExamData.questions.length}} 題`; 
-                nextQuestionBtn.textContent = (currentQuestionIndex === currentExamData.questions.length - 1) ? "提交測驗" : "下一題"; 
-            }} catch (error) {{ 
-                showError(`顯示題目時發生錯誤：${{error.message}}`); 
-            }}
-        }}
-
-        function processNextQuestion() {{ 
-            try {{ 
-                const selectedOption = optionsContainerEl.querySelector('input[name="question_option"]:checked'); 
-                if (!selectedOption) {{ 
+                ensureOptionNodes(question.options.length); 
+                optionNodes.forEach((node, index) => { 
+                    const opt = question.options[index]; 
+                    node.div.classList.remove('selected'); 
+                    node.radio.checked = false; 
+                    if (opt) { 
+                        node.radio.value = opt.option_id; 
+                        node.label.textContent = `(${opt.option_id}) ${opt.text}`; 
+                    }
+                    node.div.hidden = !opt; 
+                });
+                selectedOptionIndex = -1; 
+
+                const source = currentQuiz.exams.length > 1 ? ` · ${currentQuiz.exams[quizExamIndex(currentQuestionIndex)].title}` : ''; 
+                progressTextEl.textContent = `第 ${currentQuestionIndex + 1} / ${quizLength()} 題${source}`; 
+                nextQuestionBtn.textContent = (currentQuestionIndex === quizLength() - 1) ? "提交測驗" : "下一題"; 
+            } catch (error) { 
+                showError(`顯示題目時發生錯誤：${error.message}`); 
+            } finally { 
+                endMeasure(measure, currentQuestionIndex); 
+            }
+        }
+
+        // Option nodes are created once and reused for every question; hidden ones are unused
+        const optionNodes = []; 
+
+        function ensureOptionNodes(count) { 
+            while (optionNodes.length < count) { 
+                const index = optionNodes.length; 
+                const div = document.createElement('div'); 
+                div.classList.add('option'); 
+                div.dataset.index = index; 
+                
+                const radio = document.createElement('input'); 
+                radio.type = 'radio'; 
+                radio.name = 'question_option'; 
+                radio.id = `question_opt${index}`; 
+
+                const label = document.createElement('label'); 
+                label.htmlFor = radio.id; 
+                
+                div.appendChild(radio); 
+                div.appendChild(label); 
+                optionsContainerEl.appendChild(div); 
+                optionNodes.push({ div, radio, label }); 
+            }
+        }
+
+        function selectOption(index) { 
+            const node = optionNodes[index]; 
+            if (!node || node.div.hidden) { 
+                return; 
+            }
+            if (selectedOptionIndex >= 0 && selectedOptionIndex !== index) { 
+                optionNodes[selectedOptionIndex].div.classList.remove('selected'); 
+            }
+            node.radio.checked = true; 
+            node.div.classList.add('selected'); 
+            selectedOptionIndex = index; 
+        }
+
+        // One delegated listener handles clicks on any option, its radio or its label
+        optionsContainerEl.addEventListener('click', function(event) { 
+            const div = event.target.closest('.option'); 
+            if (div && optionsContainerEl.contains(div)) { 
+                selectOption(parseInt(div.dataset.index)); 
+            }
+        });
+
+        function processNextQuestion() { 
+            try { 
+                const selectedOption = selectedOptionIndex >= 0 ? optionNodes[selectedOptionIndex].radio : null; 
+                if (!selectedOption) { 
                     feedbackEl.textContent = "請選擇一個答案！"; 
                     feedbackEl.style.display = 'block'; 
                     return; 
-                }}
+                }
                 
                 userAnswers[currentQuestionIndex] = parseInt(selectedOption.value); 
                 feedbackEl.style.display = 'none'; 
                 currentQuestionIndex++; 
                 
-                if (currentQuestionIndex < currentExamData.questions.length) {{ 
+                if (currentQuestionIndex < quizLength()) { 
                     displayQuestion(); 
-                }} else {{ 
+                    scheduleSessionSave(); 
+                } else { 
                     showResults(); 
-                }}
-            }} catch (error) {{ 
-                showError(`處理答案時發生錯誤：${{error.message}}`); 
-            }}
-        }}
-
-        function showResults() {{ 
-            try {{ 
+                }
+            } catch (error) { 
+                showError(`處理答案時發生錯誤：${error.message}`); 
+            }
+        }
+
+        const HTML_ESCAPES = { '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' }; 
+
+        function escapeHtml(text) { 
+            return String(text).replace(/[&<>"']/g, ch => HTML_ESCAPES[ch]); 
+        }
+
+        function optionDisplayText(question, optionId, fallback) { 
+            const opt = question.options.find(o => o.option_id === optionId); 
+            return opt ? `(${opt.option_id}) ${opt.text}` : fallback; 
+        }
+
+        function reviewItemHtml(index) { 
+            const question = quizQuestion(index); 
+            const isCorrect = userAnswers[index] === question.answer; 
+            const pointsEarned = isCorrect ? question.points : 0; 
+            let html = `<p class="review-question">${escapeHtml(`${question.id}. ${question.text} (${question.points.toFixed(1)}分)`)}</p>` + 
+                `<p>您的答案：<span class="user-answer ${isCorrect ? 'correct' : 'incorrect'}">${escapeHtml(optionDisplayText(question, userAnswers[index], '未作答'))}</span></p>`; 
+            if (!isCorrect) { 
+                html += `<p>正確答案：<span class="correct-answer-text">${escapeHtml(optionDisplayText(question, question.answer, 'N/A'))}</span></p>`; 
+            }
+            return html + `<p>本題得分：${pointsEarned.toFixed(1)} / ${question.points.toFixed(1)} 分</p>`; 
+        }
+
+        const REVIEW_CHUNK_SIZE = 50; 
+
+        // Appends review items [start, start + REVIEW_CHUNK_SIZE) in one DocumentFragment, then
+        // schedules the next chunk for the following frame so long reviews never block input.
+        function renderReviewChunk(start, token) { 
+            if (token !== reviewRenderToken) { 
+                return; 
+            }
+            const end = Math.min(start + REVIEW_CHUNK_SIZE, quizLength()); 
+            const fragment = document.createDocumentFragment(); 
+            for (let index = start; index < end; index++) { 
+                const reviewItem = document.createElement('div'); 
+                reviewItem.classList.add('review-item'); 
+                reviewItem.innerHTML = reviewItemHtml(index); 
+                fragment.appendChild(reviewItem); 
+            }
+            reviewAreaEl.appendChild(fragment); 
+            if (end < quizLength()) { 
+                requestAnimationFrame(() => renderReviewChunk(end, token)); 
+            }
+        }
+
+        function showResults() { 
+            try { 
                 questionAreaDiv.style.display = 'none'; 
                 resultsAreaDiv.style.display = 'block'; 
                 reviewAreaEl.innerHTML = ''; 
                 totalScore = 0; 
 
                 let maxScore = 0; 
-                currentExamData.questions.forEach((question, index) => {{ 
+                for (let index = 0; index < quizLength(); index++) { 
+                    const question = quizQuestion(index); 
                     maxScore += question.points; 
-                    
-                    const userAnswerId = userAnswers[index]; 
-                    const correctAnswerId = question.answer; 
-                    const isCorrect = userAnswerId === correctAnswerId; 
-                    const pointsEarned = isCorrect ? question.points : 0; 
-                    totalScore += pointsEarned; 
-
-                    const reviewItem = document.createElement('div'); 
-                    reviewItem.classList.add('review-item'); 
-                    
-                    const questionTextElement = document.createElement('p'); 
-                    questionTextElement.classList.add('review-question'); 
-                    questionTextElement.textContent = `${{question.id}}. ${{question.text}} (${{question.points.toFixed(1)}}分)`; 
-                    reviewItem.appendChild(questionTextElement); 
-
-                    const userAnswerObj = question.options.find(opt => opt.option_id === userAnswerId); 
-                    const userAnswerParagraph = document.createElement('p'); 
-                    const answerClass = isCorrect ? 'correct' : 'incorrect'; 
-                    const answerDisplayText = userAnswerObj ? `(${{userAnswerObj.option_id}}) ${{userAnswerObj.text}}` : '未作答'; 
-                    userAnswerParagraph.innerHTML = `您的答案：<span class="user-answer ${{answerClass}}">${{answerDisplayText}}</span>`; 
-                    reviewItem.appendChild(userAnswerParagraph); 
-
-                    if (!isCorrect) {{ 
-                        const correctAnswerObj = question.options.find(opt => opt.option_id === correctAnswerId); 
-                        const correctAnswerParagraph = document.createElement('p'); 
-                        const correctDisplayText = correctAnswerObj ? `(${{correctAnswerObj.option_id}}) ${{correctAnswerObj.text}}` : 'N/A'; 
-                        correctAnswerParagraph.innerHTML = `正確答案：<span class="correct-answer-text">${{correctDisplayText}}</span>`; 
-                        reviewItem.appendChild(correctAnswerParagraph); 
-                    }}
-                    
-                    const pointsParagraph = document.createElement('p'); 
-                    pointsParagraph.textContent = `本題得分：${{pointsEarned.toFixed(1)}} / ${{question.points.toFixed(1)}} 分`; 
-                    reviewItem.appendChild(pointsParagraph); 
-
-                    reviewAreaEl.appendChild(reviewItem); 
-                }});
+                    if (userAnswers[index] === question.answer) { 
+                        totalScore += question.points; 
+                    }
+                }
                 
                 const percentage = maxScore > 0 ? ((totalScore / maxScore) * 100).toFixed(1) : 0; 
-                scoreTextEl.textContent = `您的總得分：${{totalScore.toFixed(1)}} / ${{maxScore.toFixed(1)}} 分 (${{percentage}}%)`; 
-            }} catch (error) {{ 
-                showError(`顯示結果時發生錯誤：${{error.message}}`); 
-            }}
-        }}
-        
-        function restartQuiz() {{ 
-            try {{ 
+                scoreTextEl.textContent = `您的總得分：${totalScore.toFixed(1)} / ${maxScore.toFixed(1)} 分 (${percentage}%)`; 
+                seedTextEl.textContent = `本次出題種子：${currentQuiz.seed} (在綜合練習輸入相同種子、屆別、題數與分層方式即可重現)`; 
+                recordAttempt(maxScore); 
+                renderReviewChunk(0, ++reviewRenderToken); 
+            } catch (error) { 
+                showError(`顯示結果時發生錯誤：${error.message}`); 
+            }
+        }
+        
+        // --- Attempt Log (one JSONL record per finished quiz, read by `create_quiz_page.py stats`) ---
+        const attemptRecords = []; 
+        const attemptSubscribers = new Set(); 
+        let exportedAttempts = 0; 
+
+        // responses: [exam_id, question_number, chosen option id or null, correct option id, points]
+        function recordAttempt(maxScore) { 
+            const responses = []; 
+            for (let index = 0; index < quizLength(); index++) { 
+                const question = quizQuestion(index); 
+                const examId = currentQuiz.exams[quizExamIndex(index)].exam_id; 
+                const answer = userAnswers[index] === undefined ? null : userAnswers[index]; 
+                responses.push([examId, question.id, answer, question.answer, question.points]); 
+            }
+            const record = { 
+                v: 1, 
+                attempt_id: `${Date.now().toString(36)}-${seedFromText('').toString(36)}`, 
+                finished_at: new Date().toISOString(), 
+                mode: currentQuiz.mode, 
+                title: currentQuiz.title, 
+                exam_ids: currentQuiz.exams.map(exam => exam.exam_id), 
+                seed: currentQuiz.seed, 
+                score: totalScore, 
+                max_score: maxScore, 
+                responses 
+            }; 
+            attemptRecords.push(record); 
+            // one transaction stores the attempt and drops the finished session
+            pendingAttempts.push(record); 
+            saveSessionNow(); 
+            attemptSubscribers.forEach(callback => { 
+                try { 
+                    callback(record); 
+                } catch (error) { 
+                    console.error('quizAttemptLog subscriber failed:', error); 
+                }
+            });
+        }
+
+        function attemptsJsonl(records) { 
+            return records.map(record => JSON.stringify(record) + '\\n').join(''); 
+        }
+
+        // Each export holds only the attempts finished since the previous one, so exported
+        // files are shards that can be aggregated together without counting an attempt twice.
+        function exportAttempts() { 
+            const records = attemptRecords.slice(exportedAttempts); 
+            if (records.length === 0) { 
+                showError("沒有尚未匯出的作答紀錄。"); 
+                return; 
+            }
+            hideError(); 
+            const blob = new Blob([attemptsJsonl(records)], { type: 'application/x-ndjson' }); 
+            const link = document.createElement('a'); 
+            link.href = URL.createObjectURL(blob); 
+            link.download = `quiz-attempts-${new Date().toISOString().replace(/[:.]/g, '-')}.jsonl`; 
+            document.body.appendChild(link); 
+            link.click(); 
+            link.remove(); 
+            setTimeout(() => URL.revokeObjectURL(link.href), 0); 
+            exportedAttempts = attemptRecords.length; 
+        }
+
+        window.quizAttemptLog = { 
+            records() { 
+                return attemptRecords.slice(); 
+            },
+            jsonl() { 
+                return attemptsJsonl(attemptRecords); 
+            },
+            subscribe(callback) { 
+                attemptSubscribers.add(callback); 
+                return () => attemptSubscribers.delete(callback); 
+            },
+            // Attempts kept in IndexedDB across reloads, newest first (see Saved Sessions)
+            history(limit = ATTEMPT_HISTORY_LIMIT) { 
+                return readAttemptHistory(limit); 
+            }
+        };
+        // --- End Attempt Log ---
+
+        // --- Saved Sessions (IndexedDB: the running quiz, so a reload resumes it, and the attempt history) ---
+        // Answering a question only marks the session dirty; at most one transaction per
+        // SESSION_SAVE_DELAY ms, or as soon as the page is hidden, writes it together with any
+        // finished attempts. Without IndexedDB (or if it fails) the page works as before, unsaved.
+        const QUIZ_DB_NAME = 'quiz-page';
+        const SESSION_SAVE_DELAY = 1000;
+        const ATTEMPT_HISTORY_LIMIT = 500;
+        const sessionKey = location.pathname || '/'; // pages on the same origin keep separate sessions
+        const pendingAttempts = [];
+        let sessionDirty = false;
+        let sessionSaveTimer = null;
+        const quizDb = openQuizDb();
+
+        function openQuizDb() {
+            return new Promise(resolve => {
+                const request = indexedDB.open(QUIZ_DB_NAME, 1);
+                request.onupgradeneeded = () => {
+                    const db = request.result;
+                    db.createObjectStore('sessions', { keyPath: 'page' });
+                    db.createObjectStore('attempts', { keyPath: 'attempt_id' }).createIndex('finished_at', 'finished_at');
+                };
+                request.onsuccess = () => resolve(request.result);
+                request.onerror = () => {
+                    console.warn('IndexedDB is unavailable, quiz progress will not be saved:', request.error);
+                    resolve(null);
+                };
+            }).catch(error => {
+                // indexedDB is missing or throws (e.g. storage disabled)
+                console.warn('IndexedDB is unavailable, quiz progress will not be saved:', error);
+                return null;
+            });
+        }
+
+        function requestResult(request) {
+            return new Promise((resolve, reject) => {
+                request.onsuccess = () => resolve(request.result);
+                request.onerror = () => reject(request.error);
+            });
+        }
+
+        // The drawn quiz is stored as exam ids and the index order, never as question copies
+        function sessionRecord() {
+            return {
+                page: sessionKey,
+                saved_at: new Date().toISOString(),
+                mode: currentQuiz.mode,
+                title: currentQuiz.title,
+                seed: currentQuiz.seed,
+                exam_ids: currentQuiz.exams.map(exam => exam.exam_id),
+                question_counts: currentQuiz.exams.map(exam => exam.questions.length),
+                order: currentQuiz.order,
+                index: currentQuestionIndex,
+                answers: userAnswers
+            };
+        }
+
+        function scheduleSessionSave() {
+            sessionDirty = true;
+            if (sessionSaveTimer === null) {
+                sessionSaveTimer = setTimeout(flushSavedState, SESSION_SAVE_DELAY);
+            }
+        }
+
+        function saveSessionNow() {
+            sessionDirty = true;
+            return flushSavedState();
+        }
+
+        // Writes the session (or deletes it when no quiz is in progress) and the pending attempts in one transaction
+        function flushSavedState() {
+            clearTimeout(sessionSaveTimer);
+            sessionSaveTimer = null;
+            if (!sessionDirty && pendingAttempts.length === 0) {
+                return Promise.resolve();
+            }
+            // the snapshot is taken now; put() clones it, so later answers can't leak into this write
+            const session = !sessionDirty ? undefined :
+                currentQuiz && currentQuestionIndex < quizLength() ? sessionRecord() : null;
+            const attempts = pendingAttempts.splice(0);
+            sessionDirty = false;
+            return quizDb.then(db => {
+                if (!db) {
+                    return;
+                }
+                return new Promise((resolve, reject) => {
+                    const transaction = db.transaction(['sessions', 'attempts'], 'readwrite');
+                    const sessions = transaction.objectStore('sessions');
+                    if (session) {
+                        sessions.put(session);
+                    } else if (session === null) {
+                        sessions.delete(sessionKey);
+                    }
+                    if (attempts.length > 0) {
+                        const store = transaction.objectStore('attempts');
+                        attempts.forEach(record => store.put(record));
+                        evictOldAttempts(store);
+                    }
+                    transaction.oncomplete = () => resolve();
+                    transaction.onerror = transaction.onabort = () => reject(transaction.error);
+                });
+            }).catch(error => {
+                console.warn('Saving quiz progress failed:', error);
+            });
+        }
+
+        // Keeps the newest ATTEMPT_HISTORY_LIMIT attempts (finished_at is an ISO timestamp, so it sorts by time)
+        function evictOldAttempts(store) {
+            const countRequest = store.count();
+            countRequest.onsuccess = () => {
+                let excess = countRequest.result - ATTEMPT_HISTORY_LIMIT;
+                if (excess <= 0) {
+                    return;
+                }
+                const cursorRequest = store.index('finished_at').openCursor();
+                cursorRequest.onsuccess = () => {
+                    const cursor = cursorRequest.result;
+                    if (cursor && excess-- > 0) {
+                        cursor.delete();
+                        cursor.continue();
+                    }
+                };
+            };
+        }
+
+        function readAttemptHistory(limit) {
+            return flushSavedState().then(() => quizDb).then(db => {
+                if (!db) {
+                    return [];
+                }
+                return new Promise((resolve, reject) => {
+                    const records = [];
+                    const index = db.transaction('attempts').objectStore('attempts').index('finished_at');
+                    const cursorRequest = index.openCursor(null, 'prev');
+                    cursorRequest.onsuccess = () => {
+                        const cursor = cursorRequest.result;
+                        if (cursor && records.length < limit) {
+                            records.push(cursor.value);
+                            cursor.continue();
+                        } else {
+                            resolve(records);
+                        }
+                    };
+                    cursorRequest.onerror = () => reject(cursorRequest.error);
+                });
+            });
+        }
+
+        // Reopens the quiz interrupted by a reload, unless the page's exams changed since it was saved
+        function resumeSession() {
+            return quizDb.then(db => db && requestResult(db.transaction('sessions').objectStore('sessions').get(sessionKey)))
+                .then(session => {
+                    if (!session || currentQuiz) {
+                        return;
+                    }
+                    const examIndexes = session.exam_ids.map(examId => quizManifest.findIndex(entry => entry.exam_id === examId));
+                    if (examIndexes.includes(-1)) {
+                        saveSessionNow(); // no quiz is running, so this deletes the stale session
+                        return;
+                    }
+                    return Promise.all(examIndexes.map(loadExam)).then(exams => {
+                        if (currentQuiz) {
+                            return;
+                        }
+                        const offsets = poolOffsets(exams);
+                        const order = Uint32Array.from(session.order);
+                        if (exams.some((exam, e) => exam.questions.length !== session.question_counts[e]) ||
+                            order.some(pooled => pooled >= offsets[exams.length]) ||
+                            session.answers.length !== order.length || !(session.index < order.length)) {
+                            saveSessionNow();
+                            return;
+                        }
+                        beginQuiz({ title: session.title, seed: session.seed, exams, offsets, order }, session.mode, session);
+                    });
+                }).catch(error => {
+                    console.warn('Resuming the saved quiz failed:', error);
+                });
+        }
+
+        document.addEventListener('visibilitychange', () => {
+            if (document.visibilityState === 'hidden') {
+                flushSavedState();
+            }
+        });
+        window.addEventListener('pagehide', flushSavedState);
+        // --- End Saved Sessions ---
+
+        function restartQuiz() { 
+            try { 
                 hideError(); 
                 resultsAreaDiv.style.display = 'none'; 
                 questionAreaDiv.style.display = 'none'; 
                 examSelectionDiv.style.display = 'block'; 
                 examSelector.value = ""; 
+                reviewRenderToken++; 
+                reviewAreaEl.innerHTML = ''; 
                 
-                currentExamData = null; 
+                currentQuiz = null; 
                 currentQuestionIndex = 0; 
                 userAnswers = []; 
                 totalScore = 0; 
-            }} catch (error) {{ 
-                showError(`重置測驗時發生錯誤：${{error.message}}`); 
-            }}
-        }}
-
-        document.addEventListener('DOMContentLoaded', function() {{ 
-            try {{ 
-                populateExamSelector(); 
-            }} catch (error) {{ 
-                showError(`初始化應用程式時發生錯誤：${{error.message}}`); 
-            }}
-        }});
+                saveSessionNow(); // an abandoned quiz must not come back on the next load
+            } catch (error) { 
+                showError(`重置測驗時發生錯誤：${error.message}`); 
+            }
+        }
+
+        document.addEventListener('DOMContentLoaded', function() { 
+            try { 
+                measured('quiz:populate', populateExamSelector); 
+                resumeSession(); 
+            } catch (error) { 
+                showError(`初始化應用程式時發生錯誤：${error.message}`); 
+            }
+        });
         
         startQuizBtn.addEventListener('click', startQuiz); 
+        startPracticeBtn.addEventListener('click', startPractice); 
+        searchInputEl.addEventListener('input', runSearch); 
         nextQuestionBtn.addEventListener('click', processNextQuestion); 
         restartQuizBtn.addEventListener('click', restartQuiz); 
+        abandonQuizBtn.addEventListener('click', restartQuiz); 
+        exportAttemptsBtn.addEventListener('click', exportAttempts); 
 
-        document.addEventListener('keydown', function(event) {{ 
-            if (questionAreaDiv.style.display !== 'none') {{ 
-                if (event.key >= '1' && event.key <= '9') {{ 
-                    const optionIndex = parseInt(event.key) - 1; 
-                    const options = optionsContainerEl.querySelectorAll('input[type="radio"]'); 
-                    if (options[optionIndex]) {{ 
-                        options[optionIndex].checked = true; 
-                        options[optionIndex].dispatchEvent(new Event('change')); 
-                    }}
-                }}
-                else if (event.key === 'Enter' || event.key === ' ') {{ 
+        document.addEventListener('keydown', function(event) { 
+            if (questionAreaDiv.style.display !== 'none') { 
+                if (event.key >= '1' && event.key <= '9') { 
+                    selectOption(parseInt(event.key) - 1); 
+                }
+                else if (event.key === 'Enter' || event.key === ' ') { 
                     event.preventDefault(); 
                     processNextQuestion(); 
-                }}
-            }}
-        }});
+                }
+            }
+        });
+
+        if (quizConfig.service_worker && 'serviceWorker' in navigator && location.protocol.startsWith('http')) {
+            // The worker precaches the page and exam chunks, so repeat visits load without the network
+            window.addEventListener('load', () => {
+                navigator.serviceWorker.register(quizConfig.service_worker).catch(error => {
+                    console.warn('Service worker registration failed:', error);
+                });
+            });
+        }
 
     </script>
 </body>
-</html>""" #
-    
-    return html_content #
+</html>"""
 
-def main(): #
-    """Main function to handle file operations and error reporting.""" #
+_SERVICE_WORKER_TEMPLATE = """// Generated by create_quiz_page.py: serves the quiz page and its exam chunks from a precache.
+const PRECACHE_VERSION = %%VERSION%%;
+const MANIFEST_URL = new URL(%%MANIFEST%%, self.location).href;
+const CACHE_NAME = 'quiz-precache:' + new URL('./', self.location).pathname;
+let entriesPromise = null;
+
+// Cache entries are keyed by URL and content hash: a file that didn't change keeps its entry across versions
+function versionedKey(url, hash) {
+    return `${url}?precache=${hash}`;
+}
+
+function hexDigest(buffer) {
+    return crypto.subtle.digest('SHA-256', buffer).then(digest =>
+        Array.from(new Uint8Array(digest), byte => byte.toString(16).padStart(2, '0')).join(''));
+}
+
+// URL -> cache key of every file in the manifest this worker was installed with
+function loadEntries() {
+    if (!entriesPromise) {
+        entriesPromise = caches.open(CACHE_NAME)
+            .then(cache => cache.match(versionedKey(MANIFEST_URL, PRECACHE_VERSION)))
+            .then(response => response ? response.json() : {files: []})
+            .then(manifest => {
+                const entries = new Map();
+                manifest.files.forEach(file => {
+                    const url = new URL(file.url, MANIFEST_URL).href;
+                    entries.set(url, versionedKey(url, file.hash));
+                    // the directory URL is the page only where the web server makes it so, i.e. for index.html
+                    if (file.url === 'index.html') {
+                        entries.set(new URL('./', MANIFEST_URL).href, versionedKey(url, file.hash));
+                    }
+                });
+                return entries;
+            });
+    }
+    return entriesPromise;
+}
+
+self.addEventListener('install', event => {
+    event.waitUntil((async () => {
+        const cache = await caches.open(CACHE_NAME);
+        const response = await fetch(MANIFEST_URL, {cache: 'no-store'});
+        if (!response.ok) {
+            throw new Error(`${MANIFEST_URL}: HTTP ${response.status}`);
+        }
+        const manifest = await response.clone().json();
+        if (manifest.version !== PRECACHE_VERSION) {
+            throw new Error(`${MANIFEST_URL}: expected version ${PRECACHE_VERSION}, got ${manifest.version}`);
+        }
+        // Only files whose hash changed are downloaded; a file that doesn't match its hash fails the install
+        await Promise.all(manifest.files.map(async file => {
+            const url = new URL(file.url, MANIFEST_URL).href;
+            const key = versionedKey(url, file.hash);
+            if (await cache.match(key)) {
+                return;
+            }
+            const fileResponse = await fetch(url, {cache: 'no-cache'});
+            if (!fileResponse.ok) {
+                throw new Error(`${url}: HTTP ${fileResponse.status}`);
+            }
+            const body = await fileResponse.arrayBuffer();
+            if (await hexDigest(body) !== file.hash) {
+                throw new Error(`${url}: content doesn't match the precache manifest`);
+            }
+            const headers = {'Content-Type': fileResponse.headers.get('Content-Type') || file.type};
+            await cache.put(key, new Response(body, {headers}));
+        }));
+        await cache.put(versionedKey(MANIFEST_URL, PRECACHE_VERSION), response);
+    })());
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil((async () => {
+        const cache = await caches.open(CACHE_NAME);
+        const keep = new Set((await loadEntries()).values());
+        keep.add(versionedKey(MANIFEST_URL, PRECACHE_VERSION));
+        const stale = (await cache.keys()).filter(request => !keep.has(request.url));
+        await Promise.all(stale.map(request => cache.delete(request)));
+    })());
+});
+
+self.addEventListener('fetch', event => {
+    const url = new URL(event.request.url);
+    if (event.request.method !== 'GET' || url.origin !== self.location.origin) {
+        return;
+    }
+    url.search = '';
+    url.hash = '';
+    event.respondWith(loadEntries().then(entries => {
+        const key = entries.get(url.href);
+        if (!key) {
+            return fetch(event.request);
+        }
+        return caches.open(CACHE_NAME)
+            .then(cache => cache.match(key))
+            .then(response => response || fetch(event.request));
+    }));
+});
+"""
+
+_SLOT_PATTERN = re.compile(r'%%([A-Z_]+)%%')
+_TEMPLATE_PARTS = _SLOT_PATTERN.split(_PAGE_TEMPLATE) # even indexes: static text, odd indexes: slot names
+# the same split with the static text already encoded as UTF-8, shared by every render_page call
+_TEMPLATE_SEGMENTS = tuple(part.encode('utf-8') if index % 2 == 0 else part for index, part in enumerate(_TEMPLATE_PARTS))
+
+_WRITE_BUFFER_SIZE = 64 * 1024
+
+SPLIT_MODES = ('inline', 'files')
+ENCODINGS = ('json', 'compact')
+_EXAM_ID_PATTERN = re.compile(r'^[0-9A-Za-z_.-]+$')
+_INT_PATTERN = re.compile(r'\s*([+-]?\d+)')
+
+SCORING_INFO = "第1-40題每題1.5分，第41-60題每題2分"
+MISSING_QUESTION_TEXT = "題目文字遺失"
+
+# ASCII words, or runs of CJK ideographs and kana; everything else separates tokens
+_SEARCH_RUN_PATTERN = re.compile(r'[0-9a-z]+|[\u3040-\u30ff\u3400-\u9fff\uf900-\ufaff]+')
+
+@dataclass(frozen=True)
+class PageOptions:
+    """
+    Options that change the generated page.
+
+    split: None embeds every exam in quizExamData; 'inline' embeds a manifest plus one
+        non-executed <script type="application/json" id="exam-..."> block per exam;
+        'files' embeds only the manifest and fetches chunk_dir/exam-<id>.json on demand.
+    chunk_dir: URL of the sidecar chunk directory relative to the page (split='files').
+    encoding: 'json' serializes exams as plain objects; 'compact' uses positional
+        question tuples and a per-exam string table (see encode_exam_compact).
+    search: embed an inverted index over every question for the page's search box
+        (see build_search_index). Off by default: the index is about as large as
+        the exam data it covers.
+    duplicate_groups: near-duplicate question groups, each a tuple of (exam_id,
+        question_number) pairs (see quiz_dedupe); practice sampling draws at most
+        one question per group.
+    service_worker: file name of a service worker written next to the page (see
+        write_service_worker); the page registers it when served over http(s).
+    minify: strip comments and whitespace from the template's CSS and JavaScript
+        (and the service worker's) with quiz_minify; exam data is unaffected.
+    compress: replace each exam's JSON with a JSON string holding its deflated
+        (zlib) UTF-8, base64-encoded (see compress_payload); the page inflates it
+        with DecompressionStream. For hosts that don't compress responses.
+    prerender: render the exam selector options, the practice exam checkboxes and
+        a <noscript> preview of each exam's first question into the HTML, so they
+        show before the script runs. Every fragment is then read before the page
+        is written (see iter_html_for_fragments).
+    """
+    split: Optional[str] = None
+    chunk_dir: str = 'quiz-data'
+    encoding: str = 'json'
+    search: bool = False
+    duplicate_groups: tuple = ()
+    service_worker: Optional[str] = None
+    minify: bool = False
+    compress: bool = False
+    prerender: bool = False
+
+class QuizDataError(ValueError):
+    """Raised when quiz data fails build-time validation; issues holds every problem found."""
+
+    def __init__(self, issues):
+        self.issues = issues
+        errors = [issue for issue in issues if issue['severity'] == 'error']
+        summary = errors[0]['message'] if errors else "invalid quiz data"
+        if len(errors) > 1:
+            summary += f" (另有 {len(errors) - 1} 個錯誤)"
+        super().__init__(summary)
+
+def _issue(severity, message, exam_id=None, question_index=None, question_number=None):
+    return {
+        'severity': severity,
+        'exam_id': exam_id,
+        'question_index': question_index,
+        'question_number': question_number,
+        'message': message,
+    }
+
+def _parse_int(value):
+    """Mirrors JavaScript parseInt for the values found in quiz data: ints and digit strings."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        if value.isascii() and value.isdigit():
+            return int(value)
+        match = _INT_PATTERN.match(value)
+        if match:
+            return int(match.group(1))
+    return None
+
+def _question_number(value):
+    """A question_number as process_exam keeps it: ints, floats and digit strings (as ints), else None."""
+    if isinstance(value, str) and value.strip().isascii() and value.strip().isdigit():
+        return int(value)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return value
+
+def question_points(question_number):
+    """Questions 41-60 are worth 2 points, every other question 1.5."""
+    return 2.0 if 41 <= question_number <= 60 else 1.5
+
+def process_exam(exam_key, exam, source_indexes=None):
+    """
+    Normalizes one raw exam from quiz_data.json into the structure the page uses,
+    assigns points and validates it.
+
+    Returns (processed_exam, issues). processed_exam is None when the exam has no
+    usable questions; questions without options are dropped with a warning, and
+    so are those whose question_number isn't a number or a string of digits
+    (digit strings become ints). A question_number used twice is an error.
+    source_indexes, if given, is a list that receives the position in
+    exam['questions'] of every question kept, in order.
+    """
+    issues = []
+    if not isinstance(exam, dict) or not isinstance(exam.get('questions'), list):
+        issues.append(_issue('warning', f'Exam "{exam_key}" has no questions or questions are not an array.', exam_key))
+        return None, issues
+
+    title = _exam_title(exam_key, exam)
+    questions = []
+    numbers = set()
+    for index, q in enumerate(exam['questions']):
+        where = f'測驗 "{title}" 第 {index + 1} 題'
+        if not isinstance(q, dict):
+            issues.append(_issue('error', f'{where}缺少必要資訊 (ID or text)', exam_key, index))
+            continue
+        if 'question_number' not in q:
+            issues.append(_issue('error', f'{where}缺少必要資訊 (ID or text)', exam_key, index))
+            continue
+        question_number = _question_number(q['question_number'])
+        if question_number is None:
+            # the page used to show these as they were; skipped so that ids stay numeric
+            issues.append(_issue('warning', f"{where}的題號 {q['question_number']!r} 不是數字，已略過",
+                                 exam_key, index, q['question_number']))
+            continue
+        text = q.get('question_text') or MISSING_QUESTION_TEXT
+        if not isinstance(text, str):
+            issues.append(_issue('error', f'{where}缺少必要資訊 (ID or text)', exam_key, index, question_number))
+            continue
+
+        raw_options = q.get('options')
+        if not isinstance(raw_options, dict) or not raw_options:
+            issues.append(_issue('warning', f'Question {question_number} in exam "{exam_key}" has invalid options.',
+                                 exam_key, index, question_number))
+            continue
+        options = []
+        for option_key, option_text in raw_options.items():
+            option_id = _parse_int(option_key)
+            if option_id is None or not isinstance(option_text, str):
+                issues.append(_issue('error', f'{where}的選項 {option_key!r} 無效', exam_key, index, question_number))
+                continue
+            options.append({'option_id': option_id, 'text': option_text})
+
+        answer = _parse_int(q.get('answer'))
+        if answer is None:
+            issues.append(_issue('error', f'{where}缺少正確答案(或非數字格式)', exam_key, index, question_number))
+            continue
+        if answer not in {option['option_id'] for option in options}:
+            issues.append(_issue('error', f'{where}的正確答案 ({answer}) 不在選項中', exam_key, index, question_number))
+            continue
+
+        if question_number in numbers:
+            # answers are graded and reported by question number, which must identify one question
+            issues.append(_issue('error', f'{where}的題號 {question_number} 重複', exam_key, index, question_number))
+            continue
+        numbers.add(question_number)
+        if source_indexes is not None:
+            source_indexes.append(index)
+        questions.append({
+            'id': question_number,
+            'text': text,
+            'options': options,
+            'answer': answer,
+            'points': question_points(question_number),
+        })
+
+    if not questions:
+        issues.append(_issue('warning', f'測驗 "{title}" 沒有題目或題目列表無效', exam_key))
+        return None, issues
+
+    return {
+        'exam_id': exam_key,
+        'title': title,
+        'scoring_info': SCORING_INFO,
+        'questions': questions,
+        'answer_sheet_source_id': f"Exam {exam_key} data",
+    }, issues
+
+def process_quiz_data(quiz_data):
+    """
+    Normalizes and validates every exam in quiz_data.
+
+    Returns (exams, issues): the processed exams in source order and a list of
+    issue dicts with severity ('error' or 'warning'), exam_id, question_index,
+    question_number and message.
+    """
+    _check_quiz_data(quiz_data)
+
+    exams = []
+    issues = []
+    for exam_key, exam in quiz_data.items():
+        processed, exam_issues = process_exam(exam_key, exam)
+        issues.extend(exam_issues)
+        if processed is not None:
+            exams.append(processed)
+    if not exams:
+        issues.append(_issue('error', '所有原始測驗資料轉換後均無效或沒有題目。請檢查 quiz_data.json 的內容與結構。'))
+    return exams, issues
+
+def _check_quiz_file(quiz_file):
+    """
+    Reads quiz_file one exam at a time and raises QuizDataError (or the parse
+    errors of iter_quiz_exams) for what would fail its build, rendering nothing.
+    """
+    issues = []
+    usable = False
+    with open(quiz_file, 'r', encoding='utf-8') as fp:
+        for exam_key, raw_exam in iter_quiz_exams(fp):
+            exam, exam_issues = process_exam(exam_key, raw_exam)
+            issues.extend(exam_issues)
+            usable = usable or exam is not None
+    if not usable:
+        issues.append(_issue('error', '所有原始測驗資料轉換後均無效或沒有題目。請檢查 quiz_data.json 的內容與結構。'))
+    if any(issue['severity'] == 'error' for issue in issues):
+        raise QuizDataError(issues)
+
+def validate_quiz_data(quiz_data):
+    """Returns the list of build-time validation issues for quiz_data (empty when valid)."""
+    return process_quiz_data(quiz_data)[1]
+
+def prepare_exams(quiz_data):
+    """Returns the processed exams, raising QuizDataError if validation finds any error."""
+    exams, issues = process_quiz_data(quiz_data)
+    if any(issue['severity'] == 'error' for issue in issues):
+        raise QuizDataError(issues)
+    return exams
+
+def _exam_title(exam_key, exam):
+    exam_number = exam.get('exam_number')
+    if not exam_number:
+        try:
+            exam_number = int(exam_key)
+        except ValueError:
+            exam_number = exam_key
+    return f"第 {exam_number} 屆金融科技力知識檢定測驗"
+
+def _manifest_entry(exam):
+    return {'exam_id': exam['exam_id'], 'title': exam['title'], 'question_count': len(exam['questions'])}
+
+def _exam_preview(exam):
+    """The first question of a processed exam, as a prerendered page shows it (see PageOptions.prerender)."""
+    question = exam['questions'][0]
+    return {'id': question['id'], 'text': question['text'], 'points': question['points'],
+            'options': [[option['option_id'], option['text']] for option in question['options']]}
+
+def _fragment_entry(exam, options):
+    entry = _manifest_entry(exam)
+    if options.prerender:
+        entry['preview'] = _exam_preview(exam)
+    return entry
+
+def build_exam_manifest(exams):
+    """Returns the small per-exam index embedded in every page: exam id, title and question count."""
+    return [_manifest_entry(exam) for exam in exams]
+
+def encode_exam_compact(exam):
+    """
+    Encodes a processed exam for the 'compact' payload encoding.
+
+    Every question becomes a tuple [id, text, options, answer, points] where text
+    and each option are indexes into the exam's "strings" table, so repeated texts
+    are stored once. Option ids are implied by position (1, 2, ...); when they are
+    not, the tuple gets a sixth element listing them. The page's decodeExam
+    reverses this.
+    """
+    strings = []
+    string_index = {}
+
+    def intern(text):
+        index = string_index.get(text)
+        if index is None:
+            index = string_index[text] = len(strings)
+            strings.append(text)
+        return index
+
+    questions = []
+    for question in exam['questions']:
+        options = question['options']
+        entry = [
+            question['id'],
+            intern(question['text']),
+            [intern(option['text']) for option in options],
+            question['answer'],
+            question['points'],
+        ]
+        option_ids = [option['option_id'] for option in options]
+        if option_ids != list(range(1, len(options) + 1)):
+            entry.append(option_ids)
+        questions.append(entry)
+
+    return {
+        'exam_id': exam['exam_id'],
+        'title': exam['title'],
+        'scoring_info': exam['scoring_info'],
+        'answer_sheet_source_id': exam['answer_sheet_source_id'],
+        'strings': strings,
+        'questions': questions,
+    }
+
+def _encode_exam(exam, options):
+    return encode_exam_compact(exam) if options.encoding == 'compact' else exam
+
+def compress_payload(payload):
+    """
+    Returns an exam's serialized JSON as a JSON string literal of its deflated
+    (zlib, level 9) UTF-8 bytes in base64. Each exam is compressed on its own so
+    the page still inflates only the exams it opens.
+    """
+    return '"' + base64.b64encode(zlib.compress(payload.encode('utf-8'), 9)).decode('ascii') + '"'
+
+def _serialize_exam(exam, options, encoder):
+    payload = _iter_script_json(_encode_exam(exam, options), encoder)
+    return compress_payload(''.join(payload)) if options.compress else payload
+
+def search_tokens(text):
+    """
+    Splits text into search tokens: NFKC-normalized, lower-cased ASCII words and
+    the overlapping character bigrams of each CJK run (a one-character run is its
+    own token). The page's searchTokens must stay in sync with this.
+    """
+    tokens = []
+    for run in _SEARCH_RUN_PATTERN.findall(unicodedata.normalize('NFKC', text).lower()):
+        if run[0] < '\x80' or len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+def exam_search_terms(exam):
+    """
+    Returns the postings of one processed exam: {token: [question_index * 2 + in_text, ...]}
+    where in_text is 1 when the token occurs in the question text and 0 when it
+    only occurs in its options.
+    """
+    terms = {}
+    for index, question in enumerate(exam['questions']):
+        fields = dict.fromkeys(search_tokens(question['text']), 1)
+        for option in question['options']:
+            for token in search_tokens(option['text']):
+                fields.setdefault(token, 0)
+        for token, in_text in fields.items():
+            terms.setdefault(token, []).append(index * 2 + in_text)
+    return terms
+
+def build_search_index(exam_terms):
+    """
+    Merges per-exam postings into the index embedded in the page.
+
+    exam_terms is an iterable of (question_count, terms) in manifest order; a
+    question's document number is its position across all exams. Each token maps
+    to its documents in ascending order, delta-encoded as
+    (doc - previous_doc) * 2 + in_text so the numbers stay small.
+    """
+    postings = {}
+    doc_count = 0
+    for question_count, terms in exam_terms:
+        for token, entries in terms.items():
+            postings.setdefault(token, []).extend(doc_count * 2 + entry for entry in entries)
+        doc_count += question_count
+    # tokens are sorted so the index doesn't depend on which exam a token was first seen in
+    return {'docs': doc_count, 'terms': {token: encode_postings(postings[token]) for token in sorted(postings)}}
+
+def encode_postings(entries):
+    """Delta-encodes one token's postings (doc * 2 + in_text, ascending by doc) as build_search_index does."""
+    previous = 0
+    encoded = []
+    for entry in entries:
+        doc = entry >> 1
+        encoded.append((doc - previous) * 2 + (entry & 1))
+        previous = doc
+    return encoded
+
+def _iter_script_json(value, encoder):
+    """
+    Serializes value for embedding inside a <script> element. '<' is escaped so
+    the data can never close the element early.
+    """
     try: #
-        quiz_file = Path('quiz_data.json') #
-        
-        if not quiz_file.exists(): #
-            raise FileNotFoundError(f"找不到測驗資料檔案：{quiz_file}") #
-        
-        with quiz_file.open('r', encoding='utf-8') as f: #
-            quiz_data = json.load(f) #
-        
-        html_output = create_html_quiz_page(quiz_data) #
-        
-        if hasattr(sys.stdout, 'reconfigure'): #
-            sys.stdout.reconfigure(encoding='utf-8') #
-        
-        print(html_output) #
-        
-    except FileNotFoundError as e: #
-        error_message = ( #
-            f"錯誤：{str(e)}\n"
+        for chunk in encoder.iterencode(value):
+            yield chunk.replace('<', '\\u003c') if '<' in chunk else chunk
+    except (TypeError, ValueError) as e: #
+        raise ValueError(f"Cannot serialize quiz data to JSON: {e}") #
+
+def _page_config(options):
+    config = {'chunks': options.split or 'embedded', 'encoding': options.encoding}
+    if options.split == 'files':
+        config['chunk_dir'] = options.chunk_dir
+    if options.duplicate_groups:
+        config['duplicate_groups'] = options.duplicate_groups
+    if options.service_worker:
+        config['service_worker'] = options.service_worker
+    if options.compress:
+        config['compression'] = 'deflate'
+    if options.prerender:
+        config['prerendered'] = True
+    return config
+
+def _exam_label(entry):
+    return f"{html.escape(entry['title'])} ({entry['question_count']} 題)"
+
+def _render_exam_options(entries):
+    """The exam selector's <option>s, as the page's buildExamLists creates them."""
+    return ''.join(f'<option value="{index}">{_exam_label(entry)}</option>' for index, entry in enumerate(entries))
+
+def _render_practice_exams(entries):
+    return ''.join(f'<label><input type="checkbox" value="{index}" checked> {_exam_label(entry)}</label>'
+                   for index, entry in enumerate(entries))
+
+def _render_exam_previews(entries):
+    """A <noscript> block with every exam's first question, for crawlers and clients without JavaScript."""
+    sections = []
+    for entry in entries:
+        preview = entry['preview']
+        options = ''.join(f'<li>({html.escape(str(option_id))}) {html.escape(text)}</li>'
+                          for option_id, text in preview['options'])
+        sections.append(f'<section class="exam-preview"><h3>{_exam_label(entry)}</h3>'
+                        f"<p>{preview['id']}. {html.escape(preview['text'])} ({preview['points']:.1f}分)</p>"
+                        f'<ul>{options}</ul></section>')
+    return f'    <noscript><div id="exam-previews"><p>作答需要啟用 JavaScript，以下為各測驗的第一題。</p>{"".join(sections)}</div></noscript>\n'
+
+def _check_options(options):
+    if options.encoding not in ENCODINGS:
+        raise ValueError(f"Unknown encoding: {options.encoding!r} (expected one of {', '.join(ENCODINGS)})")
+    if options.split is not None and options.split not in SPLIT_MODES:
+        raise ValueError(f"Unknown split mode: {options.split!r} (expected one of {', '.join(SPLIT_MODES)})")
+    if options.service_worker is not None and not _EXAM_ID_PATTERN.match(options.service_worker):
+        raise ValueError(f"Service worker must be a plain file name next to the page: {options.service_worker!r}")
+
+def iter_html_for_fragments(fragments, options=None, chunk_writer=None, profile=None, search_index=None):
+    """
+    Yields the HTML page for an iterable of exam fragments piece by piece.
+
+    Each fragment is (manifest_entry, payload, search_terms) where payload is the
+    exam's serialized JSON, either a string or an iterable of strings, and
+    search_terms its exam_search_terms (only needed with options.search).
+    Fragments are consumed once, in order, before the manifest and search index
+    are emitted, so they can be produced lazily. With split='files' no exam data
+    goes into the page and chunk_writer(manifest_entry, payload), if given, is
+    called for each fragment. A BuildProfile, if given, times the search index.
+    search_index, if given, is the index already serialized as compact JSON and is
+    embedded as-is instead of being built from the fragments' search_terms.
+    With options.prerender the exam lists come before any exam data in the page,
+    so every fragment is read (and its payload held) before the first piece.
+    """
+    options = options or PageOptions()
+    _check_options(options)
+    yield from _iter_page(fragments, options, chunk_writer, profile or NULL_PROFILE, search_index,
+                          _template_parts(options))
+
+def _iter_page(fragments, options, chunk_writer, profile, search_index, parts):
+    """
+    iter_html_for_fragments with the template parts to fill. Static parts and
+    payload pieces are yielded as given, so they may be bytes (see render_page).
+    """
+    manifest = []
+    exam_terms = []
+    entries = []
+    if options.prerender:
+        # the exam lists come first in the page; the slots below still consume the fragments once
+        fragments = list(fragments)
+        entries = [entry for entry, _payload, _search_terms in fragments]
+        fragments = iter(fragments)
+
+    def consume():
+        for entry, payload, search_terms in fragments:
+            if options.split is not None and not _EXAM_ID_PATTERN.match(entry['exam_id']):
+                raise ValueError(f"Exam key {entry['exam_id']!r} cannot be used as a chunk id in split mode")
+            if options.prerender:
+                entry = {key: value for key, value in entry.items() if key != 'preview'}
+            manifest.append(entry)
+            if options.search and search_index is None:
+                exam_terms.append((entry['question_count'], search_terms))
+            yield entry, ((payload,) if isinstance(payload, str) else payload)
+
+    encoder = json.JSONEncoder(ensure_ascii=False, indent=None)
+    for index, part in enumerate(parts):
+        if index % 2 == 0:
+            yield part
+        elif part == 'EXAM_OPTIONS':
+            yield _render_exam_options(entries)
+        elif part == 'PRACTICE_EXAMS':
+            yield _render_practice_exams(entries)
+        elif part == 'EXAM_PREVIEWS':
+            if options.prerender:
+                yield _render_exam_previews(entries)
+        elif part == 'EXAM_CHUNKS':
+            if options.split == 'inline':
+                for entry, payload in consume():
+                    yield f'    <script type="application/json" id="exam-{entry["exam_id"]}">'
+                    yield from payload
+                    yield '</script>\n'
+        elif part == 'QUIZ_DATA':
+            if options.split is None:
+                yield '{'
+                for position, (entry, payload) in enumerate(consume()):
+                    if position:
+                        yield ', '
+                    yield from _iter_script_json(entry['exam_id'], encoder)
+                    yield ': '
+                    yield from payload
+                yield '}'
+            else:
+                for entry, payload in consume():
+                    if chunk_writer is not None:
+                        chunk_writer(entry, ''.join(payload))
+                yield 'null'
+        elif part == 'EXAM_MANIFEST':
+            yield from _iter_script_json(manifest, encoder)
+        elif part == 'PAGE_CONFIG':
+            yield from _iter_script_json(_page_config(options), encoder)
+        elif part == 'SEARCH_INDEX':
+            if options.search and search_index is not None:
+                yield search_index.replace('<', '\\u003c')
+            elif options.search:
+                # the index is built whole anyway, so the one-shot (C) encoder is used instead of iterencode
+                index_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+                with profile.stage('search_index'):
+                    index = index_encoder.encode(build_search_index(exam_terms)).replace('<', '\\u003c')
+                yield index
+            else:
+                yield 'null'
+        else:
+            raise ValueError(f"Unknown template slot: {part}")
+
+def iter_html_for_exams(exams, options=None):
+    """
+    Yields the HTML page for already processed exams (see prepare_exams) piece by piece.
+
+    Static template parts are yielded as-is and the exam data is serialized with
+    JSONEncoder.iterencode, so the full JSON string is never built in memory.
+    """
+    options = options or PageOptions()
+    encoder = json.JSONEncoder(ensure_ascii=False, indent=None)
+    fragments = (
+        (_fragment_entry(exam, options), _serialize_exam(exam, options, encoder),
+         exam_search_terms(exam) if options.search else None)
+        for exam in exams
+    )
+    return iter_html_for_fragments(fragments, options)
+
+@functools.lru_cache(maxsize=None)
+def _generator_fingerprint():
+    """Hash of this module (template and processing code), part of every cache key."""
+    try:
+        return content_hash(Path(__file__).read_bytes())
+    except OSError:
+        return content_hash(_PAGE_TEMPLATE)
+
+_MINIFIED = {}
+
+def _minified(name, source, cache=None):
+    """
+    source minified with quiz_minify.minify_template, computed once per process.
+    With a BuildCache the result is also stored under 'templates', keyed by the
+    generator and minifier code, so later builds only read it back.
+    """
+    text = _MINIFIED.get(name)
+    if text is not None:
+        return text
+    key = None
+    if cache is not None:
+        key = content_hash('template', name, _generator_fingerprint(), hash_file(quiz_minify.__file__))
+        data = cache.get('templates', key)
+        if data is not None:
+            text = _MINIFIED[name] = data.decode('utf-8')
+            return text
+    text = quiz_minify.minify_template(source) if name == 'page' else quiz_minify.minify_js(source)
+    if key is not None:
+        cache.put('templates', key, text.encode('utf-8'))
+    _MINIFIED[name] = text
+    return text
+
+def _template_parts(options, cache=None):
+    """_TEMPLATE_PARTS, or the same split of the minified template with options.minify."""
+    if not options.minify:
+        return _TEMPLATE_PARTS
+    return _SLOT_PATTERN.split(_minified('page', _PAGE_TEMPLATE, cache))
+
+@functools.lru_cache(maxsize=None)
+def _minified_segments():
+    parts = _template_parts(PageOptions(minify=True))
+    return tuple(part.encode('utf-8') if index % 2 == 0 else part for index, part in enumerate(parts))
+
+def _template_segments(options):
+    """_template_parts(options) with the static text encoded once per process, for render_page."""
+    return _minified_segments() if options.minify else _TEMPLATE_SEGMENTS
+
+def _options_key(options):
+    return json.dumps(dataclasses.asdict(options), sort_keys=True)
+
+def _exam_fragment(exam_key, raw_exam, options, encoder, cache, profile):
+    cache_key = None
+    if cache is not None:
+        with profile.stage('cache'):
+            # not sort_keys: the key order of a question's options is the order the page shows them in
+            cache_key = content_hash('fragment', _generator_fingerprint(), options.encoding, str(options.compress),
+                                     str(options.prerender), str(options.search), exam_key,
+                                     json.dumps(raw_exam, ensure_ascii=False))
+            cached = cache.get('fragments', cache_key)
+            if cached is not None:
+                header, _, payload = cached.decode('utf-8').partition('\n')
+                header = json.loads(header)
+                return header['entry'], header['issues'], payload, header['terms']
+
+    with profile.stage('process'):
+        exam, issues = process_exam(exam_key, raw_exam)
+    entry = _fragment_entry(exam, options) if exam is not None else None
+    with profile.stage('serialize'):
+        payload = ''.join(_serialize_exam(exam, options, encoder)) if exam is not None else ''
+    terms = None
+    if options.search and exam is not None:
+        with profile.stage('search_index'):
+            terms = exam_search_terms(exam)
+    if cache is not None:
+        with profile.stage('cache'):
+            header = json.dumps({'entry': entry, 'issues': issues, 'terms': terms}, ensure_ascii=False)
+            cache.put('fragments', cache_key, f'{header}\n{payload}'.encode('utf-8'))
+    return entry, issues, payload, terms
+
+def _item_flag_issues(exam_key, raw_exam, item_flags):
+    """
+    Warnings for the questions of raw_exam flagged by item analysis (see
+    quiz_analysis.load_item_flags). A flag is dropped once the question's answer
+    key no longer is the one that was analyzed, i.e. after the key was fixed.
+    """
+    if not isinstance(raw_exam, dict) or not isinstance(raw_exam.get('questions'), list):
+        return []
+    title = _exam_title(exam_key, raw_exam)
+    issues = []
+    for index, q in enumerate(raw_exam['questions']):
+        if not isinstance(q, dict):
+            continue
+        question_number = _question_number(q.get('question_number'))
+        flag = item_flags.get((exam_key, question_number)) if question_number is not None else None
+        if flag is None or _parse_int(q.get('answer')) != flag['key']:
+            continue
+        for message in flag['messages']:
+            issues.append(_issue('warning', f'測驗 "{title}" 第 {question_number} 題：{message}',
+                                 exam_key, index, question_number))
+    return issues
+
+def iter_exam_fragments(exam_items, options=None, cache=None, issues=None, profile=None, item_flags=None):
+    """
+    Processes, validates and serializes exams one at a time, yielding
+    (manifest_entry, payload, search_terms) fragments for iter_html_for_fragments.
+
+    exam_items is an iterable of (exam_key, raw_exam) pairs. Every issue found is
+    appended to issues, along with warnings for the questions in item_flags
+    (see _item_flag_issues). Once an exam has an error nothing more is yielded, but the
+    remaining exams are still checked so QuizDataError, raised at the end, reports
+    all of them. With a BuildCache, each exam's fragment is looked up by a hash of
+    the raw exam, the encoding and the generator, so unchanged exams are neither
+    re-processed nor re-serialized. A BuildProfile, if given, times reading
+    exam_items as 'parse' and each step of building the fragments.
+    """
+    options = options or PageOptions()
+    profile = profile or NULL_PROFILE
+    issues = [] if issues is None else issues
+    encoder = json.JSONEncoder(ensure_ascii=False, indent=None)
+    failed = False
+    exam_count = 0
+    for exam_key, raw_exam in profile.iterate('parse', exam_items):
+        entry, exam_issues, payload, terms = _exam_fragment(exam_key, raw_exam, options, encoder, cache, profile)
+        issues.extend(exam_issues)
+        if item_flags:
+            issues.extend(_item_flag_issues(exam_key, raw_exam, item_flags))
+        failed = failed or any(issue['severity'] == 'error' for issue in exam_issues)
+        if entry is not None:
+            exam_count += 1
+            if not failed:
+                yield entry, payload, terms
+    if not exam_count:
+        issues.append(_issue('error', '所有原始測驗資料轉換後均無效或沒有題目。請檢查 quiz_data.json 的內容與結構。'))
+        failed = True
+    if failed:
+        raise QuizDataError(issues)
+
+def _check_quiz_data(quiz_data):
+    if not isinstance(quiz_data, Mapping): #
+        raise ValueError("Quiz data must be a dictionary (keyed by exam number string)") #
+    
+    if not quiz_data: 
+        raise ValueError("Quiz data dictionary is empty")
+
+def iter_html_quiz_page(quiz_data, options=None):
+    """
+    Validates quiz_data and yields its HTML page piece by piece, one exam at a time.
+    quiz_data can be any mapping of exam_id -> raw exam, such as a quiz_store
+    query that reads each exam only when it is reached.
+    Raises QuizDataError (possibly after part of the page was yielded) if an exam is invalid.
+    """
+    _check_quiz_data(quiz_data)
+    return iter_html_for_fragments(iter_exam_fragments(quiz_data.items(), options), options)
+
+def write_chunks(chunks, fp, profile=None):
+    """
+    Writes an iterable of text pieces to fp, gathered into buffers of about
+    64 KiB per write. Returns the number of characters written. A BuildProfile,
+    if given, times producing the pieces as 'render' and the writes as 'write'.
+    """
+    profile = profile or NULL_PROFILE
+    buffer = []
+    buffered = 0
+    written = 0
+    for chunk in profile.iterate('render', chunks):
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= _WRITE_BUFFER_SIZE:
+            with profile.stage('write'):
+                fp.write(''.join(buffer))
+            written += buffered
+            buffer.clear()
+            buffered = 0
+    if buffer:
+        with profile.stage('write'):
+            fp.write(''.join(buffer))
+        written += buffered
+    return written
+
+def write_html_quiz_page(quiz_data, fp, options=None):
+    """Streams the HTML page for quiz_data to the text file object fp. Returns the number of characters written."""
+    return write_chunks(iter_html_quiz_page(quiz_data, options), fp)
+
+def create_html_quiz_page(quiz_data, options=None): #
+    """
+    Generates a single HTML page string for an interactive quiz based on the provided quiz_data.
+    """ #
+    return ''.join(iter_html_quiz_page(quiz_data, options)) #
+
+def write_exam_chunks(exams, directory, options=None):
+    """
+    Writes one exam-<id>.json sidecar file per processed exam into directory,
+    for pages generated with split='files'. Returns the written paths.
+    """
+    options = options or PageOptions(split='files')
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    encoder = json.JSONEncoder(ensure_ascii=False, indent=None)
+    paths = []
+    for exam in exams:
+        path = directory / f"exam-{exam['exam_id']}.json"
+        payload = ''.join(_serialize_exam(exam, options, encoder))
+        write_file_atomically(path, lambda fp, payload=payload: fp.write(payload))
+        paths.append(path)
+    return paths
+
+def write_file_atomically(path, write, binary=False):
+    """
+    Calls write(fp) on a temporary file next to path and renames it into place,
+    so readers never see a half-written file and failed builds leave no output.
+    fp is a UTF-8 text file, or a binary file when binary is true. Missing
+    parent directories are created.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=f'.{path.name}.', suffix='.tmp', dir=path.parent)
+    try:
+        with (os.fdopen(fd, 'wb') if binary else os.fdopen(fd, 'w', encoding='utf-8', newline='')) as fp:
+            result = write(fp)
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp_name, 0o666 & ~umask) # mkstemp creates files as 0600
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+    return result
+
+def write_service_worker(output, options, exam_ids, cache=None):
+    """
+    Writes a precache manifest (<page stem>-precache.json) and the service worker
+    options.service_worker next to the page at output. The manifest lists the
+    page and, with split='files', the chunks of exam_ids, each with the SHA-256
+    of its content; the precache version is a hash over all of them and is baked
+    into the worker, so the browser sees a new worker whenever anything changed.
+    The worker then downloads only the files whose hash changed. With
+    options.minify the worker is minified too (cache as in _template_parts).
+    Only a page named index.html is also served offline for its directory URL
+    (./); any other page works offline at its own URL only.
+    Returns the precache version.
+    """
+    output = Path(output)
+    files = [{'url': output.name, 'hash': hash_file(output), 'type': 'text/html; charset=utf-8'}]
+    if options.split == 'files':
+        for exam_id in exam_ids:
+            url = f'{options.chunk_dir}/exam-{exam_id}.json'
+            files.append({'url': url, 'hash': hash_file(output.parent / url), 'type': 'application/json'})
+    version = content_hash(*(f"{file['url']}:{file['hash']}" for file in files))[:16]
+    manifest_name = f'{output.stem}-precache.json'
+    manifest = {'version': version, 'files': files}
+    # the manifest goes first: a browser that sees the new worker fetches it right away
+    write_file_atomically(output.parent / manifest_name, lambda fp: json.dump(manifest, fp, ensure_ascii=False, indent=1))
+    slots = {'VERSION': json.dumps(version), 'MANIFEST': json.dumps(manifest_name, ensure_ascii=False)}
+    template = _minified('worker', _SERVICE_WORKER_TEMPLATE, cache) if options.minify else _SERVICE_WORKER_TEMPLATE
+    worker = _SLOT_PATTERN.sub(lambda match: slots[match.group(1)], template)
+    write_file_atomically(output.parent / options.service_worker, lambda fp: fp.write(worker))
+    return version
+
+_JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+class _ExamStreamReader:
+    """
+    Reads the top-level {exam_key: exam, ...} object of a quiz data file one
+    member at a time. Only the unread tail of the current exam is buffered; a
+    value that doesn't fit yet is retried after reading twice as much again.
+    """
+
+    def __init__(self, fp, read_size):
+        self.fp = fp
+        self.read_size = read_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.char_offset = 0 # file position of buffer[0], for error messages
+        self.line_offset = 0
+        self.column_offset = 0
+
+    def _read(self, size):
+        data = self.fp.read(size)
+        if data:
+            self.buffer += data
+        else:
+            self.eof = True
+
+    def _compact(self):
+        discarded = self.buffer[:self.pos]
+        last_newline = discarded.rfind('\n')
+        self.line_offset += discarded.count('\n')
+        self.column_offset = len(discarded) - last_newline - 1 if last_newline >= 0 else self.column_offset + len(discarded)
+        self.char_offset += self.pos
+        self.buffer = self.buffer[self.pos:]
+        self.pos = 0
+
+    def _error(self, message, doc=None, pos=None):
+        pos = self.pos if pos is None else pos
+        error = json.JSONDecodeError(message, self.buffer if doc is None else doc, pos)
+        error.pos = pos + self.char_offset
+        if error.lineno == 1:
+            error.colno += self.column_offset
+        error.lineno += self.line_offset
+        error.args = (f"{message}: line {error.lineno} column {error.colno} (char {error.pos})",)
+        return error
+
+    def peek(self):
+        """Skips whitespace and returns the next character ('' at end of file)."""
+        while True:
+            self.pos = _JSON_WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or self.eof:
+                return self.buffer[self.pos:self.pos + 1]
+            self._compact()
+            self._read(self.read_size)
+
+    def expect(self, char, message):
+        if self.peek() != char:
+            raise self._error(message)
+        self.pos += 1
+
+    def decode(self):
+        """Decodes the next complete JSON value, reading more input until it fits."""
+        self.peek()
+        self._compact()
+        read_size = self.read_size
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as e:
+                if self.eof:
+                    raise self._error(e.msg, e.doc, e.pos) from None
+                self._read(read_size)
+                read_size *= 2
+                continue
+            if end == len(self.buffer) and not self.eof:
+                self._read(read_size) # a number at the end of the buffer may be cut short
+                continue
+            self.pos = end
+            return value
+
+def iter_quiz_exams(fp, read_size=_WRITE_BUFFER_SIZE):
+    """
+    Incrementally parses a quiz_data.json text file object and yields
+    (exam_key, raw_exam) pairs in file order, one exam at a time, so memory is
+    bounded by the largest exam rather than the whole bank.
+
+    Raises json.JSONDecodeError (with file positions) for malformed JSON and
+    ValueError when the top level is not a non-empty object or repeats a key.
+    """
+    reader = _ExamStreamReader(fp, read_size)
+    if reader.peek() != '{':
+        reader.decode() # malformed input raises JSONDecodeError here
+        raise ValueError("Quiz data must be a dictionary (keyed by exam number string)") #
+    reader.pos += 1
+    if reader.peek() == '}':
+        raise ValueError("Quiz data dictionary is empty")
+
+    seen = set()
+    while True:
+        if reader.peek() != '"':
+            raise reader._error("Expecting property name enclosed in double quotes")
+        exam_key = reader.decode()
+        if exam_key in seen:
+            raise ValueError(f"測驗資料中的測驗鍵重複：{exam_key!r}")
+        seen.add(exam_key)
+        reader.expect(':', "Expecting ':' delimiter")
+        yield exam_key, reader.decode()
+        separator = reader.peek()
+        reader.pos += 1
+        if separator == '}':
+            break
+        if separator != ',':
+            reader.pos -= 1
+            raise reader._error("Expecting ',' delimiter")
+    if reader.peek():
+        raise reader._error("Extra data")
+
+class _CacheTee:
+    """Text file wrapper that also writes everything, UTF-8 encoded, to a binary cache entry."""
+
+    def __init__(self, fp, cache_fp):
+        self.fp = fp
+        self.cache_fp = cache_fp
+
+    def write(self, text):
+        self.cache_fp.write(text.encode('utf-8'))
+        return self.fp.write(text)
+
+def _write_output(output, write, binary=False):
+    if output is not None:
+        return write_file_atomically(output, write, binary=binary)
+    if hasattr(sys.stdout, 'reconfigure'): #
+        sys.stdout.reconfigure(encoding='utf-8') #
+    if binary:
+        sys.stdout.flush()
+        result = write(sys.stdout.buffer)
+        sys.stdout.buffer.flush()
+    else:
+        result = write(sys.stdout)
+        sys.stdout.flush()
+    return result
+
+def _write_chunk_file(directory, exam_id, payload):
+    write_file_atomically(Path(directory) / f"exam-{exam_id}.json", lambda fp: fp.write(payload))
+
+def _build_from_page_cache(cache, page_key, output, chunk_dir):
+    meta = cache.get('pages', f'{page_key}.meta')
+    page_path = cache.path_if_cached('pages', page_key, count=False) if meta is not None else None
+    if page_path is None:
+        return None
+    meta = json.loads(meta)
+    chunks = []
+    for exam_id, chunk_key in meta['chunks']:
+        payload = cache.get('chunks', chunk_key)
+        if payload is None:
+            return None
+        chunks.append((exam_id, payload))
+    for exam_id, payload in chunks:
+        write_file_atomically(Path(chunk_dir) / f"exam-{exam_id}.json", lambda fp, payload=payload: fp.write(payload), binary=True)
+
+    def copy_page(fp):
+        with page_path.open('rb') as cached_page:
+            shutil.copyfileobj(cached_page, fp, _WRITE_BUFFER_SIZE)
+
+    _write_output(output, copy_page, binary=True)
+    return meta
+
+def build_quiz_page(source, output=None, options=None, cache=None, profile=None, item_flags=None):
+    """
+    Builds the page for the quiz data file source and writes it to the path
+    output, or to stdout when output is None. With split='files' the exam chunks
+    go to options.chunk_dir next to output. The page is streamed to stdout as it
+    is rendered, after a first pass over source that raises for invalid data, so
+    only a write error can leave a partial page there.
+
+    With a BuildCache, a page whose source file, options and generator are
+    unchanged is copied straight from the cache; otherwise only exams whose
+    content changed are re-processed (see iter_exam_fragments).
+
+    Returns a stats dict: exams, issues (warnings included) and page_cache
+    ('hit', 'miss' or None without a cache), plus precache_version with
+    options.service_worker (see write_service_worker). Raises FileNotFoundError,
+    json.JSONDecodeError, QuizDataError or ValueError like main() reports them.
+    A BuildProfile, if given, records the time and memory of each stage.
+    item_flags (see quiz_analysis.load_item_flags) adds item analysis warnings
+    to the issues; it doesn't change the page.
+    """
+    options = options or PageOptions()
+    profile = profile or NULL_PROFILE
+    _check_options(options)
+    quiz_file = Path(source)
+    if not quiz_file.exists(): #
+        raise FileNotFoundError(f"找不到測驗資料檔案：{quiz_file}") #
+    if options.split == 'files' and output is None:
+        raise ValueError("split='files' requires an output path")
+    if options.service_worker and output is None:
+        raise ValueError("service_worker requires an output path")
+    chunk_dir = Path(output).parent / options.chunk_dir if options.split == 'files' else None
+    if chunk_dir is not None:
+        chunk_dir.mkdir(parents=True, exist_ok=True)
+
+    def finish(stats, exam_ids):
+        if options.service_worker:
+            with profile.stage('write'):
+                stats['precache_version'] = write_service_worker(output, options, exam_ids, cache)
+        return stats
+
+    page_key = None
+    if cache is not None:
+        with profile.stage('cache'):
+            flags_key = json.dumps(sorted((list(key), flag) for key, flag in (item_flags or {}).items()),
+                                   ensure_ascii=False, sort_keys=True)
+            page_key = content_hash('page', _generator_fingerprint(), _options_key(options), hash_file(quiz_file),
+                                    flags_key)
+            meta = _build_from_page_cache(cache, page_key, output, chunk_dir)
+        if meta is not None:
+            return finish({'exams': meta['exams'], 'issues': meta['issues'], 'page_cache': 'hit'}, meta['exam_ids'])
+
+    if output is None:
+        # the page is streamed to stdout, which can't be taken back, so invalid data is found before writing
+        with profile.stage('process'):
+            _check_quiz_file(quiz_file)
+
+    issues = []
+    chunks = []
+    exam_ids = []
+    if options.minify:
+        with profile.stage('template'):
+            _template_parts(options, cache)
+
+    def counted(fragments):
+        for fragment in fragments:
+            exam_ids.append(fragment[0]['exam_id'])
+            yield fragment
+
+    def write_chunk(entry, payload):
+        with profile.stage('write'):
+            _write_chunk_file(chunk_dir, entry['exam_id'], payload)
+        if cache is not None:
+            with profile.stage('cache'):
+                chunk_key = content_hash(payload)
+                cache.put('chunks', chunk_key, payload.encode('utf-8'))
+            chunks.append((entry['exam_id'], chunk_key))
+
+    def write_page(fp):
+        # The source is parsed one exam at a time and each exam is rendered as soon as it is read
+        with quiz_file.open('r', encoding='utf-8') as source_fp:
+            fragments = counted(iter_exam_fragments(iter_quiz_exams(source_fp), options, cache, issues, profile,
+                                                         item_flags))
+            written = write_chunks(iter_html_for_fragments(fragments, options, write_chunk, profile), fp, profile)
+        fp.write('\n')
+        return written + 1
+
+    if cache is None:
+        _write_output(output, write_page)
+        return finish({'exams': len(exam_ids), 'issues': issues, 'page_cache': None}, exam_ids)
+
+    with cache.writer('pages', page_key) as cache_fp:
+        _write_output(output, lambda fp: write_page(_CacheTee(fp, cache_fp)))
+    meta = {'exams': len(exam_ids), 'exam_ids': exam_ids, 'issues': issues, 'chunks': chunks}
+    cache.put('pages', f'{page_key}.meta', json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+    return finish({'exams': len(exam_ids), 'issues': issues, 'page_cache': 'miss'}, exam_ids)
+
+class PreparedQuiz:
+    """
+    Quiz data processed, validated and serialized once (see prepare_quiz), so
+    render_page can produce its page again and again without redoing that work.
+
+    fragments are the (manifest_entry, payload, search_terms) tuples of
+    iter_exam_fragments, issues its warnings and options the PageOptions the
+    payloads were serialized with; search_terms are None unless options.search.
+    The search index and the UTF-8 encoded payloads are built on first use and kept.
+    """
+
+    def __init__(self, fragments, issues, options):
+        self.fragments = fragments
+        self.issues = issues
+        self.options = options
+        self._search_index = None
+        self._encoded_fragments = None
+
+    @property
+    def exam_ids(self):
+        return [entry['exam_id'] for entry, _payload, _search_terms in self.fragments]
+
+    def search_index(self):
+        if self._search_index is None:
+            encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+            self._search_index = encoder.encode(build_search_index(
+                (entry['question_count'], search_terms) for entry, _payload, search_terms in self.fragments))
+        return self._search_index
+
+    def encoded_fragments(self):
+        """fragments with each payload as a 1-tuple of UTF-8 bytes, for pages that embed the exams."""
+        if self._encoded_fragments is None:
+            self._encoded_fragments = [(entry, (payload.encode('utf-8'),), search_terms)
+                                       for entry, payload, search_terms in self.fragments]
+        return self._encoded_fragments
+
+def prepare_quiz(quiz_data, options=None, item_flags=None):
+    """
+    Processes parsed quiz_data (a mapping exam_id -> raw exam) into a
+    PreparedQuiz for render_page. Raises QuizDataError if an exam is invalid.
+    """
+    options = options or PageOptions()
+    _check_options(options)
+    _check_quiz_data(quiz_data)
+    issues = []
+    fragments = list(iter_exam_fragments(quiz_data.items(), options, issues=issues, item_flags=item_flags))
+    return PreparedQuiz(fragments, issues, options)
+
+def _payload_options(options):
+    # what the fragments of a PreparedQuiz depend on
+    return options.encoding, options.compress, options.prerender, options.search
+
+def render_page(data, options=None, chunk_writer=None):
+    """
+    Returns the HTML page as UTF-8 bytes, the same text create_html_quiz_page returns.
+
+    data is parsed quiz data (a mapping exam_id -> raw exam) or a PreparedQuiz,
+    whose payloads and serialized search index are reused as they are; the static
+    parts of the template are encoded once per process, so rendering a
+    PreparedQuiz again mostly costs joining them with its payloads. options
+    defaults to those of the PreparedQuiz; other options may only change what
+    doesn't affect the payloads or search terms (split, minify, ...), otherwise ValueError
+    is raised. With split='files' chunk_writer(manifest_entry, payload), if
+    given, receives each exam's chunk.
+    """
+    if not isinstance(data, PreparedQuiz):
+        data = prepare_quiz(data, options)
+    options = options or data.options
+    _check_options(options)
+    if _payload_options(options) != _payload_options(data.options):
+        raise ValueError("options change the exam payloads (encoding, compress, prerender or search); "
+                         "prepare the quiz again")
+    search_index = data.search_index() if options.search else None
+    # chunk files are written as text, so only embedded payloads can skip the encoding
+    fragments = data.fragments if options.split == 'files' else data.encoded_fragments()
+    pieces = _iter_page(iter(fragments), options, chunk_writer, NULL_PROFILE, search_index,
+                        _template_segments(options))
+    return b''.join(piece if isinstance(piece, bytes) else piece.encode('utf-8') for piece in pieces)
+
+def build(source, dest, options=None, cache=None):
+    """
+    Library entry point: builds the page for source and writes it to dest,
+    printing nothing. Returns the stats dict of build_quiz_page.
+
+    source is a quiz data file path, parsed quiz data or a PreparedQuiz; dest is
+    a path or a binary file object. A path to a path is build_quiz_page (and can
+    use a BuildCache); otherwise the page comes from render_page. split='files'
+    and service_worker write next to the page, so they need a path dest. Raises
+    like build_quiz_page.
+    """
+    options = options or (source.options if isinstance(source, PreparedQuiz) else PageOptions())
+    is_path = isinstance(dest, (str, os.PathLike))
+    if isinstance(source, (str, os.PathLike)):
+        if is_path:
+            return build_quiz_page(source, dest, options, cache)
+        if not Path(source).exists():
+            raise FileNotFoundError(f"找不到測驗資料檔案：{source}")
+        with open(source, 'r', encoding='utf-8') as fp:
+            source = dict(iter_quiz_exams(fp))
+    if not is_path and (options.split == 'files' or options.service_worker):
+        raise ValueError("split='files' and service_worker require a path dest")
+    prepared = source if isinstance(source, PreparedQuiz) else prepare_quiz(source, options)
+    chunk_writer = None
+    if is_path and options.split == 'files':
+        chunk_dir = Path(dest).parent / options.chunk_dir
+        chunk_dir.mkdir(parents=True, exist_ok=True)
+
+        def chunk_writer(entry, payload):
+            _write_chunk_file(chunk_dir, entry['exam_id'], payload)
+
+    page = render_page(prepared, options, chunk_writer) + b'\n'
+    if is_path:
+        write_file_atomically(dest, lambda fp: fp.write(page), binary=True)
+    else:
+        dest.write(page)
+    stats = {'exams': len(prepared.fragments), 'issues': prepared.issues, 'page_cache': None}
+    if options.service_worker:
+        stats['precache_version'] = write_service_worker(dest, options, prepared.exam_ids, cache)
+    return stats
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="從 quiz_data.json 產生互動式測驗 HTML 頁面。",
+                                     epilog="其他指令：" + "、".join(COMMANDS) + " (使用 <指令> --help 查看說明)")
+    parser.add_argument('input', nargs='?', default='quiz_data.json', help="測驗資料 JSON 檔案 (預設: quiz_data.json)")
+    parser.add_argument('-o', '--output', metavar='PATH', help="輸出 HTML 檔案路徑 (預設: 標準輸出)")
+    parser.add_argument('--split', choices=SPLIT_MODES,
+                        help="分割輸出：inline 每個測驗一個 JSON 區塊；files 另存為 <輸出檔名>-data/exam-<id>.json (需搭配 --output)")
+    parser.add_argument('--encoding', choices=ENCODINGS, default='json',
+                        help="題目資料編碼：json (預設) 或 compact (位置陣列與字串表，頁面較小)")
+    parser.add_argument('--compress', action='store_true',
+                        help="以 deflate 壓縮並 base64 編碼各測驗資料，由瀏覽器以 DecompressionStream 解壓縮 (適用於不壓縮傳輸的主機)")
+    parser.add_argument('--prerender', action='store_true',
+                        help="預先產生測驗選單、綜合練習清單與各測驗第一題的靜態 HTML，不必等腳本執行即可顯示")
+    parser.add_argument('--search', action='store_true',
+                        help="嵌入題庫搜尋索引以顯示搜尋框 (索引約與題目資料一樣大)")
+    parser.add_argument('--no-search', dest='search', action='store_false', help=argparse.SUPPRESS)
+    parser.add_argument('--duplicates', metavar='PATH',
+                        help="嵌入 dedupe 指令產生的近似題分組，綜合練習時每組只抽一題")
+    parser.add_argument('--item-flags', metavar='PATH',
+                        help="讀取 analyze 指令產生的作答分析報告，對答案可能有誤等被標記的題目提出警告")
+    parser.add_argument('--minify', action='store_true',
+                        help="壓縮頁面模板中的 CSS 與 JavaScript (移除註解與多餘空白)，使用 --cache-dir 時重用壓縮結果")
+    parser.add_argument('--service-worker', action='store_true',
+                        help="另外產生 service worker (<輸出檔名>-sw.js) 與預先快取清單，重複造訪時完全由快取載入 (需搭配 --output)；"
+                             "只有輸出檔名為 index.html 時，離線瀏覽目錄網址 (./) 也能開啟頁面")
+    parser.add_argument('--cache-dir', metavar='DIR',
+                        help="建置快取目錄：來源、模板與選項未變更時直接重用頁面，只重新序列化有變更的測驗")
+    parser.add_argument('--cache-max-size', metavar='SIZE', type=parse_size,
+                        help="快取大小上限 (例如 200M)，超過時淘汰最久未使用的項目")
+    parser.add_argument('--cache-stats', action='store_true', help="在標準錯誤輸出快取命中/未命中統計")
+    parser.add_argument('--profile', metavar='PATH',
+                        help="記錄各階段 (解析、處理、序列化、搜尋索引、模板、寫入) 的耗時與 tracemalloc 記憶體峰值，寫入 JSON 報告")
+    parser.add_argument('--no-profile-memory', dest='profile_memory', action='store_false',
+                        help="--profile 不使用 tracemalloc，只記錄耗時 (較準確)")
+    parser.add_argument('--watch', action='store_true',
+                        help="監看模式：來源檔案變更時只重新產生有變更的測驗，並以原子方式更新輸出 (需搭配 --output)")
+    parser.add_argument('--poll-interval', type=float, default=0.5, metavar='SECONDS',
+                        help="監看模式檢查來源檔案的間隔秒數 (預設: 0.5)")
+    parser.add_argument('--batch', metavar='DIR_OR_GLOB',
+                        help="批次模式：建置目錄中所有 *.json 或符合 glob 的題庫，各輸出為 <名稱>.html")
+    parser.add_argument('--output-dir', metavar='DIR', help="批次模式的輸出目錄 (預設: 各題庫所在目錄)")
+    parser.add_argument('-j', '--jobs', type=int, metavar='N', help="批次模式的平行工作程序數 (預設: CPU 核心數)")
+    args = parser.parse_args(argv)
+    if args.batch and args.output:
+        parser.error("--batch 請使用 --output-dir 而非 --output")
+    if args.batch and args.profile:
+        parser.error("--profile 只適用於單一題庫，不能搭配 --batch")
+    if args.batch and args.duplicates:
+        parser.error("--duplicates 只適用於單一題庫，不能搭配 --batch")
+    if args.batch and args.item_flags:
+        parser.error("--item-flags 只適用於單一題庫，不能搭配 --batch")
+    if args.batch and args.service_worker:
+        parser.error("--service-worker 只適用於單一題庫，不能搭配 --batch")
+    if args.service_worker and not args.output and not args.batch:
+        parser.error("--service-worker 需要搭配 --output")
+    if args.watch and (args.batch or not args.output):
+        parser.error("--watch 需要搭配 --output，且不能搭配 --batch")
+    if args.watch and (args.cache_dir or args.profile):
+        parser.error("--watch 不使用建置快取與 --profile")
+    if (args.output_dir or args.jobs) and not args.batch:
+        parser.error("--output-dir 與 --jobs 需要搭配 --batch")
+    if args.jobs is not None and args.jobs < 1:
+        parser.error("--jobs 必須至少為 1")
+    if args.split == 'files' and not args.output and not args.batch:
+        parser.error("--split files 需要搭配 --output")
+    if (args.cache_max_size is not None or args.cache_stats) and not args.cache_dir:
+        parser.error("--cache-max-size 與 --cache-stats 需要搭配 --cache-dir")
+    return args
+
+def describe_build_error(error, quiz_file):
+    """Returns the message main() prints for an exception raised while building quiz_file."""
+    if isinstance(error, FileNotFoundError) and (error.filename is None or Path(error.filename) == Path(quiz_file)):
+        return ( #
+            f"錯誤：{str(error)}\n"
             "請確認您已將JSON測驗資料儲存為 'quiz_data.json'，\n"
             "並且該檔案與此Python程式位於同一個資料夾中。"
         )
-        print(error_message, file=sys.stderr) #
-        sys.exit(1) #
-        
-    except json.JSONDecodeError as e: #
-        error_message = ( #
-            f"錯誤：無法解析 'quiz_data.json' 檔案。\n"
-            f"JSON 格式錯誤：{str(e)}\n"
+    if isinstance(error, json.JSONDecodeError): #
+        return ( #
+            f"錯誤：無法解析 '{quiz_file}' 檔案。\n"
+            f"JSON 格式錯誤：{str(error)}\n"
             "請確認該檔案包含有效的JSON格式資料且為UTF-8編碼。"
         )
-        print(error_message, file=sys.stderr) #
-        sys.exit(1) #
-        
-    except ValueError as e: #
-        error_message = f"資料驗證或處理錯誤：{str(e)}" #
-        print(error_message, file=sys.stderr) #
-        sys.exit(1) #
+    if isinstance(error, OSError):
+        # anything else that failed on a file is the output (or another file), not the quiz data
+        return f"錯誤：無法存取檔案 {error.filename or ''}：{error.strerror or error}"
+    if isinstance(error, QuizDataError):
+        errors = [issue['message'] for issue in error.issues if issue['severity'] == 'error']
+        return "資料驗證或處理錯誤：\n" + "\n".join(f"  - {message}" for message in errors)
+    if isinstance(error, ValueError): #
+        return f"資料驗證或處理錯誤：{str(error)}" #
+    return f"發生未預期的錯誤：{str(error)}" #
+
+def find_quiz_files(pattern):
+    """Returns the bank files for --batch: every *.json in a directory, or the sorted matches of a glob."""
+    path = Path(pattern)
+    if path.is_dir():
+        return sorted(path.glob('*.json'))
+    return sorted(Path(match) for match in glob.glob(pattern, recursive=True) if Path(match).is_file())
+
+def _batch_output(quiz_file, output_dir):
+    return Path(output_dir or quiz_file.parent) / f"{quiz_file.stem}.html"
+
+def _build_batch_item(quiz_file, output, options, cache_dir):
+    """Process-pool worker: builds one bank and reports the outcome instead of raising."""
+    cache = BuildCache(cache_dir) if cache_dir else None
+    if options.split == 'files':
+        options = dataclasses.replace(options, chunk_dir=f'{output.stem}-data')
+    try:
+        stats = build_quiz_page(quiz_file, output, options, cache)
+    except Exception as e:
+        return {'source': str(quiz_file), 'output': str(output), 'error': describe_build_error(e, quiz_file),
+                'cache_stats': cache.stats if cache else {}}
+    return {'source': str(quiz_file), 'output': str(output), 'error': None, 'exams': stats['exams'],
+            'issues': stats['issues'], 'cache_stats': cache.stats if cache else {}}
+
+def build_batch(quiz_files, options=None, output_dir=None, jobs=None, cache_dir=None):
+    """
+    Builds every bank in quiz_files, each to <output_dir or its own directory>/<stem>.html,
+    in a process pool of jobs workers (default: one per CPU). A bank that fails
+    is reported in its result and does not stop the others.
+
+    Yields one result dict per bank, in completion order: source, output, error
+    (the main() message or None), exams, issues and cache_stats.
+    """
+    options = options or PageOptions()
+    outputs = {}
+    for quiz_file in map(Path, quiz_files):
+        output = _batch_output(quiz_file, output_dir)
+        if output in outputs:
+            raise ValueError(f"'{quiz_file}' 與 '{outputs[output]}' 會輸出到同一個檔案 {output}")
+        outputs[output] = quiz_file
+    if output_dir:
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(outputs) <= 1:
+        for output, quiz_file in outputs.items():
+            yield _build_batch_item(quiz_file, output, options, cache_dir)
+        return
+    with concurrent.futures.ProcessPoolExecutor(max_workers=min(jobs, len(outputs))) as pool:
+        futures = [pool.submit(_build_batch_item, quiz_file, output, options, cache_dir)
+                   for output, quiz_file in outputs.items()]
+        for future in concurrent.futures.as_completed(futures):
+            yield future.result()
+
+def _merge_cache_stats(total, stats):
+    for kind, counts in stats.items():
+        if kind == 'evicted':
+            total['evicted'] = total.get('evicted', 0) + counts
+            continue
+        merged = total.setdefault(kind, {'hits': 0, 'misses': 0})
+        merged['hits'] += counts['hits']
+        merged['misses'] += counts['misses']
+
+def run_batch(args, options):
+    quiz_files = find_quiz_files(args.batch)
+    if not quiz_files:
+        print(f"錯誤：找不到符合 '{args.batch}' 的測驗資料檔案", file=sys.stderr)
+        return 1
+    cache = BuildCache(args.cache_dir, args.cache_max_size) if args.cache_dir else None
+    failed = 0
+    for result in build_batch(quiz_files, options, args.output_dir, args.jobs, args.cache_dir):
+        if result['error']:
+            failed += 1
+            print(f"失敗：{result['source']}\n{result['error']}", file=sys.stderr)
+        else:
+            for issue in result['issues']:
+                if issue['severity'] == 'warning':
+                    print(f"警告：{result['source']}：{issue['message']}", file=sys.stderr)
+            print(f"完成：{result['source']} -> {result['output']} ({result['exams']} 個測驗)", file=sys.stderr)
+        if cache is not None:
+            _merge_cache_stats(cache.stats, result['cache_stats'])
+    print(f"批次建置：成功 {len(quiz_files) - failed} 個，失敗 {failed} 個", file=sys.stderr)
+    if cache is not None:
+        cache.prune()
+        if args.cache_stats:
+            print(cache.report(), file=sys.stderr)
+    return 1 if failed else 0
+
+# Subcommands live in their own modules and are imported only when used
+COMMANDS = {
+    'serve': 'quiz_server',
+    'dedupe': 'quiz_dedupe',
+    'bench': 'quiz_bench',
+    'stats': 'quiz_stats',
+    'analyze': 'quiz_analysis',
+    'store': 'quiz_store',
+    'grade': 'quiz_grader',
+    'loadtest': 'quiz_loadtest',
+}
+
+def main(argv=None): #
+    """Main function to handle file operations and error reporting.""" #
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in COMMANDS:
+        return importlib.import_module(COMMANDS[argv[0]]).main(argv[1:])
+
+    args = parse_args(argv)
+    options = PageOptions(split=args.split, encoding=args.encoding, search=args.search, minify=args.minify,
+                          compress=args.compress, prerender=args.prerender)
+    if args.batch:
+        sys.exit(run_batch(args, options))
+
+    quiz_file = Path(args.input) #
+    try: #
+        if args.split == 'files':
+            options = dataclasses.replace(options, chunk_dir=f'{Path(args.output).stem}-data')
+        if args.service_worker:
+            options = dataclasses.replace(options, service_worker=f'{Path(args.output).stem}-sw.js')
+        if args.duplicates:
+            groups = importlib.import_module(COMMANDS['dedupe']).load_duplicate_groups(args.duplicates)
+            options = dataclasses.replace(options, duplicate_groups=groups)
+        item_flags = None
+        if args.item_flags:
+            item_flags = importlib.import_module(COMMANDS['analyze']).load_item_flags(args.item_flags)
+        if args.watch:
+            return importlib.import_module('quiz_watch').watch(quiz_file, args.output, options, item_flags,
+                                                                args.poll_interval)
+        cache = BuildCache(args.cache_dir, args.cache_max_size) if args.cache_dir else None
+        profile = BuildProfile(trace_memory=args.profile_memory) if args.profile else None
+
+        if profile is not None:
+            profile.start()
+        stats = build_quiz_page(quiz_file, args.output, options, cache, profile, item_flags)
+        if profile is not None:
+            profile.stop()
+            report = profile.report(source=str(quiz_file), output=args.output, options=dataclasses.asdict(options),
+                                    exams=stats['exams'], page_cache=stats['page_cache'])
+            write_file_atomically(args.profile, lambda fp: json.dump(report, fp, ensure_ascii=False, indent=2))
+            print(profile.summary(), file=sys.stderr)
+        for issue in stats['issues']:
+            if issue['severity'] == 'warning':
+                print(f"警告：{issue['message']}", file=sys.stderr)
+        if cache is not None:
+            cache.prune()
+            if args.cache_stats:
+                print(cache.report(), file=sys.stderr)
         
     except Exception as e: #
-        error_message = f"發生未預期的錯誤：{str(e)}" #
-        print(error_message, file=sys.stderr) #
+        print(describe_build_error(e, quiz_file), file=sys.stderr) #
         sys.exit(1) #
 
 if __name__ == '__main__': #
-    main() #
\ No newline at end of file
+    main() #
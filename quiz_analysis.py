@@ -0,0 +1,346 @@
+"""
+Classical test theory item analysis of exported attempts: `python create_quiz_page.py analyze <logs...>`.
+
+Full-exam attempts (mode "exam", see quiz_stats for the log format) are packed
+into one int8 response matrix per exam, attempts by questions, holding the
+chosen option id (0 when unanswered). Every statistic is computed on whole
+arrays with NumPy:
+
+- p-value: the share of attempts answering the question correctly.
+- point-biserial discrimination: correlation between answering correctly and
+  the rest score (the weighted total without the question itself).
+- KR-20 over dichotomous items and Cronbach's alpha over items weighted 1.5/2.0
+  points as the page scores them (see question_points).
+- per-option selection rates and point-biserials, used to spot keys that are
+  likely wrong: the key discriminates negatively while a distractor
+  discriminates positively.
+
+Flags are written with the report (-o). Building with
+`create_quiz_page.py --item-flags <report>` turns them into build warnings for
+the questions whose answer key is still the one that was analyzed.
+
+NumPy is optional for the rest of the tool and only needed here.
+"""
+import argparse
+import json
+import math
+import sys
+
+try:
+    import numpy as np
+except ImportError: # optional: only the analyze command needs it
+    np = None
+
+import create_quiz_page as builder
+from quiz_stats import find_shards
+
+DEFAULT_MIN_ATTEMPTS = 30
+EASY_P = 0.95
+HARD_P = 0.25
+LOW_DISCRIMINATION = 0.1
+
+FLAG_MESSAGES = {
+    'key_suspect': "作答分析顯示正確答案 ({key}) 可能有誤，建議檢查選項 {suggested_key}",
+    'negative_discrimination': "鑑別度為負 (r={r_pb:.2f})，題目或答案可能有問題",
+    'low_discrimination': "鑑別度偏低 (r={r_pb:.2f})",
+    'too_easy': "答對率過高 ({p:.0%})",
+    'too_hard': "答對率過低 ({p:.0%})",
+}
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError("作答分析需要 NumPy，請先執行 pip install numpy")
+
+
+# option ids are packed as int8; larger ones would wrap around to another option
+_MAX_OPTION_ID = 127
+
+
+def _is_option(value, low):
+    return isinstance(value, int) and not isinstance(value, bool) and low <= value <= _MAX_OPTION_ID
+
+
+class _FormAccumulator:
+    """Response rows of one exam form (a fixed set of question numbers), packed as int8 bytes."""
+
+    def __init__(self, questions):
+        self.questions = questions
+        self.rows = bytearray()
+        self.keys = None
+        self.attempts = 0
+
+
+def read_response_matrices(paths):
+    """
+    Reads full-exam attempts from JSONL shards. Returns ({exam_id: (questions,
+    chosen, logged_keys)}, skipped) where chosen is an attempts x questions int8
+    array and questions the sorted question numbers of its columns. If an exam
+    was taken with different question sets, the most common one is used and the
+    other attempts are counted in skipped.
+    """
+    _require_numpy()
+    forms = {}
+    skipped = 0
+    for path in paths:
+        with open(path, 'rb') as fp:
+            for line in fp:
+                try:
+                    record = json.loads(line)
+                    if not isinstance(record, dict):
+                        raise ValueError("record is not an object")
+                    if record.get('mode') != 'exam' or len(record.get('exam_ids') or []) != 1:
+                        continue
+                    responses = sorted((int(number), chosen or 0, key) for _exam, number, chosen, key, _points
+                                       in record['responses'])
+                    exam_id = str(record['exam_ids'][0])
+                    if not all(_is_option(chosen, 0) and _is_option(key, 1) for _number, chosen, key in responses):
+                        raise ValueError("option id out of range")
+                    row = bytes(chosen for _number, chosen, _key in responses)
+                except (ValueError, KeyError, TypeError):
+                    skipped += 1
+                    continue
+                questions = tuple(number for number, _chosen, _key in responses)
+                form = forms.setdefault((exam_id, questions), _FormAccumulator(questions))
+                form.rows += row
+                form.keys = [key for _number, _chosen, key in responses]
+                form.attempts += 1
+
+    matrices = {}
+    for (exam_id, _questions), form in sorted(forms.items(), key=lambda item: -item[1].attempts):
+        if exam_id in matrices:
+            skipped += form.attempts
+            continue
+        chosen = np.frombuffer(bytes(form.rows), dtype=np.int8).reshape(form.attempts, len(form.questions))
+        matrices[exam_id] = (list(form.questions), chosen, form.keys)
+    return matrices, skipped
+
+
+def _column_correlations(a, b):
+    """Pearson correlation of each column of a with the same column of b (NaN where either is constant)."""
+    a = a - a.mean(axis=0)
+    b = b - b.mean(axis=0)
+    numerator = (a * b).sum(axis=0)
+    denominator = np.sqrt((a * a).sum(axis=0) * (b * b).sum(axis=0))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(denominator > 0, numerator / denominator, np.nan)
+
+
+def analyze_matrix(chosen, keys, weights):
+    """
+    Item statistics of one response matrix.
+
+    chosen: attempts x questions int8 array of chosen option ids (0 = unanswered).
+    keys: correct option id per question. weights: points per question.
+    Returns a dict of arrays and scalars: p, r_pb, option_ids, option_rates and
+    option_r_pb (options x questions), kr20, alpha, mean_score and max_score.
+    """
+    _require_numpy()
+    keys = np.asarray(keys, dtype=np.int8)
+    weights = np.asarray(weights, dtype=np.float32)
+    attempts, items = chosen.shape
+    correct = (chosen == keys).astype(np.float32)
+    p = correct.mean(axis=0)
+    weighted = correct * weights
+    total = weighted.sum(axis=1)
+    rest = total[:, None] - weighted
+    r_pb = _column_correlations(correct, rest)
+
+    option_ids = np.arange(1, max(int(chosen.max(initial=0)), int(keys.max(initial=0))) + 1, dtype=np.int8)
+    option_rates = np.empty((len(option_ids), items), dtype=np.float32)
+    option_r_pb = np.empty((len(option_ids), items), dtype=np.float64)
+    for row, option in enumerate(option_ids):
+        selected = (chosen == option).astype(np.float32)
+        option_rates[row] = selected.mean(axis=0)
+        option_r_pb[row] = _column_correlations(selected, rest)
+
+    kr20 = alpha = math.nan
+    if items > 1:
+        raw_variance = correct.sum(axis=1).var()
+        if raw_variance > 0:
+            kr20 = items / (items - 1) * (1 - float((p * (1 - p)).sum()) / float(raw_variance))
+        total_variance = total.var()
+        if total_variance > 0:
+            alpha = items / (items - 1) * (1 - float(weighted.var(axis=0).sum()) / float(total_variance))
+
+    return {
+        'attempts': attempts,
+        'p': p,
+        'r_pb': r_pb,
+        'option_ids': option_ids,
+        'option_rates': option_rates,
+        'option_r_pb': option_r_pb,
+        'kr20': kr20,
+        'alpha': alpha,
+        'mean_score': float(total.mean()) if attempts else math.nan,
+        'max_score': float(weights.sum()),
+    }
+
+
+def item_flags(stats, keys, column):
+    """Returns (flags, suggested_key) for one question (column) of analyze_matrix's result."""
+    p = float(stats['p'][column])
+    r_pb = float(stats['r_pb'][column])
+    flags = []
+    suggested_key = None
+    if not math.isnan(r_pb):
+        if r_pb < 0:
+            distractors = [(float(stats['option_r_pb'][row, column]), int(option))
+                           for row, option in enumerate(stats['option_ids']) if option != keys[column]]
+            distractors = [(r, option) for r, option in distractors if not math.isnan(r)]
+            best_r, best_option = max(distractors, default=(math.nan, None))
+            if best_option is not None and best_r > LOW_DISCRIMINATION:
+                flags.append('key_suspect')
+                suggested_key = best_option
+            flags.append('negative_discrimination')
+        elif r_pb < LOW_DISCRIMINATION:
+            flags.append('low_discrimination')
+    if p > EASY_P:
+        flags.append('too_easy')
+    elif p < HARD_P:
+        flags.append('too_hard')
+    return flags, suggested_key
+
+
+def _number(value, digits=4):
+    value = float(value)
+    return None if math.isnan(value) else round(value, digits)
+
+
+def load_bank_keys(source):
+    """Returns {(exam_id, question_number): answer} from a quiz data file, read one exam at a time."""
+    keys = {}
+    with open(source, 'r', encoding='utf-8') as fp:
+        for exam_key, raw_exam in builder.iter_quiz_exams(fp):
+            exam, _issues = builder.process_exam(exam_key, raw_exam)
+            if exam is not None:
+                keys.update(((exam_key, question['id']), question['answer']) for question in exam['questions'])
+    return keys
+
+
+def analyze(paths, bank_keys=None, min_attempts=DEFAULT_MIN_ATTEMPTS):
+    """
+    Runs the item analysis over the attempt logs in paths. Answer keys come from
+    bank_keys ({(exam_id, question_number): answer}, see load_bank_keys) when
+    given, otherwise from the logs. Flags are only raised for exams with at
+    least min_attempts attempts. Returns the JSON report.
+    """
+    matrices, skipped = read_response_matrices(paths)
+    exams = []
+    for exam_id, (questions, chosen, logged_keys) in sorted(matrices.items()):
+        keys = [bank_keys.get((exam_id, number), logged) if bank_keys else logged
+                for number, logged in zip(questions, logged_keys)]
+        weights = [builder.question_points(number) for number in questions]
+        stats = analyze_matrix(chosen, keys, weights)
+        flagged = stats['attempts'] >= min_attempts
+        items = []
+        for column, number in enumerate(questions):
+            flags, suggested_key = item_flags(stats, keys, column) if flagged else ([], None)
+            items.append({
+                'question': number,
+                'key': keys[column],
+                'points': weights[column],
+                'p': _number(stats['p'][column]),
+                'r_pb': _number(stats['r_pb'][column]),
+                'options': {
+                    str(int(option)): {
+                        'rate': _number(stats['option_rates'][row, column]),
+                        'r_pb': _number(stats['option_r_pb'][row, column]),
+                    }
+                    for row, option in enumerate(stats['option_ids'])
+                },
+                'flags': flags,
+                'suggested_key': suggested_key,
+            })
+        exams.append({
+            'exam_id': exam_id,
+            'attempts': stats['attempts'],
+            'questions': len(questions),
+            'kr20': _number(stats['kr20']),
+            'alpha': _number(stats['alpha']),
+            'mean_score': _number(stats['mean_score']),
+            'max_score': stats['max_score'],
+            'flagged': flagged,
+            'items': items,
+        })
+    return {'version': 1, 'min_attempts': min_attempts, 'skipped_attempts': skipped, 'exams': exams}
+
+
+def load_item_flags(path):
+    """
+    Reads an analyze report into the form build_quiz_page's item_flags takes:
+    {(exam_id, question_number): {'key': analyzed_key, 'messages': [...]}} for
+    every flagged question.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as fp:
+            report = json.load(fp)
+    except (OSError, json.JSONDecodeError) as e:
+        raise ValueError(f"無法讀取作答分析報告：{path} ({e})") from None
+    flags = {}
+    try:
+        for exam in report['exams']:
+            for item in exam['items']:
+                if not item['flags']:
+                    continue
+                messages = [FLAG_MESSAGES[name].format(**item) for name in item['flags'] if name in FLAG_MESSAGES]
+                flags[(str(exam['exam_id']), int(item['question']))] = {'key': item['key'], 'messages': messages}
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"作答分析報告格式錯誤：{path} ({e})") from None
+    return flags
+
+
+def format_report(report):
+    lines = []
+    for exam in report['exams']:
+        kr20 = f"{exam['kr20']:.3f}" if exam['kr20'] is not None else '-'
+        alpha = f"{exam['alpha']:.3f}" if exam['alpha'] is not None else '-'
+        lines.append(f"第 {exam['exam_id']} 屆：{exam['attempts']} 次作答，{exam['questions']} 題，"
+                     f"平均 {exam['mean_score']:.1f} / {exam['max_score']:g} 分，KR-20 {kr20}，alpha {alpha}")
+        if not exam['flagged']:
+            lines.append(f"  作答次數少於 {report['min_attempts']}，不標記題目")
+        for item in exam['items']:
+            if item['flags']:
+                messages = '；'.join(FLAG_MESSAGES[name].format(**item) for name in item['flags'])
+                lines.append(f"  第 {item['question']} 題：{messages}")
+    if report['skipped_attempts']:
+        lines.append(f"略過 {report['skipped_attempts']} 筆無法使用的作答紀錄")
+    return '\n'.join(lines)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='create_quiz_page.py analyze',
+                                     description="以古典測驗理論分析完整測驗的作答紀錄：難度、鑑別度、KR-20 與 alpha。")
+    parser.add_argument('logs', nargs='+', help="作答紀錄檔案、目錄 (讀取其中的 *.jsonl) 或 glob")
+    parser.add_argument('--quiz-data', metavar='PATH', help="以題庫中目前的正確答案分析 (預設使用紀錄中的答案)")
+    parser.add_argument('--min-attempts', type=int, default=DEFAULT_MIN_ATTEMPTS,
+                        help=f"標記題目所需的最少作答次數 (預設: {DEFAULT_MIN_ATTEMPTS})")
+    parser.add_argument('-o', '--output', metavar='PATH',
+                        help="將分析報告寫入 JSON 檔案，可用 create_quiz_page.py --item-flags 在建置時提出警告")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    shards = find_shards(args.logs)
+    if not shards:
+        print("錯誤：找不到作答紀錄檔案", file=sys.stderr)
+        sys.exit(1)
+    try:
+        bank_keys = load_bank_keys(args.quiz_data) if args.quiz_data else None
+        report = analyze(shards, bank_keys, args.min_attempts)
+    except RuntimeError as e:
+        print(f"錯誤：{e}", file=sys.stderr)
+        sys.exit(1)
+    except Exception as e:
+        print(builder.describe_build_error(e, args.quiz_data or args.logs[0]), file=sys.stderr)
+        sys.exit(1)
+    if hasattr(sys.stdout, 'reconfigure'):
+        sys.stdout.reconfigure(encoding='utf-8')
+    print(format_report(report))
+    if args.output:
+        builder.write_file_atomically(args.output, lambda fp: json.dump(report, fp, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
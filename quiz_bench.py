@@ -0,0 +1,393 @@
+"""
+Benchmarks the page generator: `python create_quiz_page.py bench [--sizes 100,10000]`.
+
+For every size a synthetic bank with the quiz_data.json schema is generated
+(see generate_bank) and measured three ways:
+
+- json_load: json.load of the bank file.
+- create_html_quiz_page: rendering the loaded data in-process.
+- main: `create_quiz_page.py <bank> -o <page>` in a fresh interpreter, so the
+  wall time includes startup and the peak RSS is the whole process.
+
+Wall times are the min and median of --repeat runs. Peak memory comes from one
+extra tracemalloc run (peak RSS for main). Output bytes is the page size. If a
+local JS engine (node, deno or bun) is found, the page's own decodeExam and
+buildQuiz functions are also timed on the compact payload; otherwise that part
+is skipped and the report says why.
+
+Results are written as JSON with --output. --compare <old.json> flags any metric
+that grew by more than --tolerance, and exits with status 1 if one did.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import create_quiz_page as builder
+
+DEFAULT_SIZES = (100, 1000, 10000, 100000)
+QUESTIONS_PER_EXAM = 60
+JS_ENGINES = ('node', 'deno', 'bun')
+JS_MAX_SIZE = 100000
+JS_FUNCTIONS = ('decodeExam', 'createRandom', 'shuffleArray', 'sampleRange', 'allocateQuotas',
+                'questionBand', 'poolOffsets', 'buildQuiz')
+REPORT_VERSION = 1
+_FUNCTION_PATTERN = re.compile(r'function (\w+)\(')
+
+# Syllables used to build texts with the length and character mix of real questions
+_SYLLABLES = ('金融', '科技', '區塊', '鏈', '支付', '銀行', '開放', '資料', '風險', '監理', '人工', '智慧',
+              '模型', '保險', '證券', '數位', '身分', '驗證', '加密', '資產', '平台', '服務', 'API', 'AI',
+              '雲端', '運算', '法規', '客戶', '交易', '帳戶', '何者', '正確', '錯誤', '下列', '敘述', '有關')
+
+_MAIN_RUNNER = """
+import json, resource, sys
+sys.path.insert(0, sys.argv[1])
+import create_quiz_page
+create_quiz_page.main(sys.argv[2:])
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({'peak_rss_bytes': rss if sys.platform == 'darwin' else rss * 1024}), file=sys.stderr)
+"""
+
+_JS_BENCH = """
+const quizConfig = { encoding: 'compact' };
+const duplicateGroups = new Map();
+%(functions)s
+const payloadText = %(payload)s;
+const now = typeof performance !== 'undefined' ? () => performance.now() : () => Date.now();
+const log = typeof console !== 'undefined' ? line => console.log(line) : print;
+function bench(name, fn) {
+    let iterations = 0;
+    const start = now();
+    let elapsed = 0;
+    do {
+        fn();
+        iterations++;
+        elapsed = now() - start;
+    } while (elapsed < %(min_ms)d);
+    log(JSON.stringify({ name, iterations, ms_per_op: elapsed / iterations }));
+}
+let parsed = null;
+let exams = null;
+bench('JSON.parse', () => { parsed = JSON.parse(payloadText); });
+bench('decodeExam', () => { exams = Object.values(parsed).map(decodeExam); });
+bench('buildQuiz (100, band)', () => buildQuiz('bench', exams, 100, 'band', 12345));
+bench('buildQuiz (all, shuffle)', () => buildQuiz('bench', exams, 1 << 30, '', 12345));
+"""
+
+
+def _synthetic_text(rng, low, high):
+    length = rng.randint(low, high)
+    parts = []
+    while sum(map(len, parts)) < length:
+        parts.append(rng.choice(_SYLLABLES))
+    return ''.join(parts) + ('？' if length > 20 else '')
+
+
+def generate_bank(question_count, questions_per_exam=QUESTIONS_PER_EXAM, seed=0):
+    """
+    Yields (exam_key, exam) pairs of a deterministic synthetic bank with
+    question_count questions in total, using the quiz_data.json schema
+    (exam_number, questions with question_number, question_text, options,
+    answer, question_sources and answer_sources).
+    """
+    rng = random.Random(seed)
+    exam_number = 0
+    remaining = question_count
+    while remaining > 0:
+        exam_number += 1
+        count = min(questions_per_exam, remaining)
+        remaining -= count
+        questions = []
+        for number in range(1, count + 1):
+            options = {str(option): _synthetic_text(rng, 6, 30) for option in range(1, 5)}
+            page = rng.randint(1, 40)
+            questions.append({
+                'question_number': number,
+                'question_text': _synthetic_text(rng, 20, 90),
+                'options': options,
+                'answer': str(rng.randint(1, 4)),
+                'question_sources': [page],
+                'answer_sources': [page + 1],
+            })
+        yield str(exam_number), {'exam_number': exam_number, 'questions': questions}
+
+
+def write_bank(path, question_count, seed=0):
+    """Writes generate_bank's output to path one exam at a time. Returns the file size."""
+    def write(fp):
+        fp.write('{')
+        for position, (exam_key, exam) in enumerate(generate_bank(question_count, seed=seed)):
+            fp.write(',\n' if position else '\n')
+            fp.write(f'{json.dumps(exam_key)}: ')
+            json.dump(exam, fp, ensure_ascii=False)
+        fp.write('\n}\n')
+    builder.write_file_atomically(path, write)
+    return os.path.getsize(path)
+
+
+def _timed_runs(fn, repeat):
+    runs = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        runs.append(time.perf_counter() - start)
+    return runs, result
+
+
+def _wall(runs):
+    return {'min': min(runs), 'median': statistics.median(runs), 'runs': runs}
+
+
+def _traced_peak(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_in_process(bank_path, size, repeat):
+    """Measures json_load and create_html_quiz_page for one bank. Returns two result dicts."""
+    def load():
+        with open(bank_path, 'r', encoding='utf-8') as fp:
+            return json.load(fp)
+
+    runs, quiz_data = _timed_runs(load, repeat)
+    results = [{'benchmark': 'json_load', 'size': size, 'wall_s': _wall(runs),
+                'peak_bytes': _traced_peak(load), 'output_bytes': None}]
+
+    runs, page = _timed_runs(lambda: builder.create_html_quiz_page(quiz_data), repeat)
+    output_bytes = len(page.encode('utf-8'))
+    del page
+    results.append({'benchmark': 'create_html_quiz_page', 'size': size, 'wall_s': _wall(runs),
+                    'peak_bytes': _traced_peak(lambda: builder.create_html_quiz_page(quiz_data)),
+                    'output_bytes': output_bytes})
+    return results
+
+
+def bench_main(bank_path, output_path, size, repeat):
+    """Measures `create_quiz_page.py bank -o output` in fresh interpreters."""
+    module_dir = str(Path(builder.__file__).resolve().parent)
+    runs = []
+    peak_rss = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        completed = subprocess.run([sys.executable, '-c', _MAIN_RUNNER, module_dir, str(bank_path), '-o', str(output_path)],
+                                   capture_output=True, text=True)
+        runs.append(time.perf_counter() - start)
+        if completed.returncode != 0:
+            raise RuntimeError(f"main 執行失敗：\n{completed.stderr}")
+        peak_rss = max(peak_rss, json.loads(completed.stderr.strip().splitlines()[-1])['peak_rss_bytes'])
+    return {'benchmark': 'main', 'size': size, 'wall_s': _wall(runs), 'peak_bytes': peak_rss,
+            'output_bytes': os.path.getsize(output_path)}
+
+
+def _function_source(script, name):
+    """Extracts `function name(...) {...}` from script by brace matching."""
+    start = script.find(f'function {name}(')
+    if start < 0:
+        raise ValueError(f"找不到頁面函式 {name}")
+    depth = 0
+    for index in range(script.index('{', start), len(script)):
+        if script[index] == '{':
+            depth += 1
+        elif script[index] == '}':
+            depth -= 1
+            if depth == 0:
+                return script[start:index + 1]
+    raise ValueError(f"頁面函式 {name} 不完整")
+
+
+def _extract_functions(script, names):
+    """
+    The sources of the page functions names, checked to be self-contained: a
+    call to another page function that isn't in names raises ValueError instead
+    of a ReferenceError in the JS engine.
+    """
+    sources = [_function_source(script, name) for name in names]
+    page_functions = set(_FUNCTION_PATTERN.findall(script))
+    missing = sorted({called for source in sources for called in re.findall(r'\b(\w+)\(', source)
+                      if called in page_functions and called not in names})
+    if missing:
+        raise ValueError(f"JS_FUNCTIONS 缺少被呼叫的頁面函式：{', '.join(missing)}")
+    return '\n'.join(sources)
+
+
+def find_js_engine():
+    for engine in JS_ENGINES:
+        path = shutil.which(engine)
+        if path:
+            return engine, path
+    return None, None
+
+
+def bench_js(bank_path, size, engine_path, work_dir, min_ms=200):
+    """Times the page's JSON.parse, decodeExam and buildQuiz on the compact payload of bank_path."""
+    with open(bank_path, 'r', encoding='utf-8') as fp:
+        exams = builder.prepare_exams(json.load(fp))
+    payload = {exam['exam_id']: builder.encode_exam_compact(exam) for exam in exams}
+    script = builder._PAGE_TEMPLATE
+    source = _JS_BENCH % {
+        'functions': _extract_functions(script, JS_FUNCTIONS),
+        'payload': json.dumps(json.dumps(payload, ensure_ascii=False)),
+        'min_ms': min_ms,
+    }
+    bench_path = Path(work_dir) / f'bench-{size}.js'
+    bench_path.write_text(source, encoding='utf-8')
+    args = [engine_path, 'run', str(bench_path)] if Path(engine_path).stem == 'deno' else [engine_path, str(bench_path)]
+    completed = subprocess.run(args, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"JS 基準測試失敗：\n{completed.stderr}")
+    return [dict(json.loads(line), size=size) for line in completed.stdout.splitlines() if line.startswith('{')]
+
+
+def run_benchmarks(sizes, repeat=3, js=True, work_dir=None, log=None):
+    """Runs every benchmark for each bank size. Returns the report dict written by --output."""
+    log = log or (lambda message: None)
+    report = {
+        'version': REPORT_VERSION,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'generator': builder._generator_fingerprint()[:16],
+        'results': [],
+        'js': None,
+    }
+    engine, engine_path = find_js_engine() if js else (None, None)
+    if not js:
+        report['js'] = {'skipped': '已以 --no-js 停用'}
+    elif engine is None:
+        report['js'] = {'skipped': f"找不到 JS 執行環境 ({', '.join(JS_ENGINES)})"}
+    else:
+        report['js'] = {'engine': engine, 'results': []}
+
+    with tempfile.TemporaryDirectory(prefix='quiz-bench-', dir=work_dir) as tmp:
+        for size in sizes:
+            bank_path = Path(tmp) / f'bank-{size}.json'
+            log(f"產生 {size} 題的題庫…")
+            bank_bytes = write_bank(bank_path, size)
+            log(f"測量 {size} 題 ({bank_bytes} 位元組)…")
+            results = bench_in_process(bank_path, size, repeat)
+            results.append(bench_main(bank_path, Path(tmp) / f'page-{size}.html', size, repeat))
+            for result in results:
+                result['input_bytes'] = bank_bytes
+            report['results'].extend(results)
+            if engine is not None:
+                if size <= JS_MAX_SIZE:
+                    report['js']['results'].extend(bench_js(bank_path, size, engine_path, tmp))
+                else:
+                    log(f"略過 {size} 題的 JS 基準測試 (上限 {JS_MAX_SIZE} 題)")
+    return report
+
+
+def _metrics(report):
+    metrics = {}
+    for result in report.get('results', []):
+        key = f"{result['benchmark']}[{result['size']}]"
+        metrics[f'{key} wall_s'] = result['wall_s']['median']
+        metrics[f'{key} peak_bytes'] = result['peak_bytes']
+        metrics[f'{key} output_bytes'] = result['output_bytes']
+    for result in (report.get('js') or {}).get('results', []):
+        metrics[f"js {result['name']}[{result['size']}] ms_per_op"] = result['ms_per_op']
+    return {name: value for name, value in metrics.items() if value}
+
+
+def compare_reports(old, new, tolerance):
+    """Returns [(metric, old, new, ratio, regressed)] for metrics present in both reports."""
+    old_metrics = _metrics(old)
+    rows = []
+    for name, value in _metrics(new).items():
+        if name in old_metrics:
+            ratio = value / old_metrics[name]
+            rows.append((name, old_metrics[name], value, ratio, ratio > 1 + tolerance))
+    return rows
+
+
+def format_report(report):
+    lines = [f"{'benchmark':<24}{'size':>9}{'median s':>11}{'min s':>10}{'peak MB':>10}{'output MB':>11}"]
+    for result in report['results']:
+        output = f"{result['output_bytes'] / 1e6:.2f}" if result['output_bytes'] else '-'
+        lines.append(f"{result['benchmark']:<24}{result['size']:>9}{result['wall_s']['median']:>11.4f}"
+                     f"{result['wall_s']['min']:>10.4f}{result['peak_bytes'] / 1e6:>10.1f}{output:>11}")
+    js = report['js'] or {}
+    if 'skipped' in js:
+        lines.append(f"JS：略過 ({js['skipped']})")
+    for result in js.get('results', []):
+        lines.append(f"JS {js['engine']} {result['name']:<26}{result['size']:>9}{result['ms_per_op']:>11.3f} ms")
+    return '\n'.join(lines)
+
+
+def _parse_sizes(text):
+    try:
+        sizes = [int(float(size)) for size in text.split(',') if size.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"無效的題數清單：{text!r}") from None
+    if not sizes or any(size < 1 for size in sizes):
+        raise argparse.ArgumentTypeError(f"無效的題數清單：{text!r}")
+    return sizes
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='create_quiz_page.py bench',
+                                     description="以合成題庫測量產生器的執行時間、記憶體峰值與輸出大小。")
+    parser.add_argument('--sizes', type=_parse_sizes, default=list(DEFAULT_SIZES),
+                        help="以逗號分隔的題庫題數，可用 1e6 之類的寫法 (預設: 100,1000,10000,100000)")
+    parser.add_argument('--repeat', type=int, default=3, help="每項測量的重複次數 (預設: 3)")
+    parser.add_argument('-o', '--output', metavar='PATH', help="結果 JSON 檔案；搭配 --generate 時為題庫輸出路徑")
+    parser.add_argument('--compare', metavar='PATH', help="與先前的結果 JSON 比較，有退步時以狀態碼 1 結束")
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help="--compare 容許的增幅比例 (預設: 0.15，即 15%%)")
+    parser.add_argument('--no-js', dest='js', action='store_false', help="不執行 JS 基準測試")
+    parser.add_argument('--work-dir', metavar='DIR', help="暫存題庫與頁面的目錄 (預設: 系統暫存目錄)")
+    parser.add_argument('--generate', type=lambda text: _parse_sizes(text)[0], metavar='N',
+                        help="只產生 N 題的合成題庫到 --output，不執行測量")
+    parser.add_argument('--seed', type=int, default=0, help="--generate 的亂數種子 (預設: 0)")
+    args = parser.parse_args(argv)
+    if args.repeat < 1:
+        parser.error("--repeat 必須至少為 1")
+    if args.generate and not args.output:
+        parser.error("--generate 需要搭配 --output")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.generate:
+        size = write_bank(args.output, args.generate, args.seed)
+        print(f"已產生 {args.generate} 題的題庫：{args.output} ({size} 位元組)", file=sys.stderr)
+        return
+
+    report = run_benchmarks(args.sizes, args.repeat, args.js, args.work_dir,
+                            log=lambda message: print(message, file=sys.stderr))
+    if hasattr(sys.stdout, 'reconfigure'):
+        sys.stdout.reconfigure(encoding='utf-8')
+    print(format_report(report))
+    if args.output:
+        builder.write_file_atomically(args.output, lambda fp: json.dump(report, fp, ensure_ascii=False, indent=2))
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as fp:
+            rows = compare_reports(json.load(fp), report, args.tolerance)
+        regressions = [row for row in rows if row[4]]
+        for name, old, new, ratio, regressed in rows:
+            print(f"{'退步' if regressed else '    '} {name}: {old:.6g} -> {new:.6g} ({ratio:.2f}x)")
+        print(f"比較 {len(rows)} 項指標，{len(regressions)} 項超過容許增幅 {args.tolerance:.0%}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""
+On-disk build cache for create_quiz_page.py.
+
+Entries are content-addressed: the caller derives each key from everything that
+affects the cached bytes (see content_hash), so entries never need invalidating.
+Every hit refreshes the entry's mtime and prune() evicts the least recently used
+entries once the cache grows past its size limit.
+"""
+import hashlib
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+
+def content_hash(*parts):
+    """Returns a hex SHA-256 over parts (str or bytes), length-prefixed so parts can't run together."""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode('utf-8')
+        digest.update(len(part).to_bytes(8, 'big'))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def hash_file(path, block_size=1024 * 1024):
+    """Returns the hex SHA-256 of a file's bytes, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fp:
+        for block in iter(lambda: fp.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def parse_size(text):
+    """Parses a size such as 500000, 64K, 200M or 1G into bytes."""
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    text = str(text).strip().upper().removesuffix('B')
+    multiplier = units.get(text[-1:], 1)
+    if text[-1:] in units:
+        text = text[:-1]
+    try:
+        size = int(float(text) * multiplier)
+    except ValueError:
+        raise ValueError(f"無效的大小：{text!r}") from None
+    if size < 0:
+        raise ValueError(f"無效的大小：{text!r}")
+    return size
+
+
+class BuildCache:
+    """
+    A directory of cached blobs grouped by kind ('pages', 'fragments', ...).
+
+    max_bytes: total size limit enforced by prune(); None means unlimited.
+    """
+
+    def __init__(self, directory, max_bytes=None):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.stats = {}
+
+    def _path(self, kind, key):
+        return self.directory / kind / key[:2] / key
+
+    def _count(self, kind, outcome):
+        counts = self.stats.setdefault(kind, {'hits': 0, 'misses': 0})
+        counts[outcome] += 1
+
+    def path_if_cached(self, kind, key, count=True):
+        """Returns the path of a cached entry (marking it recently used), or None."""
+        path = self._path(kind, key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            if count:
+                self._count(kind, 'misses')
+            return None
+        if count:
+            self._count(kind, 'hits')
+        return path
+
+    def get(self, kind, key):
+        """Returns the cached bytes for key, or None on a miss."""
+        path = self.path_if_cached(kind, key, count=False)
+        if path is not None:
+            try:
+                data = path.read_bytes()
+            except FileNotFoundError: # evicted by a concurrent build
+                data = None
+            if data is not None:
+                self._count(kind, 'hits')
+                return data
+        self._count(kind, 'misses')
+        return None
+
+    @contextmanager
+    def writer(self, kind, key):
+        """
+        Yields a binary file; its contents become the entry for key when the block
+        exits normally and are discarded if it raises.
+        """
+        path = self._path(kind, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(prefix='.tmp-', dir=path.parent)
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                yield fp
+            os.replace(tmp_name, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+            raise
+
+    def put(self, kind, key, data):
+        with self.writer(kind, key) as fp:
+            fp.write(data)
+
+    def prune(self):
+        """Evicts least recently used entries until the cache fits in max_bytes. Returns the number evicted."""
+        if self.max_bytes is None or not self.directory.exists():
+            return 0
+        entries = []
+        total = 0
+        for root, _dirs, files in os.walk(self.directory):
+            for name in files:
+                if name.startswith('.tmp-'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+                total += stat.st_size
+        evicted = 0
+        entries.sort()
+        for _mtime, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        self.stats['evicted'] = self.stats.get('evicted', 0) + evicted
+        return evicted
+
+    def report(self):
+        """Returns a one-line summary of hits, misses and evictions, for --cache-stats."""
+        parts = []
+        for kind, counts in self.stats.items():
+            if kind != 'evicted':
+                parts.append(f"{kind} 命中 {counts['hits']} / 未命中 {counts['misses']}")
+        parts.append(f"淘汰 {self.stats.get('evicted', 0)} 個項目")
+        return "快取：" + "，".join(parts)
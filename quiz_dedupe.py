@@ -0,0 +1,239 @@
+"""
+Finds near-duplicate questions across exams: `python create_quiz_page.py dedupe [quiz_data.json]`.
+
+Each question's text and options are normalized (NFKC, lower case, whitespace
+and punctuation removed) and cut into character shingles. A one-permutation
+MinHash signature is computed from the shingle hashes in a single pass, and
+LSH banding puts similar signatures into shared buckets. Only questions sharing
+a bucket are compared, by exact Jaccard similarity of their shingles, so the
+work grows roughly linearly with the bank instead of with every pair.
+
+With --output the groups are written as JSON. Building with
+`create_quiz_page.py --duplicates <file>` embeds them in the page so practice
+sampling draws at most one question per group.
+"""
+import argparse
+import json
+import re
+import sys
+import unicodedata
+import zlib
+from pathlib import Path
+
+import create_quiz_page as builder
+
+SHINGLE_SIZE = 3
+SIGNATURE_SIZE = 64
+BANDS = 16
+DEFAULT_THRESHOLD = 0.7
+
+_IGNORED_PATTERN = re.compile(r'[\W_]+')
+_EMPTY_BIN = 1 << 32
+
+
+def normalize_text(text):
+    """NFKC-normalizes and lower-cases text and drops whitespace and punctuation."""
+    return _IGNORED_PATTERN.sub('', unicodedata.normalize('NFKC', text).lower())
+
+
+def question_shingles(question):
+    """
+    Returns the set of shingle hashes of a processed question: character
+    SHINGLE_SIZE-grams of its normalized text followed by its normalized options
+    in sorted order, so reordered options still match.
+    """
+    options = sorted(normalize_text(option['text']) for option in question['options'])
+    text = '|'.join([normalize_text(question['text'])] + options)
+    if len(text) <= SHINGLE_SIZE:
+        return {zlib.crc32(text.encode('utf-8'))}
+    return {zlib.crc32(text[i:i + SHINGLE_SIZE].encode('utf-8')) for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def minhash_signature(hashes, size=SIGNATURE_SIZE):
+    """
+    One-permutation MinHash: each hash falls into bin hash % size and every bin
+    keeps its smallest hash // size. Empty bins borrow the next non-empty bin's
+    value (offset by the distance, so borrowed values stay distinguishable).
+    """
+    bins = [_EMPTY_BIN] * size
+    for value in hashes:
+        index = value % size
+        value //= size
+        if value < bins[index]:
+            bins[index] = value
+    filled = [index for index, value in enumerate(bins) if value != _EMPTY_BIN]
+    if not filled:
+        return tuple(bins)
+    signature = list(bins)
+    for index in range(size):
+        distance = 0
+        while bins[(index + distance) % size] == _EMPTY_BIN:
+            distance += 1
+        signature[index] = bins[(index + distance) % size] + distance * _EMPTY_BIN
+    return tuple(signature)
+
+
+def jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def find_duplicate_groups(questions, threshold=DEFAULT_THRESHOLD, bands=BANDS):
+    """
+    Clusters near-duplicate questions.
+
+    questions is a list of (key, processed_question) pairs, key being anything
+    that identifies the question. Returns a list of groups, largest first, each a
+    dict with 'members' (indexes into questions, in input order) and
+    'similarity' (the lowest Jaccard similarity among the pairs that joined it).
+    """
+    rows = SIGNATURE_SIZE // bands
+    shingles = [question_shingles(question) for _key, question in questions]
+    buckets = {}
+    for index, hashes in enumerate(shingles):
+        signature = minhash_signature(hashes)
+        for band in range(bands):
+            buckets.setdefault((band, signature[band * rows:(band + 1) * rows]), []).append(index)
+
+    parent = list(range(len(questions)))
+
+    def find(index):
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    compared = set()
+    links = []
+    for members in buckets.values():
+        for position, first in enumerate(members):
+            for second in members[position + 1:]:
+                if (first, second) in compared:
+                    continue
+                compared.add((first, second))
+                similarity = jaccard(shingles[first], shingles[second])
+                if similarity >= threshold:
+                    links.append((first, second, similarity))
+                    parent[find(second)] = find(first)
+
+    groups = {}
+    for index in range(len(questions)):
+        groups.setdefault(find(index), []).append(index)
+    lowest = {}
+    for first, _second, similarity in links:
+        root = find(first)
+        lowest[root] = min(similarity, lowest.get(root, 1.0))
+    result = [
+        {'members': members, 'similarity': round(lowest[root], 3)}
+        for root, members in groups.items() if len(members) > 1
+    ]
+    result.sort(key=lambda group: (-len(group['members']), group['members'][0]))
+    return result
+
+
+def load_questions(source):
+    """
+    Reads source one exam at a time. Returns (questions, titles, issues) where
+    questions is a list of ((exam_id, question_number), processed_question).
+    """
+    quiz_file = Path(source)
+    if not quiz_file.exists():
+        raise FileNotFoundError(f"找不到測驗資料檔案：{quiz_file}")
+    questions = []
+    titles = {}
+    issues = []
+    with quiz_file.open('r', encoding='utf-8') as fp:
+        for exam_key, raw_exam in builder.iter_quiz_exams(fp):
+            exam, exam_issues = builder.process_exam(exam_key, raw_exam)
+            issues.extend(exam_issues)
+            if exam is None:
+                continue
+            titles[exam_key] = exam['title']
+            questions.extend(((exam_key, question['id']), question) for question in exam['questions'])
+    return questions, titles, issues
+
+
+def describe_groups(groups, questions, titles):
+    """Returns the groups as the JSON document written by --output."""
+    return {
+        'groups': [
+            {
+                'similarity': group['similarity'],
+                'members': [
+                    {
+                        'exam_id': questions[index][0][0],
+                        'question': questions[index][0][1],
+                        'title': titles[questions[index][0][0]],
+                        'text': questions[index][1]['text'],
+                    }
+                    for index in group['members']
+                ],
+            }
+            for group in groups
+        ],
+    }
+
+
+def load_duplicate_groups(path):
+    """
+    Reads a file written by `dedupe --output` into the form PageOptions.duplicate_groups
+    takes: a tuple of groups, each a tuple of (exam_id, question_number) pairs.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as fp:
+            document = json.load(fp)
+    except (OSError, json.JSONDecodeError) as e:
+        raise ValueError(f"無法讀取近似題分組檔案：{path} ({e})") from None
+    try:
+        return tuple(
+            tuple((str(member['exam_id']), int(member['question'])) for member in group['members'])
+            for group in document['groups']
+        )
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"近似題分組檔案格式錯誤：{path} ({e})") from None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='create_quiz_page.py dedupe',
+                                     description="找出各屆之間文字相近的重複題目 (MinHash/LSH)。")
+    parser.add_argument('input', nargs='?', default='quiz_data.json', help="測驗資料 JSON 檔案 (預設: quiz_data.json)")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f"判定為近似題的最低 Jaccard 相似度 (預設: {DEFAULT_THRESHOLD})")
+    parser.add_argument('-o', '--output', metavar='PATH',
+                        help="將分組寫入 JSON 檔案，可用 create_quiz_page.py --duplicates 嵌入頁面")
+    args = parser.parse_args(argv)
+    if not 0 < args.threshold <= 1:
+        parser.error("--threshold 必須介於 0 與 1 之間")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        questions, titles, issues = load_questions(args.input)
+    except Exception as e:
+        print(builder.describe_build_error(e, args.input), file=sys.stderr)
+        sys.exit(1)
+    for issue in issues:
+        print(f"{'錯誤' if issue['severity'] == 'error' else '警告'}：{issue['message']}", file=sys.stderr)
+
+    groups = find_duplicate_groups(questions, args.threshold)
+    if hasattr(sys.stdout, 'reconfigure'):
+        sys.stdout.reconfigure(encoding='utf-8')
+    for number, group in enumerate(groups, 1):
+        print(f"第 {number} 組 (相似度 ≥ {group['similarity']:.2f})：")
+        for index in group['members']:
+            (exam_id, question_number), question = questions[index]
+            text = ' '.join(question['text'].split())
+            print(f"  {titles[exam_id]} 第 {question_number} 題：{text[:60]}")
+    duplicates = sum(len(group['members']) for group in groups)
+    print(f"共 {len(groups)} 組近似題，涉及 {duplicates} 題 (共檢查 {len(questions)} 題)。")
+
+    if args.output:
+        document = describe_groups(groups, questions, titles)
+        builder.write_file_atomically(args.output, lambda fp: json.dump(document, fp, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,363 @@
+"""
+Grades submissions on the server: `python create_quiz_page.py grade [quiz_data.json] --db results.sqlite`.
+
+The page scores attempts in the browser; for proctored sessions this service is
+the authoritative grader. The answer key of every valid question is loaded once
+into a dict keyed by (exam_id, question_number), and each submission is graded
+against it with the page's point rule (see create_quiz_page.question_points):
+
+    POST /grade  {"exam_id": "17", "answers": [[question_number, chosen_option_or_null], ...],
+                  "attempt_id": "...", "candidate": "..."}   (attempt_id and candidate are optional)
+
+    200 {"attempt_id": ..., "exam_id": ..., "score": ..., "max_score": ..., "correct": ...,
+         "answered": ..., "results": [1 or 0 for each submitted answer]}
+
+Questions that aren't submitted count as unanswered; max_score is always the
+whole exam's. GET /stats returns the service's counters.
+
+Graded submissions go through a bounded queue to a background writer, which
+inserts everything queued so far with one executemany in one transaction on its
+own thread (group commit), so a busy service pays for one commit per batch and
+not per submission. A response is sent once its batch is committed, so a 200
+means the result is stored; when the writer falls behind, requests wait for
+room in the queue. HTTP handling reuses quiz_server's request parser and
+response formatting.
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import sqlite3
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import create_quiz_page as builder
+import quiz_server
+from quiz_server import HttpError, format_response, read_request, wants_keep_alive
+
+SCHEMA_VERSION = 1
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_QUEUE_SIZE = 10000
+MAX_BODY = 64 * 1024
+_MAX_ID_LENGTH = 200
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    submission_key INTEGER PRIMARY KEY,
+    attempt_id TEXT NOT NULL,
+    exam_id TEXT NOT NULL,
+    candidate TEXT,
+    score REAL NOT NULL,
+    max_score REAL NOT NULL,
+    correct INTEGER NOT NULL,
+    answered INTEGER NOT NULL,
+    received_at REAL NOT NULL,
+    answers TEXT NOT NULL
+);
+"""
+_INSERT = 'INSERT INTO submissions VALUES (NULL, ?, ?, ?, ?, ?, ?, ?, ?, ?)'
+
+
+class SubmissionError(ValueError):
+    """Raised for a submission that can't be graded; the message is returned to the client."""
+
+
+class AnswerKey:
+    """Every valid question's (answer, points) keyed by (exam_id, question_number), and each exam's max score."""
+
+    def __init__(self):
+        self.questions = {}
+        self.max_scores = {}
+
+    @classmethod
+    def load(cls, source):
+        """
+        Reads the quiz data file source one exam at a time. Returns (key, issues),
+        issues holding the warnings for questions left out, like the page leaves
+        them out. Raises QuizDataError if any question fails validation, so a
+        grader never starts with a key that silently lacks questions.
+        """
+        key = cls()
+        issues = []
+        with open(source, 'r', encoding='utf-8') as fp:
+            for exam_key, raw_exam in builder.iter_quiz_exams(fp):
+                exam, exam_issues = builder.process_exam(exam_key, raw_exam)
+                issues.extend(exam_issues)
+                if exam is None:
+                    continue
+                for question in exam['questions']:
+                    key.questions[(exam_key, question['id'])] = (question['answer'], question['points'])
+                key.max_scores[exam_key] = sum(question['points'] for question in exam['questions'])
+        if not key.max_scores:
+            issues.append(builder._issue('error', '沒有任何可評分的測驗'))
+        if any(issue['severity'] == 'error' for issue in issues):
+            raise builder.QuizDataError(issues)
+        return key, issues
+
+    def grade(self, submission):
+        """
+        Grades a decoded submission. Returns (response, row): the response body
+        and the submissions table row. Raises SubmissionError if it is malformed.
+        """
+        if not isinstance(submission, dict):
+            raise SubmissionError('submission must be a JSON object')
+        exam_id = submission.get('exam_id')
+        if not isinstance(exam_id, str) or exam_id not in self.max_scores:
+            raise SubmissionError(f'unknown exam_id: {exam_id!r}')
+        attempt_id = submission.get('attempt_id') or uuid.uuid4().hex
+        candidate = submission.get('candidate')
+        if not isinstance(attempt_id, str) or len(attempt_id) > _MAX_ID_LENGTH:
+            raise SubmissionError('attempt_id must be a string')
+        if candidate is not None and (not isinstance(candidate, str) or len(candidate) > _MAX_ID_LENGTH):
+            raise SubmissionError('candidate must be a string')
+        answers = submission.get('answers')
+        if not isinstance(answers, list):
+            raise SubmissionError('answers must be an array of [question_number, chosen_option_or_null]')
+
+        questions = self.questions
+        seen = set()
+        results = []
+        score = 0.0
+        correct = answered = 0
+        for answer in answers:
+            if not isinstance(answer, list) or len(answer) != 2:
+                raise SubmissionError('each answer must be [question_number, chosen_option_or_null]')
+            question_number, chosen = answer
+            if type(question_number) is not int or (chosen is not None and type(chosen) is not int):
+                raise SubmissionError(f'invalid answer: {json.dumps(answer)}')
+            expected = questions.get((exam_id, question_number))
+            if expected is None:
+                raise SubmissionError(f'exam {exam_id} has no question {question_number}')
+            if question_number in seen:
+                raise SubmissionError(f'question {question_number} answered twice')
+            seen.add(question_number)
+            if chosen is None:
+                results.append(0)
+                continue
+            answered += 1
+            if chosen == expected[0]:
+                correct += 1
+                score += expected[1]
+                results.append(1)
+            else:
+                results.append(0)
+
+        max_score = self.max_scores[exam_id]
+        response = {
+            'attempt_id': attempt_id, 'exam_id': exam_id, 'score': score, 'max_score': max_score,
+            'correct': correct, 'answered': answered, 'results': results,
+        }
+        row = (attempt_id, exam_id, candidate, score, max_score, correct, answered, time.time(),
+               json.dumps(answers, separators=(',', ':')))
+        return response, row
+
+
+class ResultWriter:
+    """
+    Stores graded submissions in the SQLite database at path from a background
+    task. Each batch is everything queued since the last one (at most
+    batch_size rows), inserted in one transaction on a dedicated thread.
+    """
+
+    def __init__(self, path, batch_size=DEFAULT_BATCH_SIZE, queue_size=DEFAULT_QUEUE_SIZE):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.queue = asyncio.Queue(queue_size)
+        self.stored = 0
+        self.batches = 0
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='quiz-grader-db')
+        self._connection = None
+        self._task = None
+
+    def _open(self):
+        # the connection is created and used only on the writer thread
+        self._connection = sqlite3.connect(self.path)
+        self._connection.execute('PRAGMA journal_mode = WAL')
+        self._connection.execute('PRAGMA synchronous = NORMAL')
+        version = self._connection.execute('PRAGMA user_version').fetchone()[0]
+        if version not in (0, SCHEMA_VERSION):
+            raise ValueError(f"不支援的作答結果資料庫版本 {version}：{self.path}")
+        with self._connection:
+            self._connection.executescript(_SCHEMA)
+            self._connection.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    def _insert(self, rows):
+        with self._connection:
+            self._connection.executemany(_INSERT, rows)
+
+    def _close(self):
+        self._connection.close()
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._open)
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                await loop.run_in_executor(self._executor, self._insert, [row for row, _future in batch])
+            except Exception as e:
+                for _row, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                self.stored += len(batch)
+                self.batches += 1
+                for _row, future in batch:
+                    if not future.done():
+                        future.set_result(None)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def store(self, row):
+        """Queues row and returns once the transaction holding it is committed."""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((row, future))
+        await future
+
+    async def close(self):
+        """Writes what is still queued, then stops the writer and closes the database."""
+        if self._task is not None:
+            await self.queue.join()
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._close)
+        self._executor.shutdown()
+
+
+def _json_response(status, payload, keep_alive):
+    body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return format_response(status, [('Content-Type', 'application/json; charset=utf-8'), ('Cache-Control', 'no-store')],
+                           body, keep_alive=keep_alive)
+
+
+class GradingServer:
+    """Grades POST /grade submissions against answer_key and stores them with a ResultWriter."""
+
+    def __init__(self, answer_key, results):
+        self.answer_key = answer_key
+        self.results = results
+        self.graded = 0
+        self.rejected = 0
+
+    def stats(self):
+        return {'graded': self.graded, 'rejected': self.rejected, 'stored': self.results.stored,
+                'batches': self.results.batches, 'queued': self.results.queue.qsize()}
+
+    async def respond(self, method, target, body, keep_alive):
+        path = target.split('?', 1)[0]
+        if path == '/stats':
+            if method != 'GET':
+                return format_response(405, [('Allow', 'GET')], keep_alive=keep_alive)
+            return _json_response(200, self.stats(), keep_alive)
+        if path != '/grade':
+            return _json_response(404, {'error': 'not found'}, keep_alive)
+        if method != 'POST':
+            return format_response(405, [('Allow', 'POST')], keep_alive=keep_alive)
+        try:
+            response, row = self.answer_key.grade(json.loads(body))
+        except ValueError as e:
+            # SubmissionError, json.JSONDecodeError and UnicodeDecodeError
+            self.rejected += 1
+            return _json_response(400, {'error': str(e)}, keep_alive)
+        try:
+            await self.results.store(row)
+        except sqlite3.Error as e:
+            print(f"錯誤：無法儲存作答結果：{e}", file=sys.stderr)
+            return _json_response(503, {'error': 'result could not be stored'}, keep_alive)
+        self.graded += 1
+        return _json_response(200, response, keep_alive)
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(read_request(reader, MAX_BODY), quiz_server._KEEP_ALIVE_TIMEOUT)
+                except HttpError as e:
+                    writer.write(format_response(e.status, [], b'', keep_alive=False))
+                    break
+                if request is None:
+                    break
+                method, target, version, headers, body = request
+                keep_alive = wants_keep_alive(version, headers)
+                writer.write(await self.respond(method, target, body, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            try:
+                await writer.drain()
+                writer.close()
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def serve(self, host, port):
+        await self.results.start()
+        server = await asyncio.start_server(self.handle, host, port, backlog=1024)
+        addresses = ', '.join(f'http://{sock.getsockname()[0]}:{sock.getsockname()[1]}/grade' for sock in server.sockets)
+        print(f"評分服務已啟動：{addresses} (Ctrl+C 停止)", file=sys.stderr)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.results.close()
+            print(f"已儲存 {self.results.stored} 筆作答結果 ({self.results.batches} 批次)", file=sys.stderr)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='create_quiz_page.py grade',
+                                     description="伺服器端評分服務：依題庫答案評分提交的作答，並批次寫入 SQLite。")
+    parser.add_argument('input', nargs='?', default='quiz_data.json', help="測驗資料 JSON 檔案 (預設: quiz_data.json)")
+    parser.add_argument('--db', default='quiz_results.sqlite', help="作答結果資料庫路徑 (預設: quiz_results.sqlite)")
+    parser.add_argument('--host', default='127.0.0.1', help="監聽位址 (預設: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8001, help="監聽埠號 (預設: 8001)")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, metavar='N',
+                        help=f"每個交易最多寫入的作答數 (預設: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE, metavar='N',
+                        help=f"等待寫入的作答上限，超過時請求會等待 (預設: {DEFAULT_QUEUE_SIZE})")
+    args = parser.parse_args(argv)
+    if args.batch_size < 1 or args.queue_size < 1:
+        parser.error("--batch-size 與 --queue-size 必須至少為 1")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        answer_key, issues = AnswerKey.load(args.input)
+    except Exception as e:
+        print(builder.describe_build_error(e, args.input), file=sys.stderr)
+        sys.exit(1)
+    for issue in issues:
+        print(f"警告：略過無法評分的題目：{issue['message']}", file=sys.stderr)
+    print(f"已載入 {len(answer_key.max_scores)} 個測驗、{len(answer_key.questions)} 題的答案", file=sys.stderr)
+
+    async def run():
+        results = ResultWriter(args.db, args.batch_size, args.queue_size)
+        await GradingServer(answer_key, results).serve(args.host, args.port)
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    except (OSError, sqlite3.Error, ValueError) as e:
+        print(f"錯誤：{e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+"""
+Load test for the grading service: `python create_quiz_page.py loadtest [quiz_data.json] --spawn`.
+
+Opens --connections keep-alive connections to a running `grade` service and
+sends submissions for --duration seconds, each connection waiting for one
+response before sending its next request. The submissions are random answers to
+whole exams of the bank, generated up front so the client spends its time on
+the network. With --spawn the service is started in a separate process on a
+free port with a temporary database, stopped afterwards, and every accepted
+submission is checked to be stored.
+
+Reports submissions per second, latency percentiles and errors; --output also
+writes them as JSON.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import create_quiz_page as builder
+from quiz_grader import AnswerKey
+
+DEFAULT_CONNECTIONS = 64
+DEFAULT_DURATION = 10.0
+_POOL_SIZE = 1000
+_STARTUP_TIMEOUT = 30.0
+
+
+def build_submissions(answer_key, count=_POOL_SIZE, seed=0):
+    """Returns count request bodies, each a whole exam of answer_key answered at random (about 1 in 10 left blank)."""
+    rng = random.Random(seed)
+    exams = {}
+    for (exam_id, question_number), (answer, _points) in answer_key.questions.items():
+        exams.setdefault(exam_id, []).append((question_number, answer))
+    exam_ids = sorted(exams)
+    bodies = []
+    for index in range(count):
+        exam_id = rng.choice(exam_ids)
+        answers = []
+        for question_number, answer in exams[exam_id]:
+            roll = rng.random()
+            chosen = None if roll < 0.1 else answer if roll < 0.6 else rng.randint(1, 4)
+            answers.append([question_number, chosen])
+        submission = {'exam_id': exam_id, 'attempt_id': f'loadtest-{seed}-{index}', 'answers': answers}
+        bodies.append(json.dumps(submission, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+    return bodies
+
+
+def _request(host, port, body):
+    head = (f'POST /grade HTTP/1.1\r\nHost: {host}:{port}\r\nContent-Type: application/json\r\n'
+            f'Content-Length: {len(body)}\r\n\r\n')
+    return head.encode('latin-1') + body
+
+
+async def read_response(reader):
+    """Reads one HTTP/1.1 response. Returns (status, body)."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('connection closed')
+    status = int(status_line.split(None, 2)[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.partition(b':')
+        if name.strip().lower() == b'content-length':
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+async def _client(host, port, requests, deadline, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        index = 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            writer.write(requests[index % len(requests)])
+            status, _body = await read_response(reader)
+            latencies.append(time.perf_counter() - started)
+            if status != 200:
+                errors[status] = errors.get(status, 0) + 1
+            index += 1
+    finally:
+        writer.close()
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)] if ordered else 0.0
+
+
+async def run_load(host, port, bodies, connections=DEFAULT_CONNECTIONS, duration=DEFAULT_DURATION):
+    """Drives the service at host:port for duration seconds. Returns the report dict."""
+    requests = [_request(host, port, body) for body in bodies]
+    latencies = []
+    errors = {}
+    started = time.perf_counter()
+    deadline = started + duration
+    # each client starts at a different point of the pool
+    offsets = [client * 7 % len(requests) for client in range(connections)]
+    tasks = [_client(host, port, requests[offset:] + requests[:offset], deadline, latencies, errors)
+             for offset in offsets]
+    outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+    elapsed = time.perf_counter() - started
+    failures = [outcome for outcome in outcomes if isinstance(outcome, Exception)]
+    ordered = sorted(latencies)
+    return {
+        'connections': connections,
+        'seconds': elapsed,
+        'requests': len(latencies),
+        'ok': len(latencies) - sum(errors.values()),
+        'errors': {str(status): count for status, count in sorted(errors.items())},
+        'failed_connections': len(failures),
+        'first_failure': repr(failures[0]) if failures else None,
+        'requests_per_second': len(latencies) / elapsed if elapsed else 0.0,
+        'latency_ms': {name: _percentile(ordered, fraction) * 1000
+                       for name, fraction in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99), ('max', 1.0))},
+    }
+
+
+def _free_port(host):
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_listening(process, host, port):
+    deadline = time.monotonic() + _STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"評分服務未能啟動 (結束代碼 {process.returncode})")
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("等待評分服務啟動逾時")
+
+
+def spawn_and_run(source, bodies, connections, duration, batch_size=None):
+    """Runs the load against a `grade` process on a free port and a temporary database, then counts what it stored."""
+    host = '127.0.0.1'
+    port = _free_port(host)
+    with tempfile.TemporaryDirectory(prefix='quiz-loadtest-') as work_dir:
+        db_path = Path(work_dir) / 'results.sqlite'
+        command = [sys.executable, str(Path(builder.__file__).resolve()), 'grade', str(source),
+                   '--db', str(db_path), '--host', host, '--port', str(port)]
+        if batch_size is not None:
+            command += ['--batch-size', str(batch_size)]
+        process = subprocess.Popen(command, stderr=subprocess.DEVNULL)
+        try:
+            _wait_until_listening(process, host, port)
+            report = asyncio.run(run_load(host, port, bodies, connections, duration))
+        finally:
+            # SIGINT lets the service write what is still queued before it exits
+            process.send_signal(signal.SIGINT if os.name != 'nt' else signal.SIGTERM)
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        connection = sqlite3.connect(db_path)
+        try:
+            report['stored'] = connection.execute('SELECT count(*) FROM submissions').fetchone()[0]
+        finally:
+            connection.close()
+    return report
+
+
+def format_report(report):
+    latency = report['latency_ms']
+    lines = [
+        f"{report['connections']} 個連線、{report['seconds']:.1f} 秒：{report['requests']} 次提交，"
+        f"每秒 {report['requests_per_second']:.0f} 次",
+        f"延遲 (毫秒)：p50 {latency['p50']:.2f} / p95 {latency['p95']:.2f} / p99 {latency['p99']:.2f} / "
+        f"最大 {latency['max']:.2f}",
+    ]
+    if report['errors']:
+        lines.append("錯誤回應：" + "、".join(f"HTTP {status} × {count}" for status, count in report['errors'].items()))
+    if report['failed_connections']:
+        lines.append(f"{report['failed_connections']} 個連線中斷，例如 {report['first_failure']}")
+    if 'stored' in report:
+        note = "" if report['stored'] == report['ok'] else f" (成功回應 {report['ok']} 次，不一致！)"
+        lines.append(f"資料庫中共 {report['stored']} 筆作答結果{note}")
+    return '\n'.join(lines)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='create_quiz_page.py loadtest',
+                                     description="對評分服務 (grade 指令) 進行本機負載測試。")
+    parser.add_argument('input', nargs='?', default='quiz_data.json', help="測驗資料 JSON 檔案 (預設: quiz_data.json)")
+    parser.add_argument('--host', default='127.0.0.1', help="評分服務位址 (預設: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8001, help="評分服務埠號 (預設: 8001)")
+    parser.add_argument('--spawn', action='store_true',
+                        help="在另一個程序啟動評分服務 (空閒埠號與暫存資料庫)，結束後檢查每筆成功的提交都已寫入")
+    parser.add_argument('--batch-size', type=int, metavar='N', help="搭配 --spawn：評分服務的 --batch-size")
+    parser.add_argument('-c', '--connections', type=int, default=DEFAULT_CONNECTIONS,
+                        help=f"同時連線數 (預設: {DEFAULT_CONNECTIONS})")
+    parser.add_argument('-d', '--duration', type=float, default=DEFAULT_DURATION, metavar='SECONDS',
+                        help=f"測試秒數 (預設: {DEFAULT_DURATION:g})")
+    parser.add_argument('--seed', type=int, default=0, help="產生提交內容的亂數種子 (預設: 0)")
+    parser.add_argument('-o', '--output', metavar='PATH', help="將結果寫入 JSON 檔案")
+    args = parser.parse_args(argv)
+    if args.connections < 1 or args.duration <= 0:
+        parser.error("--connections 必須至少為 1，--duration 必須大於 0")
+    if args.batch_size is not None and not args.spawn:
+        parser.error("--batch-size 需要搭配 --spawn")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        answer_key, _issues = AnswerKey.load(args.input)
+    except Exception as e:
+        print(builder.describe_build_error(e, args.input), file=sys.stderr)
+        sys.exit(1)
+    bodies = build_submissions(answer_key, seed=args.seed)
+    try:
+        if args.spawn:
+            report = spawn_and_run(args.input, bodies, args.connections, args.duration, args.batch_size)
+        else:
+            report = asyncio.run(run_load(args.host, args.port, bodies, args.connections, args.duration))
+    except (OSError, RuntimeError) as e:
+        print(f"錯誤：{e}", file=sys.stderr)
+        sys.exit(1)
+    if hasattr(sys.stdout, 'reconfigure'):
+        sys.stdout.reconfigure(encoding='utf-8')
+    print(format_report(report))
+    if args.output:
+        builder.write_file_atomically(args.output, lambda fp: json.dump(report, fp, ensure_ascii=False, indent=2))
+    if args.spawn and report['stored'] != report['ok']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""
+Conservative minification of the page template's <style> and <script> blocks
+(create_quiz_page.py --minify).
+
+Both minifiers are small tokenizers rather than general-purpose tools: they
+know where strings, comments, template literals and regular expression
+literals start and end, drop comments and indentation, and collapse the
+remaining whitespace only where it can't change the meaning of the code. In
+JavaScript a line break is kept unless the character before it can't end a
+statement or the one after it can't start one, so automatic semicolon
+insertion works as before. The output depends only on the input text.
+"""
+import re
+
+_STYLE_PATTERN = re.compile(r'(<style>)(.*?)(</style>)', re.S)
+_SCRIPT_PATTERN = re.compile(r'(<script>)(.*?)(</script>)', re.S)
+
+_CSS_TOKEN = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|/\*.*?\*/|\s+|[{};,>:]|[^"\'/\s{};,>:]+|/', re.S)
+# no space is needed after these or before them (except ':', since "a :hover" isn't "a:hover")
+_CSS_TIGHT_AFTER = set('{};,>:')
+_CSS_TIGHT_BEFORE = set('{};,>')
+
+_JS_WORD = re.compile(r'[\w$\u0080-\uffff]')
+# characters that can't end a statement / can't start one: a line break next to them is never needed
+_JS_NO_END = set('{([,;:=*%&|^!~?<>.')
+_JS_NO_START = set(')]},;:.?=*%&|^<>')
+_JS_REGEX_AFTER = set('(,=:[!&|?{};+-*%<>~^')
+_JS_REGEX_KEYWORDS = {'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete', 'void', 'throw',
+                      'instanceof', 'yield', 'await'}
+_JS_IDENTIFIER = re.compile(r'[\w$\u0080-\uffff]+')
+
+
+def minify_css(source):
+    """Drops comments, collapses whitespace and removes it around { } ; , > and after : (strings are kept as-is)."""
+    out = []
+    pending_space = False
+    for match in _CSS_TOKEN.finditer(source):
+        token = match.group()
+        if token.isspace() or token.startswith('/*'):
+            pending_space = True
+            continue
+        if pending_space and out and out[-1][-1] not in _CSS_TIGHT_AFTER and token[0] not in _CSS_TIGHT_BEFORE:
+            out.append(' ')
+        pending_space = False
+        if token == '}' and out and out[-1] == ';':
+            out.pop()
+        out.append(token)
+    return ''.join(out)
+
+
+def _is_word(char):
+    return bool(_JS_WORD.match(char))
+
+
+def _scan_string(source, start):
+    quote = source[start]
+    i = start + 1
+    while source[i] != quote:
+        i += 2 if source[i] == '\\' else 1
+    return i + 1
+
+
+def _scan_template(source, start):
+    """Scans a template literal piece from start (just after ` or the } closing a ${}) to its ` or ${."""
+    i = start
+    while True:
+        char = source[i]
+        if char == '\\':
+            i += 2
+        elif char == '`':
+            return i + 1, False
+        elif source.startswith('${', i):
+            return i + 2, True
+        else:
+            i += 1
+
+
+def _scan_regex(source, start):
+    i = start + 1
+    in_class = False
+    while True:
+        char = source[i]
+        if char == '\\':
+            i += 2
+            continue
+        if char == '[':
+            in_class = True
+        elif char == ']':
+            in_class = False
+        elif char == '/' and not in_class:
+            break
+        i += 1
+    i += 1
+    while i < len(source) and _is_word(source[i]):
+        i += 1
+    return i
+
+
+def _js_tokens(source):
+    """Yields (kind, text) with kind 'space' (text is '\\n' or ' '), 'comment' or 'code'."""
+    i = 0
+    n = len(source)
+    braces = []  # open braces inside each enclosing template ${...}
+    previous = ''  # last code character, to tell a regular expression from a division
+    previous_word = ''
+    while i < n:
+        char = source[i]
+        if char.isspace():
+            j = i
+            while j < n and source[j].isspace():
+                j += 1
+            yield 'space', '\n' if '\n' in source[i:j] else ' '
+            i = j
+        elif source.startswith('//', i):
+            j = source.find('\n', i)
+            i = n if j < 0 else j
+            yield 'comment', ''
+        elif source.startswith('/*', i):
+            j = source.index('*/', i + 2) + 2
+            yield ('space', '\n') if '\n' in source[i:j] else ('comment', '')
+            i = j
+        elif char in '"\'':
+            j = _scan_string(source, i)
+            yield 'code', source[i:j]
+            previous, i = char, j
+        elif char == '`' or (char == '}' and braces and braces[-1] == 0):
+            if char == '}':
+                braces.pop()
+            j, opened = _scan_template(source, i + 1)
+            if opened:
+                braces.append(0)
+            yield 'code', source[i:j]
+            previous, i = source[j - 1], j
+        elif char == '/' and (not previous or previous in _JS_REGEX_AFTER
+                              or (_is_word(previous) and previous_word in _JS_REGEX_KEYWORDS)):
+            j = _scan_regex(source, i)
+            yield 'code', source[i:j]
+            previous, previous_word, i = 'a', '', j
+        elif _is_word(char):
+            word = _JS_IDENTIFIER.match(source, i).group()
+            yield 'code', word
+            previous, previous_word, i = word[-1], word, i + len(word)
+        else:
+            if char == '{' and braces:
+                braces[-1] += 1
+            elif char == '}' and braces:
+                braces[-1] -= 1
+            yield 'code', char
+            previous, previous_word, i = char, '', i + 1
+
+
+def minify_js(source):
+    """Drops comments and indentation and collapses whitespace where it can't change the meaning."""
+    out = []
+    gap = None
+    for kind, text in _js_tokens(source):
+        if kind != 'code':
+            if kind == 'space' and text == '\n' or gap is None:
+                gap = text if kind == 'space' else ' '
+            continue
+        if gap is not None and out:
+            last, first = out[-1][-1], text[0]
+            if gap == '\n' and last not in _JS_NO_END and first not in _JS_NO_START:
+                out.append('\n')
+            elif ((_is_word(last) and _is_word(first)) or (last in '+-' and first == last)
+                  or (last == '/' and first in '/*')):
+                out.append(' ')
+        gap = None
+        out.append(text)
+    return ''.join(out)
+
+
+def minify_template(html):
+    """Minifies the contents of every <style> and plain <script> block of html; the rest is left as-is."""
+    html = _STYLE_PATTERN.sub(lambda match: match.group(1) + minify_css(match.group(2)) + match.group(3), html)
+    return _SCRIPT_PATTERN.sub(lambda match: match.group(1) + minify_js(match.group(2)) + match.group(3), html)
@@ -0,0 +1,126 @@
+"""
+Per-stage build profiling for create_quiz_page.py --profile.
+
+A build is streamed, so its stages (parsing the source, processing, serializing,
+the search index, template rendering, writing) interleave exam by exam. Each
+stage is timed every time it runs and the totals are reported. Stages can nest;
+a stage's self time excludes the stages run inside it. With memory tracing on,
+tracemalloc records each stage's peak allocation above what was allocated when
+the stage started.
+"""
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+REPORT_VERSION = 1
+
+
+class BuildProfile:
+    """Accumulates timings (and optionally tracemalloc peaks) by stage name."""
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self._stack = []
+        self._started = None
+        self._elapsed = 0.0
+        self._max_peak = 0
+        self.peak_bytes = None
+
+    def start(self):
+        self._started = time.perf_counter()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def stop(self):
+        self._elapsed = time.perf_counter() - self._started
+        if self.trace_memory:
+            self.peak_bytes = max(self._max_peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+    def _record(self, name):
+        return self.stages.setdefault(name, {'calls': 0, 'seconds': 0.0, 'self_seconds': 0.0, 'peak_bytes': 0})
+
+    @contextmanager
+    def stage(self, name):
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        current = 0
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            # reset_peak() is global: fold the peak so far into the enclosing stage and the whole build first
+            self._max_peak = max(self._max_peak, peak)
+            if self._stack:
+                self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak)
+            tracemalloc.reset_peak()
+        frame = {'start': time.perf_counter(), 'children': 0.0, 'base': current, 'peak': current}
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            elapsed = time.perf_counter() - frame['start']
+            record = self._record(name)
+            record['calls'] += 1
+            record['seconds'] += elapsed
+            record['self_seconds'] += elapsed - frame['children']
+            if self._stack:
+                self._stack[-1]['children'] += elapsed
+            if tracing:
+                peak = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+                record['peak_bytes'] = max(record['peak_bytes'], peak - frame['base'])
+                if self._stack:
+                    self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak)
+
+    def iterate(self, name, iterable):
+        """Yields from iterable, timing each step (the work of producing an item) as stage name."""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def report(self, **context):
+        """Returns the machine-readable report; context (source, output, options...) is included as-is."""
+        stages = [dict(name=name, **record) for name, record in self.stages.items()]
+        if not self.trace_memory:
+            for stage in stages:
+                stage['peak_bytes'] = None
+        stages.sort(key=lambda stage: stage['self_seconds'], reverse=True)
+        return {
+            'version': REPORT_VERSION,
+            **context,
+            'total_seconds': self._elapsed,
+            'tracemalloc': self.trace_memory,
+            'peak_bytes': self.peak_bytes,
+            'stages': stages,
+        }
+
+    def summary(self):
+        """Returns a short human-readable table of the stages, for stderr."""
+        lines = [f"{'階段':<14}{'次數':>8}{'自身秒數':>10}{'總秒數':>10}{'峰值 MB':>10}"]
+        for stage in self.report()['stages']:
+            peak = f"{stage['peak_bytes'] / 1e6:.1f}" if stage['peak_bytes'] is not None else '-'
+            lines.append(f"{stage['name']:<14}{stage['calls']:>8}{stage['self_seconds']:>10.4f}"
+                         f"{stage['seconds']:>10.4f}{peak:>10}")
+        lines.append(f"總計 {self._elapsed:.4f} 秒")
+        if self.trace_memory:
+            lines.append(f"記憶體峰值 {self.peak_bytes / 1e6:.1f} MB (tracemalloc 會拖慢建置，需要較準確的耗時請加上 --no-profile-memory)")
+        return '\n'.join(lines)
+
+
+class _NullProfile:
+    """Stands in for BuildProfile when profiling is off; every stage is a no-op."""
+
+    _context = nullcontext()
+
+    def stage(self, name):
+        return self._context
+
+    def iterate(self, name, iterable):
+        return iterable
+
+
+NULL_PROFILE = _NullProfile()
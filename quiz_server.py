@@ -0,0 +1,350 @@
+"""
+Serves quiz pages from memory: `python create_quiz_page.py serve [quiz_data.json]`.
+
+The page and one payload per exam (/exams/exam-<id>.json) are rendered once,
+with split='files', and kept in memory together with gzip (and, when the
+optional brotli module is installed, brotli) variants compressed up front.
+Responses carry strong ETags, so revalidating clients get 304s. The source file
+is polled and the site re-rendered in a worker thread when it changes; the old
+version keeps serving until the new one is ready.
+"""
+import argparse
+import asyncio
+import dataclasses
+import gzip
+import hashlib
+import sys
+import time
+from email.utils import formatdate
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError: # optional: without it only gzip variants are offered
+    brotli = None
+
+import create_quiz_page as builder
+
+PAGE_PATH = '/'
+CHUNK_DIR = 'exams'
+_MAX_HEADERS = 100
+_KEEP_ALIVE_TIMEOUT = 15.0
+
+_REASONS = {
+    200: 'OK',
+    204: 'No Content',
+    304: 'Not Modified',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    413: 'Payload Too Large',
+    431: 'Request Header Fields Too Large',
+    500: 'Internal Server Error',
+    503: 'Service Unavailable',
+}
+
+
+class Resource:
+    """A response body with its ETag and precompressed variants, keyed by content-coding."""
+
+    def __init__(self, body, content_type, cache_control='no-cache'):
+        self.content_type = content_type
+        self.cache_control = cache_control
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.variants = {'identity': (body, f'"{digest}"')}
+        compressed = gzip.compress(body, compresslevel=9, mtime=0)
+        if len(compressed) < len(body):
+            self.variants['gzip'] = (compressed, f'"{digest}-gz"')
+        if brotli is not None:
+            compressed = brotli.compress(body, quality=11)
+            if len(compressed) < len(body):
+                self.variants['br'] = (compressed, f'"{digest}-br"')
+
+    def choose(self, accept_encoding):
+        """Returns (coding, body, etag) for the best variant the client accepts."""
+        accepted = parse_accept_encoding(accept_encoding)
+        candidates = [(accepted.get('identity', accepted.get('*', 1.0)), 0, 'identity')]
+        for preference, coding in enumerate(('gzip', 'br'), 1):
+            q = accepted.get(coding, accepted.get('*', 0.0))
+            if coding in self.variants and q > 0:
+                candidates.append((q, preference, coding))
+        _q, _preference, best = max(candidates)
+        body, etag = self.variants[best]
+        return best, body, etag
+
+
+def not_modified(if_none_match, etag):
+    """
+    Whether an If-None-Match header matches etag, the ETag of the variant about
+    to be sent. A tag of another variant doesn't match: the client's cached copy
+    has a different Content-Encoding.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return etag in {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+
+
+def parse_accept_encoding(header):
+    """Parses an Accept-Encoding header into {coding: q}."""
+    accepted = {}
+    for item in (header or '').split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted['gzip' if coding == 'x-gzip' else coding] = q
+    return accepted
+
+
+def render_site(source, options):
+    """
+    Renders the page and per-exam payloads for source entirely in memory.
+    Returns ({path: Resource}, stats) where stats is build_quiz_page's dict.
+    """
+    options = dataclasses.replace(options, split='files', chunk_dir=CHUNK_DIR)
+    quiz_file = Path(source)
+    if not quiz_file.exists():
+        raise FileNotFoundError(f"找不到測驗資料檔案：{quiz_file}")
+    issues = []
+    resources = {}
+    exam_count = 0
+
+    def add_chunk(entry, payload):
+        nonlocal exam_count
+        exam_count += 1
+        resources[f"/{CHUNK_DIR}/exam-{entry['exam_id']}.json"] = Resource(
+            payload.encode('utf-8'), 'application/json; charset=utf-8')
+
+    with quiz_file.open('r', encoding='utf-8') as fp:
+        fragments = builder.iter_exam_fragments(builder.iter_quiz_exams(fp), options, None, issues)
+        page = ''.join(builder.iter_html_for_fragments(fragments, options, chunk_writer=add_chunk)) + '\n'
+    resources[PAGE_PATH] = resources['/index.html'] = Resource(page.encode('utf-8'), 'text/html; charset=utf-8')
+    return resources, {'exams': exam_count, 'issues': issues, 'page_cache': None}
+
+
+class HttpError(Exception):
+    def __init__(self, status):
+        super().__init__(_REASONS.get(status, str(status)))
+        self.status = status
+
+
+async def _read_line(reader, status):
+    try:
+        return await reader.readline()
+    except (ValueError, asyncio.LimitOverrunError):
+        # the line is longer than the stream's limit
+        raise HttpError(status) from None
+
+
+async def read_request(reader, max_body=0):
+    """
+    Reads one HTTP/1.x request. Returns (method, target, version, headers, body)
+    with lower-cased header names, or None when the client closed the connection.
+    Raises HttpError for malformed requests, over-long lines or bodies larger
+    than max_body.
+    """
+    request_line = await _read_line(reader, 400)
+    if not request_line:
+        return None
+    try:
+        method, target, version = request_line.decode('latin-1').split()
+    except ValueError:
+        raise HttpError(400) from None
+    if not version.startswith('HTTP/1.'):
+        raise HttpError(400)
+    headers = {}
+    for _ in range(_MAX_HEADERS):
+        line = await _read_line(reader, 431)
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, sep, value = line.decode('latin-1').partition(':')
+        if not sep:
+            raise HttpError(400)
+        headers[name.strip().lower()] = value.strip()
+    else:
+        raise HttpError(400)
+    body = b''
+    if 'content-length' in headers:
+        try:
+            length = int(headers['content-length'])
+        except ValueError:
+            raise HttpError(400) from None
+        if length < 0:
+            raise HttpError(400)
+        if length > max_body:
+            raise HttpError(413)
+        body = await reader.readexactly(length)
+    elif headers.get('transfer-encoding'):
+        raise HttpError(400) # chunked request bodies are not supported
+    return method, target, version, headers, body
+
+
+_date_cache = [0, '']
+
+def http_date():
+    now = int(time.time())
+    if _date_cache[0] != now:
+        _date_cache[:] = [now, formatdate(now, usegmt=True)]
+    return _date_cache[1]
+
+
+def format_response(status, headers, body=b'', head=False, keep_alive=True):
+    """Returns the bytes of a complete HTTP/1.1 response."""
+    lines = [f'HTTP/1.1 {status} {_REASONS.get(status, "")}', f'Date: {http_date()}']
+    lines.extend(f'{name}: {value}' for name, value in headers)
+    if status != 304:
+        lines.append(f'Content-Length: {len(body)}')
+    lines.append('Connection: keep-alive' if keep_alive else 'Connection: close')
+    head_bytes = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+    return head_bytes if head or status == 304 else head_bytes + body
+
+
+def wants_keep_alive(version, headers):
+    connection = headers.get('connection', '').lower()
+    if version == 'HTTP/1.0':
+        return connection == 'keep-alive'
+    return connection != 'close'
+
+
+class QuizServer:
+    """Holds the rendered site for source and serves it; watch() re-renders it when source changes."""
+
+    def __init__(self, source, options, poll_interval=1.0):
+        self.source = Path(source)
+        self.options = options
+        self.poll_interval = poll_interval
+        self.resources = {}
+        self._signature = None
+
+    def _stat_signature(self):
+        stat = self.source.stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self):
+        """Renders the site synchronously. Returns build stats."""
+        signature = self._stat_signature()
+        resources, stats = render_site(self.source, self.options)
+        self.resources = resources
+        self._signature = signature
+        return stats
+
+    async def watch(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                signature = self._stat_signature()
+            except OSError:
+                continue
+            if signature == self._signature:
+                continue
+            try:
+                resources, stats = await asyncio.to_thread(render_site, self.source, self.options)
+            except Exception as e:
+                self._signature = signature # don't retry until the file changes again
+                print(f"重新產生頁面失敗，繼續提供舊版本：\n{builder.describe_build_error(e, self.source)}", file=sys.stderr)
+                continue
+            self.resources = resources
+            self._signature = signature
+            print(f"已重新產生頁面 ({stats['exams']} 個測驗)", file=sys.stderr)
+
+    def respond(self, method, target, headers, keep_alive):
+        if method not in ('GET', 'HEAD'):
+            return format_response(405, [('Allow', 'GET, HEAD')], b'', keep_alive=keep_alive)
+        resource = self.resources.get(target.split('?', 1)[0])
+        if resource is None:
+            return format_response(404, [('Content-Type', 'text/plain; charset=utf-8')], b'Not Found',
+                                   head=method == 'HEAD', keep_alive=keep_alive)
+        coding, body, etag = resource.choose(headers.get('accept-encoding'))
+        response_headers = [
+            ('Content-Type', resource.content_type),
+            ('ETag', etag),
+            ('Cache-Control', resource.cache_control),
+            ('Vary', 'Accept-Encoding'),
+        ]
+        if coding != 'identity':
+            response_headers.append(('Content-Encoding', coding))
+        if not_modified(headers.get('if-none-match'), etag):
+            return format_response(304, response_headers, keep_alive=keep_alive)
+        return format_response(200, response_headers, body, head=method == 'HEAD', keep_alive=keep_alive)
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(read_request(reader), _KEEP_ALIVE_TIMEOUT)
+                except HttpError as e:
+                    writer.write(format_response(e.status, [], b'', keep_alive=False))
+                    break
+                if request is None:
+                    break
+                method, target, version, headers, _body = request
+                keep_alive = wants_keep_alive(version, headers)
+                writer.write(self.respond(method, target, headers, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            try:
+                await writer.drain()
+                writer.close()
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle, host, port, backlog=1024)
+        watcher = asyncio.create_task(self.watch())
+        addresses = ', '.join(f'http://{sock.getsockname()[0]}:{sock.getsockname()[1]}/' for sock in server.sockets)
+        print(f"正在提供測驗頁面：{addresses} (Ctrl+C 停止)", file=sys.stderr)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            watcher.cancel()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='create_quiz_page.py serve',
+                                     description="以記憶體中預先產生與壓縮的頁面提供測驗，來源檔案變更時自動重新產生。")
+    parser.add_argument('input', nargs='?', default='quiz_data.json', help="測驗資料 JSON 檔案 (預設: quiz_data.json)")
+    parser.add_argument('--host', default='127.0.0.1', help="監聽位址 (預設: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8000, help="監聽埠號 (預設: 8000)")
+    parser.add_argument('--encoding', choices=builder.ENCODINGS, default='json', help="題目資料編碼 (預設: json)")
+    parser.add_argument('--search', action='store_true', help="嵌入題庫搜尋索引")
+    parser.add_argument('--no-search', dest='search', action='store_false', help=argparse.SUPPRESS)
+    parser.add_argument('--poll-interval', type=float, default=1.0, metavar='SECONDS',
+                        help="檢查來源檔案變更的間隔秒數 (預設: 1)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    server = QuizServer(args.input, builder.PageOptions(encoding=args.encoding, search=args.search), args.poll_interval)
+    try:
+        stats = server.load()
+    except Exception as e:
+        print(builder.describe_build_error(e, args.input), file=sys.stderr)
+        sys.exit(1)
+    for issue in stats['issues']:
+        if issue['severity'] == 'warning':
+            print(f"警告：{issue['message']}", file=sys.stderr)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,255 @@
+"""
+Aggregates attempt logs exported by the quiz page: `python create_quiz_page.py stats <logs...>`.
+
+Every line of a log is one finished attempt (see recordAttempt in the page):
+
+    {"v": 1, "attempt_id": ..., "mode": "exam" | "practice", "exam_ids": [...],
+     "score": ..., "max_score": ..., "responses": [[exam_id, question_number,
+     chosen_option_or_null, correct_option, points], ...]}
+
+Logs are read line by line and only counters are kept, so memory depends on the
+number of distinct questions, never on the number of attempts. With --state,
+the counters and how far each shard has been read are saved, and later runs read
+only what was appended since. A shard is recognized by a hash of its first
+line, so renaming or moving it doesn't cause it to be counted twice.
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+
+import create_quiz_page as builder
+
+STATE_VERSION = 1
+SCORE_BINS = 10
+
+
+def new_state():
+    return {'version': STATE_VERSION, 'shards': {}, 'questions': {}, 'scores': {}, 'skipped_lines': 0}
+
+
+def load_state(path):
+    """Returns the saved aggregation state at path, or a new one if it doesn't exist yet."""
+    try:
+        with open(path, 'r', encoding='utf-8') as fp:
+            state = json.load(fp)
+    except FileNotFoundError:
+        return new_state()
+    if state.get('version') != STATE_VERSION:
+        raise ValueError(f"不支援的統計狀態檔案版本：{path}")
+    return state
+
+
+def _question_counters(state, exam_id, question_number):
+    key = f'{exam_id}:{question_number}'
+    counters = state['questions'].get(key)
+    if counters is None:
+        counters = state['questions'][key] = {
+            'exam_id': exam_id, 'question': question_number,
+            'attempts': 0, 'answered': 0, 'correct': 0, 'key': None, 'options': {},
+        }
+    return counters
+
+
+def _score_group(record):
+    exam_ids = record.get('exam_ids') or []
+    if record.get('mode') == 'exam' and len(exam_ids) == 1:
+        return f'exam:{exam_ids[0]}'
+    return 'practice'
+
+
+def _is_option(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def add_record(state, record):
+    """Adds one attempt record to the counters. Raises ValueError (or KeyError/TypeError) if it is malformed."""
+    if not isinstance(record, dict):
+        raise ValueError("record is not an object")
+    if record.get('v') != 1:
+        raise ValueError(f"unsupported record version {record.get('v')!r}")
+    # validate everything before touching the counters, so a bad record changes nothing
+    responses = [(str(exam_id), int(question_number), chosen, key)
+                 for exam_id, question_number, chosen, key, _points in record['responses']]
+    for _exam_id, _question_number, chosen, key in responses:
+        # the counters are saved with --state, so a bad option would break every later run
+        if not _is_option(key) or not (chosen is None or _is_option(chosen)):
+            raise ValueError(f"invalid option in response: chosen {chosen!r}, key {key!r}")
+    max_score = float(record['max_score'])
+    score = float(record['score'])
+
+    for exam_id, question_number, chosen, key in responses:
+        counters = _question_counters(state, exam_id, question_number)
+        counters['attempts'] += 1
+        counters['key'] = key
+        if chosen is not None:
+            counters['answered'] += 1
+            counters['options'][str(chosen)] = counters['options'].get(str(chosen), 0) + 1
+            if chosen == key:
+                counters['correct'] += 1
+
+    group = state['scores'].setdefault(_score_group(record), {
+        'attempts': 0, 'sum': 0.0, 'sum_squares': 0.0, 'min': None, 'max': None, 'bins': [0] * SCORE_BINS,
+    })
+    percent = 100.0 * score / max_score if max_score > 0 else 0.0
+    group['attempts'] += 1
+    group['sum'] += percent
+    group['sum_squares'] += percent * percent
+    group['min'] = percent if group['min'] is None else min(group['min'], percent)
+    group['max'] = percent if group['max'] is None else max(group['max'], percent)
+    group['bins'][min(int(percent * SCORE_BINS / 100), SCORE_BINS - 1)] += 1
+
+
+def _shard_id(first_line):
+    return hashlib.sha256(first_line).hexdigest()
+
+
+def ingest_shard(state, path):
+    """
+    Adds the records of one JSONL shard that weren't read before. A trailing line
+    without a newline is left for the next run, since the log may still be
+    growing. Returns the number of records added.
+    """
+    with open(path, 'rb') as fp:
+        first_line = fp.readline()
+        if not first_line.endswith(b'\n'):
+            return 0
+        shard = state['shards'].setdefault(_shard_id(first_line), {'offset': 0, 'records': 0})
+        shard['path'] = str(path)
+        fp.seek(shard['offset'])
+        added = 0
+        for line in fp:
+            if not line.endswith(b'\n'):
+                break
+            shard['offset'] += len(line)
+            if not line.strip():
+                continue
+            try:
+                add_record(state, json.loads(line))
+            except (ValueError, KeyError, TypeError):
+                state['skipped_lines'] += 1
+                continue
+            added += 1
+        shard['records'] += added
+    return added
+
+
+def find_shards(patterns):
+    """Expands files, directories (their *.jsonl) and glob patterns into a sorted list of shard paths."""
+    paths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths.update(str(path) for path in Path(pattern).glob('*.jsonl'))
+        elif os.path.exists(pattern):
+            paths.add(pattern)
+        else:
+            paths.update(glob.glob(pattern))
+    return sorted(paths)
+
+
+def summarize(state):
+    """Returns the statistics report: per-question correct and option rates, and per-group score distributions."""
+    questions = []
+    for counters in state['questions'].values():
+        answered = counters['answered']
+        options = {
+            option: {'count': count, 'rate': count / answered if answered else 0.0}
+            for option, count in sorted(counters['options'].items(), key=lambda item: int(item[0]))
+        }
+        distractors = {option: stats['rate'] for option, stats in options.items() if option != str(counters['key'])}
+        questions.append({
+            'exam_id': counters['exam_id'],
+            'question': counters['question'],
+            'key': counters['key'],
+            'attempts': counters['attempts'],
+            'answered': answered,
+            'correct_rate': counters['correct'] / counters['attempts'] if counters['attempts'] else 0.0,
+            'options': options,
+            'distractor_rates': distractors,
+        })
+    questions.sort(key=lambda question: (not question['exam_id'].isdigit(), len(question['exam_id']),
+                                         question['exam_id'], question['question']))
+
+    scores = {}
+    for name, group in sorted(state['scores'].items()):
+        mean = group['sum'] / group['attempts']
+        variance = max(group['sum_squares'] / group['attempts'] - mean * mean, 0.0)
+        width = 100 // SCORE_BINS
+        scores[name] = {
+            'attempts': group['attempts'],
+            'mean_percent': mean,
+            'stdev_percent': variance ** 0.5,
+            'min_percent': group['min'],
+            'max_percent': group['max'],
+            'histogram': {f'{low}-{low + width}': count for low, count in zip(range(0, 100, width), group['bins'])},
+        }
+
+    return {
+        'attempts': sum(group['attempts'] for group in state['scores'].values()),
+        'skipped_lines': state['skipped_lines'],
+        'shards': len(state['shards']),
+        'questions': questions,
+        'scores': scores,
+    }
+
+
+def format_summary(report, limit=10):
+    lines = [f"共 {report['attempts']} 次作答、{len(report['questions'])} 題 ({report['shards']} 個紀錄檔，略過 {report['skipped_lines']} 行)"]
+    for name, group in report['scores'].items():
+        lines.append(f"  {name}: {group['attempts']} 次，平均 {group['mean_percent']:.1f}% (標準差 {group['stdev_percent']:.1f})")
+    hardest = sorted((question for question in report['questions'] if question['attempts']),
+                     key=lambda question: question['correct_rate'])[:limit]
+    if hardest:
+        lines.append("答對率最低的題目：")
+        for question in hardest:
+            distractor = max(question['distractor_rates'].items(), key=lambda item: item[1], default=None)
+            note = f"，最常選的錯誤選項 ({distractor[0]}) {distractor[1]:.0%}" if distractor else ''
+            lines.append(f"  第 {question['exam_id']} 屆 第 {question['question']} 題：答對率 {question['correct_rate']:.0%} "
+                         f"({question['attempts']} 次){note}")
+    return '\n'.join(lines)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='create_quiz_page.py stats',
+                                     description="彙整頁面匯出的作答紀錄 (JSONL)：各題答對率、選項選擇率與分數分布。")
+    parser.add_argument('logs', nargs='+', help="作答紀錄檔案、目錄 (讀取其中的 *.jsonl) 或 glob")
+    parser.add_argument('--state', metavar='PATH',
+                        help="累計狀態檔案：保存統計與各紀錄檔已讀取的位置，之後只處理新增的紀錄")
+    parser.add_argument('-o', '--output', metavar='PATH', help="將統計報告寫入 JSON 檔案")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        state = load_state(args.state) if args.state else new_state()
+    except (OSError, ValueError) as e:
+        print(f"錯誤：無法讀取統計狀態檔案：{e}", file=sys.stderr)
+        sys.exit(1)
+    shards = find_shards(args.logs)
+    if not shards:
+        print("錯誤：找不到作答紀錄檔案", file=sys.stderr)
+        sys.exit(1)
+    added = 0
+    for path in shards:
+        try:
+            added += ingest_shard(state, path)
+        except OSError as e:
+            print(f"警告：無法讀取 {path}：{e}", file=sys.stderr)
+    report = summarize(state)
+    # saved only once the counters are known to summarize
+    if args.state:
+        builder.write_file_atomically(args.state, lambda fp: json.dump(state, fp, ensure_ascii=False))
+    if hasattr(sys.stdout, 'reconfigure'):
+        sys.stdout.reconfigure(encoding='utf-8')
+    print(f"本次新增 {added} 筆作答紀錄")
+    print(format_summary(report))
+    if args.output:
+        builder.write_file_atomically(args.output, lambda fp: json.dump(report, fp, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
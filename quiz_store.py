@@ -0,0 +1,363 @@
+"""
+SQLite question store: `python create_quiz_page.py store import|list|build`.
+
+Banks are imported into a local SQLite database with tables for exams,
+questions, options and sources (the question_sources/answer_sources page
+references). Each exam is validated with process_exam on import, so only
+usable questions are stored, and rows are inserted with executemany inside a
+single transaction per import.
+
+QuizStore.query() returns a read-only mapping of exam_id -> raw exam in the
+quiz_data.json schema, loaded lazily one exam at a time and restricted to the
+requested exams and question numbers. It can be passed wherever quiz_data is
+expected (create_html_quiz_page, iter_html_quiz_page...), so a page can be
+rendered from a subset of a large store without loading the whole bank.
+"""
+import argparse
+import dataclasses
+import sqlite3
+import sys
+from collections.abc import Mapping
+from pathlib import Path
+
+import create_quiz_page as builder
+
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS exams (
+    exam_key INTEGER PRIMARY KEY,
+    exam_id TEXT NOT NULL UNIQUE,
+    exam_number,
+    title TEXT NOT NULL,
+    source_file TEXT
+);
+CREATE TABLE IF NOT EXISTS questions (
+    question_key INTEGER PRIMARY KEY,
+    exam_key INTEGER NOT NULL REFERENCES exams (exam_key),
+    question_number NOT NULL,
+    question_text TEXT NOT NULL,
+    answer INTEGER NOT NULL,
+    points REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS questions_number ON questions (exam_key, question_number);
+CREATE TABLE IF NOT EXISTS options (
+    question_key INTEGER NOT NULL REFERENCES questions (question_key),
+    position INTEGER NOT NULL,
+    option_id INTEGER NOT NULL,
+    option_text TEXT NOT NULL,
+    PRIMARY KEY (question_key, position)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sources (
+    question_key INTEGER NOT NULL REFERENCES questions (question_key),
+    kind TEXT NOT NULL CHECK (kind IN ('question', 'answer')),
+    position INTEGER NOT NULL,
+    reference NOT NULL,
+    PRIMARY KEY (question_key, kind, position)
+) WITHOUT ROWID;
+"""
+_IMPORT_CACHE_KIB = 256 * 1024
+
+
+def _scalar(value):
+    return value if isinstance(value, (int, float, str)) and not isinstance(value, bool) else None
+
+
+def _question_rows(exam_key, first_question_key, raw_exam, exam, source_indexes):
+    """
+    Rows for the questions, options and sources tables of one processed exam,
+    whose questions get consecutive keys from first_question_key on.
+    source_indexes are the positions of its questions in raw_exam (see process_exam).
+    """
+    questions, options, sources = [], [], []
+    for question_key, (question, source_index) in enumerate(zip(exam['questions'], source_indexes), first_question_key):
+        questions.append((question_key, exam_key, question['id'], question['text'], question['answer'],
+                          question['points']))
+        options.extend((question_key, position, option['option_id'], option['text'])
+                       for position, option in enumerate(question['options']))
+        raw = raw_exam['questions'][source_index]
+        for kind in ('question', 'answer'):
+            references = raw.get(f'{kind}_sources')
+            if isinstance(references, list):
+                sources.extend((question_key, kind, position, reference)
+                               for position, reference in enumerate(references) if _scalar(reference) is not None)
+    return questions, options, sources
+
+
+class QuizStore:
+    """A question bank stored in the SQLite database at path (created if missing)."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute('PRAGMA journal_mode = WAL')
+        self.connection.execute('PRAGMA synchronous = NORMAL')
+        version = self.connection.execute('PRAGMA user_version').fetchone()[0]
+        if version not in (0, SCHEMA_VERSION):
+            raise ValueError(f"不支援的題庫資料庫版本 ({version})：{self.path}")
+        with self.connection:
+            self.connection.executescript(_SCHEMA)
+            self.connection.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _delete_exam(self, exam_id):
+        row = self.connection.execute('SELECT exam_key FROM exams WHERE exam_id = ?', (exam_id,)).fetchone()
+        if row is None:
+            return
+        questions = 'SELECT question_key FROM questions WHERE exam_key = ?'
+        self.connection.execute(f'DELETE FROM sources WHERE question_key IN ({questions})', row)
+        self.connection.execute(f'DELETE FROM options WHERE question_key IN ({questions})', row)
+        self.connection.execute('DELETE FROM questions WHERE exam_key = ?', row)
+        self.connection.execute('DELETE FROM exams WHERE exam_key = ?', row)
+
+    def import_file(self, source):
+        """
+        Imports the quiz data file source, read one exam at a time. Exams already
+        in the store are replaced. Everything is written in one transaction: if an
+        exam has an error, QuizDataError is raised (after checking the whole file)
+        and nothing is imported. Returns {'exams', 'questions', 'issues'}.
+        """
+        quiz_file = Path(source)
+        if not quiz_file.exists():
+            raise FileNotFoundError(f"找不到測驗資料檔案：{quiz_file}")
+        issues = []
+        exams = questions = 0
+        failed = False
+        cache_size = self.connection.execute('PRAGMA cache_size').fetchone()[0]
+        self.connection.execute(f'PRAGMA cache_size = {-_IMPORT_CACHE_KIB}')
+        try:
+            with self.connection, quiz_file.open('r', encoding='utf-8') as fp:
+                exam_key, question_key = self.connection.execute(
+                    'SELECT (SELECT COALESCE(MAX(exam_key), 0) FROM exams), '
+                    '(SELECT COALESCE(MAX(question_key), 0) FROM questions)').fetchone()
+                for exam_id, raw_exam in builder.iter_quiz_exams(fp):
+                    source_indexes = []
+                    exam, exam_issues = builder.process_exam(exam_id, raw_exam, source_indexes)
+                    issues.extend(exam_issues)
+                    failed = failed or any(issue['severity'] == 'error' for issue in exam_issues)
+                    if exam is None or failed:
+                        continue
+                    self._delete_exam(exam_id)
+                    exam_key += 1
+                    question_rows, option_rows, source_rows = _question_rows(exam_key, question_key + 1, raw_exam, exam,
+                                                                            source_indexes)
+                    question_key += len(question_rows)
+                    self.connection.execute('INSERT INTO exams VALUES (?, ?, ?, ?, ?)',
+                                            (exam_key, exam_id, _scalar(raw_exam.get('exam_number')), exam['title'],
+                                             str(quiz_file)))
+                    self.connection.executemany('INSERT INTO questions VALUES (?, ?, ?, ?, ?, ?)', question_rows)
+                    self.connection.executemany('INSERT INTO options VALUES (?, ?, ?, ?)', option_rows)
+                    self.connection.executemany('INSERT INTO sources VALUES (?, ?, ?, ?)', source_rows)
+                    exams += 1
+                    questions += len(question_rows)
+                if failed:
+                    raise builder.QuizDataError(issues)
+        finally:
+            self.connection.execute(f'PRAGMA cache_size = {cache_size}')
+        return {'exams': exams, 'questions': questions, 'issues': issues}
+
+    def exams(self):
+        """Returns (exam_id, title, question_count) for every stored exam, in import order."""
+        return self.connection.execute(
+            'SELECT e.exam_id, e.title, (SELECT COUNT(*) FROM questions q WHERE q.exam_key = e.exam_key) '
+            'FROM exams e ORDER BY e.exam_key').fetchall()
+
+    def query(self, exam_ids=None, questions=None):
+        """
+        Returns a StoreQuery over the exams in exam_ids (default: all) and the
+        questions whose number is within the inclusive range questions, a
+        (first, last) pair where either end may be None (default: all).
+        """
+        return StoreQuery(self, exam_ids, questions)
+
+
+class StoreQuery(Mapping):
+    """
+    Read-only exam_id -> raw exam mapping over a QuizStore query. Exams are read
+    from the database when accessed and not kept, so iterating over items()
+    holds only one exam in memory at a time. Exams without any matching
+    question are left out.
+    """
+
+    def __init__(self, store, exam_ids=None, questions=None):
+        self._connection = store.connection
+        self._exam_ids = None if exam_ids is None else [str(exam_id) for exam_id in exam_ids]
+        first, last = questions or (None, None)
+        conditions, self._question_params = [], []
+        if first is not None:
+            conditions.append('q.question_number >= ?')
+            self._question_params.append(first)
+        if last is not None:
+            conditions.append('q.question_number <= ?')
+            self._question_params.append(last)
+        self._question_filter = ''.join(f' AND {condition}' for condition in conditions)
+
+    def _keys(self):
+        sql = ('SELECT e.exam_id FROM exams e WHERE EXISTS '
+               f'(SELECT 1 FROM questions q WHERE q.exam_key = e.exam_key{self._question_filter})')
+        params = list(self._question_params)
+        if self._exam_ids is not None:
+            sql += f" AND e.exam_id IN ({', '.join('?' * len(self._exam_ids))})"
+            params.extend(self._exam_ids)
+        return [row[0] for row in self._connection.execute(sql + ' ORDER BY e.exam_key', params)]
+
+    def __iter__(self):
+        return iter(self._keys())
+
+    def __len__(self):
+        return len(self._keys())
+
+    def __getitem__(self, exam_id):
+        if self._exam_ids is not None and exam_id not in self._exam_ids:
+            raise KeyError(exam_id)
+        row = self._connection.execute('SELECT exam_key, exam_number FROM exams WHERE exam_id = ?',
+                                       (exam_id,)).fetchone()
+        if row is None:
+            raise KeyError(exam_id)
+        exam_key, exam_number = row
+        params = [exam_key, *self._question_params]
+        questions = {}
+        for question_key, number, text, answer in self._connection.execute(
+                'SELECT q.question_key, q.question_number, q.question_text, q.answer FROM questions q '
+                f'WHERE q.exam_key = ?{self._question_filter} ORDER BY q.question_key', params):
+            questions[question_key] = {'question_number': number, 'question_text': text, 'options': {},
+                                       'answer': str(answer), 'question_sources': [], 'answer_sources': []}
+        if not questions:
+            raise KeyError(exam_id)
+        for question_key, option_id, text in self._connection.execute(
+                'SELECT o.question_key, o.option_id, o.option_text FROM questions q '
+                'JOIN options o ON o.question_key = q.question_key '
+                f'WHERE q.exam_key = ?{self._question_filter} ORDER BY o.question_key, o.position', params):
+            questions[question_key]['options'][str(option_id)] = text
+        for question_key, kind, reference in self._connection.execute(
+                'SELECT s.question_key, s.kind, s.reference FROM questions q '
+                'JOIN sources s ON s.question_key = q.question_key '
+                f'WHERE q.exam_key = ?{self._question_filter} ORDER BY s.question_key, s.kind, s.position', params):
+            questions[question_key][f'{kind}_sources'].append(reference)
+        return {'exam_number': exam_number, 'questions': list(questions.values())}
+
+
+def build_from_store(query, output, options=None):
+    """
+    Writes the page for a StoreQuery to the path output (stdout when None), with
+    split='files' chunks in options.chunk_dir next to it. Returns {'exams', 'issues'}.
+    The page is streamed to stdout like build_quiz_page does: stored exams were
+    validated on import, so only an empty query is checked before writing.
+    """
+    options = options or builder.PageOptions()
+    if options.split == 'files' and output is None:
+        raise ValueError("split='files' requires an output path")
+    if not query:
+        raise builder.QuizDataError([builder._issue('error', '題庫中沒有符合條件的測驗或題目')])
+    chunk_dir = Path(output).parent / options.chunk_dir if options.split == 'files' else None
+    if chunk_dir is not None:
+        chunk_dir.mkdir(parents=True, exist_ok=True)
+    issues = []
+    exam_ids = []
+
+    def write_chunk(entry, payload):
+        builder.write_file_atomically(chunk_dir / f"exam-{entry['exam_id']}.json", lambda fp: fp.write(payload))
+
+    def write_page(fp):
+        fragments = builder.iter_exam_fragments(query.items(), options, None, issues)
+        fragments = ((exam_ids.append(fragment[0]['exam_id']) or fragment) for fragment in fragments)
+        builder.write_chunks(builder.iter_html_for_fragments(fragments, options, write_chunk), fp)
+        fp.write('\n')
+
+    if output is None:
+        if hasattr(sys.stdout, 'reconfigure'):
+            sys.stdout.reconfigure(encoding='utf-8')
+        write_page(sys.stdout)
+    else:
+        builder.write_file_atomically(output, write_page)
+    return {'exams': len(exam_ids), 'issues': issues}
+
+
+def _parse_exam_ids(text):
+    return [exam_id.strip() for exam_id in text.split(',') if exam_id.strip()]
+
+
+def _parse_question_range(text):
+    """'1-40' -> (1, 40); '41-' and '-40' leave one end open; '7' -> (7, 7)."""
+    first, separator, last = text.partition('-')
+    try:
+        first = int(first) if first.strip() else None
+        last = int(last) if last.strip() else None
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"無效的題號範圍：{text!r}") from None
+    return (first, last) if separator else (first, first)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='create_quiz_page.py store',
+                                     description="SQLite 題庫：匯入測驗資料，並依屆別或題號範圍產生頁面。")
+    parser.add_argument('--db', default='quiz_data.sqlite', help="題庫資料庫路徑 (預設: quiz_data.sqlite)")
+    commands = parser.add_subparsers(dest='command', required=True)
+    import_parser = commands.add_parser('import', help="匯入測驗資料 JSON 檔案 (同 ID 的測驗會被取代)")
+    import_parser.add_argument('inputs', nargs='+', help="測驗資料 JSON 檔案")
+    commands.add_parser('list', help="列出資料庫中的測驗")
+    build_parser = commands.add_parser('build', help="由資料庫查詢產生測驗頁面")
+    build_parser.add_argument('-o', '--output', metavar='PATH', help="輸出 HTML 檔案路徑 (預設: 標準輸出)")
+    build_parser.add_argument('--exams', type=_parse_exam_ids, metavar='ID,ID...', help="只包含這些測驗 (預設: 全部)")
+    build_parser.add_argument('--questions', type=_parse_question_range, metavar='FIRST-LAST',
+                              help="只包含題號在此範圍內的題目，例如 1-40 或 41-")
+    build_parser.add_argument('--split', choices=builder.SPLIT_MODES, help="分割輸出 (同 create_quiz_page.py --split)")
+    build_parser.add_argument('--encoding', choices=builder.ENCODINGS, default='json', help="題目資料編碼 (預設: json)")
+    build_parser.add_argument('--search', action='store_true', help="嵌入題庫搜尋索引")
+    build_parser.add_argument('--no-search', dest='search', action='store_false', help=argparse.SUPPRESS)
+    build_parser.add_argument('--minify', action='store_true', help="壓縮頁面模板中的 CSS 與 JavaScript")
+    build_parser.add_argument('--compress', action='store_true', help="以 deflate 壓縮各測驗資料 (同 create_quiz_page.py --compress)")
+    build_parser.add_argument('--prerender', action='store_true', help="預先產生測驗選單的靜態 HTML (同 create_quiz_page.py --prerender)")
+    args = parser.parse_args(argv)
+    if args.command == 'build' and args.split == 'files' and not args.output:
+        parser.error("--split files 需要搭配 --output")
+    return args
+
+
+def _print_warnings(issues):
+    for issue in issues:
+        if issue['severity'] == 'warning':
+            print(f"警告：{issue['message']}", file=sys.stderr)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    source = args.db
+    try:
+        with QuizStore(args.db) as store:
+            if args.command == 'import':
+                for source in args.inputs:
+                    stats = store.import_file(source)
+                    _print_warnings(stats['issues'])
+                    print(f"已匯入 {source}：{stats['exams']} 個測驗，{stats['questions']} 題", file=sys.stderr)
+            elif args.command == 'list':
+                if hasattr(sys.stdout, 'reconfigure'):
+                    sys.stdout.reconfigure(encoding='utf-8')
+                for exam_id, title, question_count in store.exams():
+                    print(f"{exam_id}\t{title}\t{question_count} 題")
+            else:
+                options = builder.PageOptions(split=args.split, encoding=args.encoding, search=args.search,
+                                              minify=args.minify, compress=args.compress,
+                                              prerender=args.prerender)
+                if args.split == 'files':
+                    options = dataclasses.replace(options, chunk_dir=f'{Path(args.output).stem}-data')
+                stats = build_from_store(store.query(args.exams, args.questions), args.output, options)
+                _print_warnings(stats['issues'])
+    except sqlite3.Error as e:
+        print(f"錯誤：無法存取題庫資料庫 {args.db}：{e}", file=sys.stderr)
+        sys.exit(1)
+    except Exception as e:
+        print(builder.describe_build_error(e, source), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,308 @@
+"""
+Watch mode: `python create_quiz_page.py <quiz_data.json> -o <page> --watch`.
+
+The source file is polled (its mtime and size, stdlib only) and the page is
+rebuilt whenever it changes. Every exam's fragment (manifest entry, serialized
+payload, search terms, issues) is kept in memory with the JSON text of the raw
+exam it was built from, so a rebuild re-processes only the exams that differ
+from the last parsed version, key order included (it is the order of the choices). The search index is kept as one serialized piece per token and
+only the tokens of changed exams are re-encoded, unless exams were added,
+removed, reordered or changed their question count. The output is identical
+to a clean build of the same source and replaces the page atomically; with
+split='files' only the changed exams' chunk files are rewritten, and those of
+removed exams are deleted.
+"""
+import bisect
+import json
+import sys
+import time
+from pathlib import Path
+
+import create_quiz_page as builder
+
+DEFAULT_POLL_INTERVAL = 0.5
+
+
+def _encode_segment(entries):
+    """
+    One exam's postings of a token, entries being question_index * 2 + in_text
+    ascending: (first entry, last question index, the delta-encoded rest as ',d,d...').
+    """
+    previous = entries[0] >> 1
+    rest = []
+    for entry in entries[1:]:
+        doc = entry >> 1
+        rest.append(f',{(doc - previous) * 2 + (entry & 1)}')
+        previous = doc
+    return entries[0], previous, ''.join(rest)
+
+
+class SearchIndexState:
+    """
+    The page's search index, updated exam by exam. json() returns the same text
+    as serializing build_search_index over every exam.
+
+    Each token's postings are kept as one pre-encoded segment per exam (see
+    _encode_segment), in page order, next to its serialized part of the token's
+    array. Only the first delta of a part depends on the exam before it, so a
+    changed exam re-encodes its own segments and at most the part that follows
+    each of them; a token's array is then a join of the cached parts.
+    """
+
+    def __init__(self):
+        self._layout = None
+        self._offsets = []
+        self._exam_tokens = []
+        self._segments = {}
+        self._positions = {}
+        self._parts = {}
+        self._pieces = {}
+        self._tokens = []
+
+    def _part(self, token, index):
+        positions, segments = self._positions[token], self._segments[token]
+        position = positions[index]
+        first, _last, rest = segments[position]
+        previous = 0
+        if index:
+            previous = self._offsets[positions[index - 1]] + segments[positions[index - 1]][1]
+        return f'{(self._offsets[position] + (first >> 1) - previous) * 2 + (first & 1)}{rest}'
+
+    def _set_segment(self, token, position, segment):
+        positions = self._positions.setdefault(token, [])
+        parts = self._parts.setdefault(token, [])
+        self._segments.setdefault(token, {})[position] = segment
+        index = bisect.bisect_left(positions, position)
+        if index == len(positions) or positions[index] != position:
+            positions.insert(index, position)
+            parts.insert(index, None)
+        parts[index] = self._part(token, index)
+        if index + 1 < len(positions):
+            parts[index + 1] = self._part(token, index + 1)
+
+    def _drop_segment(self, token, position):
+        positions = self._positions[token]
+        index = bisect.bisect_left(positions, position)
+        del positions[index]
+        del self._parts[token][index]
+        del self._segments[token][position]
+        if index < len(positions):
+            self._parts[token][index] = self._part(token, index)
+
+    def _rebuild(self, layout, terms_by_exam):
+        self._layout = layout
+        self._offsets, self._exam_tokens = [], []
+        self._segments, self._positions, self._parts, self._pieces = {}, {}, {}, {}
+        offset = 0
+        for _exam_key, question_count in layout:
+            self._offsets.append(offset)
+            offset += question_count
+        for position, (exam_key, _question_count) in enumerate(layout):
+            terms = terms_by_exam[exam_key]
+            for token, entries in terms.items():
+                self._segments.setdefault(token, {})[position] = _encode_segment(entries)
+                self._positions.setdefault(token, []).append(position)
+                self._parts.setdefault(token, []).append(None)
+                self._parts[token][-1] = self._part(token, len(self._positions[token]) - 1)
+            self._exam_tokens.append(tuple(terms))
+        return set(self._positions)
+
+    def update(self, layout, terms_by_exam, changed):
+        """
+        layout is [(exam_key, question_count)] in page order, terms_by_exam each
+        exam's search terms and changed the keys of the exams whose terms may differ
+        from the previous update. Adding, removing or reordering exams rebuilds the
+        index. Returns the number of re-serialized tokens.
+        """
+        keys = [exam_key for exam_key, _question_count in layout]
+        if self._layout is None or keys != [exam_key for exam_key, _question_count in self._layout]:
+            affected = self._rebuild(layout, terms_by_exam)
+            self._tokens = []
+        else:
+            # a changed question count shifts the documents of every later exam
+            resized = [position for position, (old, new) in enumerate(zip(self._layout, layout)) if old[1] != new[1]]
+            self._layout = layout
+            offset = 0
+            for position, (_exam_key, question_count) in enumerate(layout):
+                self._offsets[position] = offset
+                offset += question_count
+            affected = set()
+            positions = {exam_key: position for position, exam_key in enumerate(keys)}
+            for exam_key in changed:
+                position = positions[exam_key]
+                terms = terms_by_exam[exam_key]
+                for token in self._exam_tokens[position]:
+                    if token not in terms:
+                        self._drop_segment(token, position)
+                for token, entries in terms.items():
+                    self._set_segment(token, position, _encode_segment(entries))
+                affected.update(self._exam_tokens[position])
+                affected.update(terms)
+                self._exam_tokens[position] = tuple(terms)
+            # within a run of shifted exams the deltas don't change, only the first part after each boundary
+            for position in resized:
+                for token, token_positions in self._positions.items():
+                    index = bisect.bisect_right(token_positions, position)
+                    if index < len(token_positions):
+                        self._parts[token][index] = self._part(token, index)
+                        affected.add(token)
+
+        tokens_changed = not self._tokens
+        for token in affected:
+            if not self._positions[token]:
+                for table in (self._positions, self._parts, self._segments, self._pieces):
+                    del table[token]
+                tokens_changed = True
+                continue
+            tokens_changed = tokens_changed or token not in self._pieces
+            self._pieces[token] = f'{json.dumps(token, ensure_ascii=False)}:[{",".join(self._parts[token])}]'
+        if tokens_changed:
+            self._tokens = sorted(self._pieces)
+        return len(affected)
+
+    def json(self):
+        docs = self._offsets[-1] + self._layout[-1][1] if self._layout else 0
+        return f'{{"docs":{docs},"terms":{{{",".join(self._pieces[token] for token in self._tokens)}}}}}'
+
+
+class IncrementalPage:
+    """The fragments of a page, rebuilt only for the exams that changed."""
+
+    def __init__(self, options, item_flags=None):
+        self.options = options
+        self.item_flags = item_flags
+        self._encoder = json.JSONEncoder(ensure_ascii=False, indent=None)
+        self._exams = {}
+        self._order = []
+        self._index = SearchIndexState()
+
+    def update(self, exam_items):
+        """
+        Diffs exam_items, (exam_key, raw_exam) pairs, against the previous update
+        and rebuilds the fragments of the exams that changed. Raises QuizDataError
+        like iter_exam_fragments, in which case the previous state is kept.
+        Returns (changed, removed, reordered): the keys of the exams that were
+        added or changed and of those that are gone, and whether the remaining
+        exams moved.
+        """
+        exams = {}
+        changed = []
+        for exam_key, raw_exam in exam_items:
+            previous = self._exams.get(exam_key)
+            source = json.dumps(raw_exam, ensure_ascii=False)
+            if previous is not None and previous['source'] == source:
+                exams[exam_key] = previous
+                continue
+            entry, issues, payload, terms = builder._exam_fragment(exam_key, raw_exam, self.options, self._encoder,
+                                                                   None, builder.NULL_PROFILE)
+            if self.item_flags:
+                issues = issues + builder._item_flag_issues(exam_key, raw_exam, self.item_flags)
+            exams[exam_key] = {'source': source, 'entry': entry, 'issues': issues, 'payload': payload, 'terms': terms}
+            changed.append(exam_key)
+
+        issues = [issue for exam in exams.values() for issue in exam['issues']]
+        order = [exam_key for exam_key, exam in exams.items() if exam['entry'] is not None]
+        if not order:
+            issues.append(builder._issue('error', '所有原始測驗資料轉換後均無效或沒有題目。請檢查 quiz_data.json 的內容與結構。'))
+        if any(issue['severity'] == 'error' for issue in issues):
+            raise builder.QuizDataError(issues)
+
+        removed = [exam_key for exam_key in self._exams if exam_key not in exams]
+        kept = [exam_key for exam_key in self._order if exam_key in exams]
+        reordered = kept != [exam_key for exam_key in order if exam_key in self._exams]
+        if not changed and not removed and order == self._order:
+            return changed, removed, reordered
+        self._exams = exams
+        self._order = order
+        if self.options.search:
+            layout = [(exam_key, exams[exam_key]['entry']['question_count']) for exam_key in order]
+            self._index.update(layout, {exam_key: exams[exam_key]['terms'] for exam_key in order},
+                               [exam_key for exam_key in changed if exams[exam_key]['entry'] is not None])
+        return changed, removed, reordered
+
+    @property
+    def issues(self):
+        return [issue for exam in self._exams.values() for issue in exam['issues']]
+
+    def iter_html(self, chunk_writer=None):
+        fragments = ((self._exams[exam_key]['entry'], self._exams[exam_key]['payload'], None)
+                     for exam_key in self._order)
+        search_index = self._index.json() if self.options.search else None
+        return builder.iter_html_for_fragments(fragments, self.options, chunk_writer, search_index=search_index)
+
+    def write(self, output, changed, removed=()):
+        """
+        Writes the page to output atomically; with split='files', rewrites only
+        the chunks of changed exams and deletes those of removed exams.
+        """
+        output = Path(output)
+        chunk_dir = output.parent / self.options.chunk_dir if self.options.split == 'files' else None
+        changed = set(changed)
+
+        def write_chunk(entry, payload):
+            if entry['exam_id'] in changed:
+                builder.write_file_atomically(chunk_dir / f"exam-{entry['exam_id']}.json", lambda fp: fp.write(payload))
+
+        if chunk_dir is not None:
+            chunk_dir.mkdir(parents=True, exist_ok=True)
+
+        def write_page(fp):
+            builder.write_chunks(self.iter_html(write_chunk), fp)
+            fp.write('\n')
+
+        builder.write_file_atomically(output, write_page)
+        if chunk_dir is not None:
+            # changed exams without usable questions are no longer on the page either
+            stale = [*removed, *(exam_key for exam_key in changed if self._exams[exam_key]['entry'] is None)]
+            for exam_key in stale:
+                (chunk_dir / f"exam-{exam_key}.json").unlink(missing_ok=True)
+        if self.options.service_worker:
+            builder.write_service_worker(output, self.options, self._order)
+
+
+def _stat_signature(path):
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def rebuild(page, source, output):
+    """Re-reads source and updates output if any exam changed or moved. Returns (changed, removed, seconds)."""
+    started = time.perf_counter()
+    with source.open('r', encoding='utf-8') as fp:
+        changed, removed, reordered = page.update(builder.iter_quiz_exams(fp))
+    if changed or removed or reordered:
+        page.write(output, changed, removed)
+    return changed, removed, time.perf_counter() - started
+
+
+def watch(source, output, options, item_flags=None, poll_interval=DEFAULT_POLL_INTERVAL):
+    """Builds output from source, then rebuilds it whenever source changes, until interrupted."""
+    source = Path(source)
+    page = IncrementalPage(options, item_flags)
+    signature = None
+    print(f"監看 {source} 的變更，輸出至 {output} (按 Ctrl+C 結束)", file=sys.stderr)
+    try:
+        while True:
+            try:
+                current = _stat_signature(source)
+            except OSError:
+                current = None
+            if current is not None and current != signature:
+                signature = current
+                try:
+                    changed, removed, seconds = rebuild(page, source, output)
+                except Exception as e:
+                    print(builder.describe_build_error(e, source), file=sys.stderr)
+                    print("保留上一版頁面，等待下一次修改", file=sys.stderr)
+                else:
+                    for issue in page.issues:
+                        if issue['severity'] == 'warning' and issue['exam_id'] in changed:
+                            print(f"警告：{issue['message']}", file=sys.stderr)
+                    if changed or removed:
+                        names = ', '.join(changed[:5]) + (' ...' if len(changed) > 5 else '')
+                        note = f"，移除 {len(removed)} 個測驗" if removed else ''
+                        print(f"已重新產生 {len(changed)} 個測驗 ({names}){note}，耗時 {seconds * 1000:.0f} 毫秒",
+                              file=sys.stderr)
+            time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        pass
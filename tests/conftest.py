@@ -0,0 +1,34 @@
+import json
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import quiz_bench
+
+
+@pytest.fixture
+def bank():
+    """A small deterministic bank in the quiz_data.json schema: 5 exams, 250 questions."""
+    return dict(quiz_bench.generate_bank(250, seed=1))
+
+
+@pytest.fixture
+def run_js(tmp_path):
+    """Runs a script with node and returns what it printed, parsed as JSON."""
+    node = shutil.which('node')
+    if node is None:
+        pytest.skip("node is not installed")
+
+    def run(source):
+        path = tmp_path / 'script.js'
+        path.write_text(source, encoding='utf-8')
+        completed = subprocess.run([node, str(path)], capture_output=True, text=True)
+        assert completed.returncode == 0, completed.stderr
+        return json.loads(completed.stdout)
+
+    return run
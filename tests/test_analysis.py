@@ -0,0 +1,95 @@
+import json
+import math
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+import quiz_analysis
+
+
+def _record(responses, mode='exam', exam_ids=('1',)):
+    return {'v': 1, 'attempt_id': 'a', 'mode': mode, 'exam_ids': list(exam_ids), 'score': 1.5, 'max_score': 3.0,
+            'responses': responses}
+
+
+GOOD = _record([['1', 1, 2, 2, 1.5], ['1', 2, None, 3, 1.5]])
+MALFORMED = [
+    '[1, 2]',
+    '"text"',
+    '42',
+    'not json',
+    json.dumps({'v': 2, 'responses': []}),
+    json.dumps(_record([['1', 1, 'x', 2, 1.5]])),
+    json.dumps(_record([['1', 1, True, 2, 1.5]])),
+    json.dumps(_record([['1', 1, 2, '2', 1.5]])),
+    json.dumps(_record([['1', 'one', 2, 2, 1.5]])),
+    json.dumps(_record([['1', 1, 2]])),
+    json.dumps({k: v for k, v in GOOD.items() if k != 'score'}),
+    json.dumps(_record([['1', 1, 200, 2, 1.5], ['1', 2, 1, 3, 1.5]])),
+]
+
+
+def _simulate(attempts=400, items=12, seed=3):
+    """Responses where ability drives correctness; item 0 is keyed 1 although 2 is the right answer."""
+    rng = np.random.default_rng(seed)
+    ability = rng.normal(size=(attempts, 1))
+    difficulty = np.linspace(-1.5, 1.5, items)
+    correct = rng.random((attempts, items)) < 1 / (1 + np.exp(difficulty - 1.7 * ability))
+    wrong = rng.integers(1, 4, size=(attempts, items))
+    wrong[wrong >= 2] += 1 # any option but 2
+    chosen = np.where(correct, 2, wrong).astype(np.int8)
+    keys = [1] + [2] * (items - 1)
+    return chosen, keys
+
+
+def test_skips_malformed_lines(tmp_path):
+    path = tmp_path / 'attempts.jsonl'
+    practice = _record([['1', 1, 2, 2, 1.5]], mode='practice')
+    lines = [json.dumps(GOOD), *MALFORMED, json.dumps(GOOD), json.dumps(practice)]
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    matrices, skipped = quiz_analysis.read_response_matrices([path])
+    questions, chosen, keys = matrices['1']
+    assert questions == [1, 2]
+    # the analysis doesn't use the score, so the record without one is a third usable attempt
+    assert chosen.tolist() == [[2, 0], [2, 0], [2, 0]]
+    assert keys == [2, 3]
+    # records that aren't full-exam attempts (practice, or the v2 line without a mode) are ignored, not skipped;
+    # the out-of-range option id is skipped like the other malformed lines
+    assert skipped == len(MALFORMED) - 2
+
+
+def test_statistics_match_a_direct_computation():
+    chosen, keys = _simulate()
+    weights = [1.5] * 6 + [2.0] * 6
+    stats = quiz_analysis.analyze_matrix(chosen, keys, weights)
+    correct = (chosen == np.array(keys)).astype(float)
+    weighted = correct * weights
+    items = len(keys)
+    for column in range(items):
+        rest = weighted.sum(axis=1) - weighted[:, column]
+        assert stats['p'][column] == pytest.approx(correct[:, column].mean())
+        assert stats['r_pb'][column] == pytest.approx(np.corrcoef(correct[:, column], rest)[0, 1], abs=1e-5)
+    p = correct.mean(axis=0)
+    kr20 = items / (items - 1) * (1 - (p * (1 - p)).sum() / correct.sum(axis=1).var())
+    alpha = items / (items - 1) * (1 - weighted.var(axis=0).sum() / weighted.sum(axis=1).var())
+    assert stats['kr20'] == pytest.approx(kr20, abs=1e-5)
+    assert stats['alpha'] == pytest.approx(alpha, abs=1e-5)
+    assert stats['max_score'] == sum(weights)
+    assert stats['option_rates'].sum(axis=0) == pytest.approx(np.ones(items))
+
+
+def test_miskeyed_item_is_flagged():
+    chosen, keys = _simulate()
+    stats = quiz_analysis.analyze_matrix(chosen, keys, [1.5] * len(keys))
+    flags, suggested = quiz_analysis.item_flags(stats, keys, 0)
+    assert 'key_suspect' in flags and suggested == 2
+    assert all('key_suspect' not in quiz_analysis.item_flags(stats, keys, column)[0]
+               for column in range(1, len(keys)))
+
+
+def test_constant_columns_give_nan():
+    chosen = np.array([[1, 2], [1, 3]], dtype=np.int8)
+    stats = quiz_analysis.analyze_matrix(chosen, [1, 2], [1.5, 1.5])
+    assert math.isnan(stats['r_pb'][0])
+    assert stats['p'].tolist() == [1.0, 0.5]
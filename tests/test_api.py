@@ -0,0 +1,84 @@
+import io
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import create_quiz_page as builder
+
+OPTION_SETS = [
+    builder.PageOptions(),
+    builder.PageOptions(split='inline'),
+    builder.PageOptions(split='files', minify=True),
+    builder.PageOptions(encoding='compact', search=True),
+    builder.PageOptions(compress=True, prerender=True, split='inline', minify=True),
+]
+
+
+@pytest.mark.parametrize('options', OPTION_SETS)
+def test_render_page_matches_create_html_quiz_page(bank, options):
+    assert builder.render_page(bank, options) == builder.create_html_quiz_page(bank, options).encode('utf-8')
+
+
+def test_prepared_quiz_renders_other_layouts(bank):
+    prepared = builder.prepare_quiz(bank)
+    assert prepared.exam_ids == list(bank)
+    for options in (builder.PageOptions(split='inline'), builder.PageOptions(minify=True), builder.PageOptions()):
+        assert builder.render_page(prepared, options) == builder.render_page(bank, options)
+    chunks = {}
+    builder.render_page(prepared, builder.PageOptions(split='files'),
+                        lambda entry, payload: chunks.update({entry['exam_id']: payload}))
+    assert {exam_id: json.loads(payload) for exam_id, payload in chunks.items()} == {
+        exam['exam_id']: exam for exam in builder.prepare_exams(bank)}
+
+
+@pytest.mark.parametrize('options', [
+    builder.PageOptions(encoding='compact'),
+    builder.PageOptions(compress=True),
+    builder.PageOptions(prerender=True),
+    builder.PageOptions(search=True),
+])
+def test_payload_options_cant_change(bank, options):
+    with pytest.raises(ValueError):
+        builder.render_page(builder.prepare_quiz(bank), options)
+
+
+def test_build_to_a_file_object_or_a_path(bank, tmp_path):
+    source = tmp_path / 'quiz_data.json'
+    source.write_text(json.dumps(bank, ensure_ascii=False), encoding='utf-8')
+    expected = builder.create_html_quiz_page(bank).encode('utf-8') + b'\n'
+    for data in (source, str(source), bank, builder.prepare_quiz(bank)):
+        dest = io.BytesIO()
+        stats = builder.build(data, dest)
+        assert dest.getvalue() == expected
+        assert stats['exams'] == len(bank)
+    page = tmp_path / 'out' / 'index.html'
+    page.parent.mkdir()
+    builder.build(bank, page)
+    assert page.read_bytes() == expected
+    builder.build(source, page)
+    assert page.read_bytes() == expected
+
+
+def test_build_refuses_sidecar_files_without_a_path(bank):
+    for options in (builder.PageOptions(split='files'), builder.PageOptions(service_worker='sw.js')):
+        with pytest.raises(ValueError):
+            builder.build(bank, io.BytesIO(), options)
+    with pytest.raises(FileNotFoundError):
+        builder.build('missing.json', io.BytesIO())
+
+
+def test_build_reports_invalid_data(bank):
+    next(iter(bank.values()))['questions'][0]['answer'] = '9'
+    with pytest.raises(builder.QuizDataError):
+        builder.build(bank, io.BytesIO())
+
+
+def test_import_has_no_side_effects(tmp_path):
+    root = Path(builder.__file__).resolve().parent
+    completed = subprocess.run([sys.executable, '-c', 'import create_quiz_page'], cwd=tmp_path, capture_output=True,
+                               env={'PYTHONPATH': str(root), 'PYTHONDONTWRITEBYTECODE': '1'})
+    assert (completed.returncode, completed.stdout, completed.stderr) == (0, b'', b'')
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,52 @@
+import json
+from pathlib import Path
+
+import pytest
+
+import create_quiz_page as builder
+import quiz_bench
+
+
+@pytest.fixture
+def banks(tmp_path):
+    directory = tmp_path / 'banks'
+    directory.mkdir()
+    for index in range(3):
+        bank = dict(quiz_bench.generate_bank(60 + 30 * index, seed=index))
+        (directory / f'bank{index}.json').write_text(json.dumps(bank, ensure_ascii=False), encoding='utf-8')
+    (directory / 'broken.json').write_text('{"1": ', encoding='utf-8')
+    return directory
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_batch_matches_single_builds(banks, tmp_path, jobs):
+    output_dir = tmp_path / f'out-{jobs}'
+    results = list(builder.build_batch(builder.find_quiz_files(banks), output_dir=output_dir, jobs=jobs))
+    assert sorted(Path(result['output']).name for result in results) == [
+        'bank0.html', 'bank1.html', 'bank2.html', 'broken.html']
+    failed = [result for result in results if result['error']]
+    assert [Path(result['source']).name for result in failed] == ['broken.json']
+    assert not (output_dir / 'broken.html').exists()
+    for index in range(3):
+        single = tmp_path / f'single{index}.html'
+        builder.build_quiz_page(banks / f'bank{index}.json', single)
+        assert (output_dir / f'bank{index}.html').read_bytes() == single.read_bytes()
+
+
+def test_batch_split_files_uses_one_chunk_dir_per_bank(banks, tmp_path):
+    output_dir = tmp_path / 'out'
+    files = [banks / 'bank0.json', banks / 'bank1.json']
+    results = list(builder.build_batch(files, builder.PageOptions(split='files'), output_dir, jobs=2))
+    assert not any(result['error'] for result in results)
+    for name in ('bank0', 'bank1'):
+        assert list((output_dir / f'{name}-data').glob('exam-*.json'))
+        assert f'{name}-data' in (output_dir / f'{name}.html').read_text(encoding='utf-8')
+
+
+def test_batch_rejects_colliding_outputs(banks, tmp_path):
+    other = tmp_path / 'other'
+    other.mkdir()
+    (other / 'bank0.json').write_bytes((banks / 'bank0.json').read_bytes())
+    with pytest.raises(ValueError):
+        list(builder.build_batch([banks / 'bank0.json', other / 'bank0.json'], output_dir=tmp_path / 'out'))
+
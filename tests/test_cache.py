@@ -0,0 +1,83 @@
+import json
+import os
+
+import pytest
+
+import create_quiz_page as builder
+from quiz_cache import BuildCache, content_hash, parse_size
+
+
+def test_content_hash_separates_parts():
+    assert content_hash('ab', 'c') != content_hash('a', 'bc')
+    assert content_hash('x') == content_hash(b'x')
+
+
+@pytest.mark.parametrize('text, size', [('500000', 500000), ('64K', 65536), ('2m', 2 * 1024 ** 2), ('1GB', 1024 ** 3)])
+def test_parse_size(text, size):
+    assert parse_size(text) == size
+
+
+def test_get_and_put(tmp_path):
+    cache = BuildCache(tmp_path)
+    assert cache.get('pages', 'ab' * 32) is None
+    cache.put('pages', 'ab' * 32, b'data')
+    assert cache.get('pages', 'ab' * 32) == b'data'
+    assert cache.stats['pages'] == {'hits': 1, 'misses': 1}
+
+
+def test_failed_write_leaves_no_entry(tmp_path):
+    cache = BuildCache(tmp_path)
+    with pytest.raises(RuntimeError):
+        with cache.writer('pages', 'cd' * 32) as fp:
+            fp.write(b'partial')
+            raise RuntimeError
+    assert cache.get('pages', 'cd' * 32) is None
+    assert not [name for _root, _dirs, files in os.walk(tmp_path) for name in files]
+
+
+def test_prune_evicts_least_recently_used(tmp_path):
+    cache = BuildCache(tmp_path, max_bytes=250)
+    keys = [content_hash(name) for name in 'abc']
+    for age, key in enumerate(keys, 1):
+        cache.put('fragments', key, b'x' * 100)
+        os.utime(cache._path('fragments', key), ns=(age, age))
+    # a hit makes the oldest entry the most recently used one
+    assert cache.get('fragments', keys[0]) is not None
+    assert cache.prune() == 1
+    assert [cache.get('fragments', key) is not None for key in keys] == [True, False, True]
+    assert cache.prune() == 0
+
+
+def test_page_and_fragment_hits(bank, tmp_path):
+    source = tmp_path / 'quiz_data.json'
+    source.write_text(json.dumps(bank, ensure_ascii=False), encoding='utf-8')
+    cache = BuildCache(tmp_path / 'cache')
+    first = builder.build_quiz_page(source, tmp_path / 'first.html', cache=cache)
+    second = builder.build_quiz_page(source, tmp_path / 'second.html', cache=cache)
+    assert (first['page_cache'], second['page_cache']) == ('miss', 'hit')
+    assert (tmp_path / 'first.html').read_bytes() == (tmp_path / 'second.html').read_bytes()
+
+    edited = dict(bank)
+    exam_id = next(iter(edited))
+    edited[exam_id] = dict(edited[exam_id], title='改過的標題')
+    source.write_text(json.dumps(edited, ensure_ascii=False), encoding='utf-8')
+    cache.stats.clear()
+    assert builder.build_quiz_page(source, tmp_path / 'edited.html', cache=cache)['page_cache'] == 'miss'
+    # only the edited exam is processed again
+    assert cache.stats['fragments'] == {'hits': len(bank) - 1, 'misses': 1}
+    builder.build_quiz_page(source, tmp_path / 'clean.html')
+    assert (tmp_path / 'edited.html').read_bytes() == (tmp_path / 'clean.html').read_bytes()
+
+
+def test_option_order_is_part_of_the_fragment_key(bank, tmp_path):
+    source = tmp_path / 'quiz_data.json'
+    cache = BuildCache(tmp_path / 'cache')
+    source.write_text(json.dumps(bank, ensure_ascii=False), encoding='utf-8')
+    builder.build_quiz_page(source, tmp_path / 'before.html', cache=cache)
+    question = next(iter(bank.values()))['questions'][0]
+    question['options'] = dict(reversed(list(question['options'].items())))
+    source.write_text(json.dumps(bank, ensure_ascii=False), encoding='utf-8')
+    builder.build_quiz_page(source, tmp_path / 'cached.html', cache=cache)
+    builder.build_quiz_page(source, tmp_path / 'clean.html')
+    assert (tmp_path / 'cached.html').read_bytes() == (tmp_path / 'clean.html').read_bytes()
+    assert (tmp_path / 'cached.html').read_bytes() != (tmp_path / 'before.html').read_bytes()
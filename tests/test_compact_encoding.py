@@ -0,0 +1,44 @@
+import json
+
+import create_quiz_page as builder
+import quiz_bench
+
+
+def _exams(bank):
+    return builder.prepare_exams(bank)
+
+
+def test_repeated_texts_are_stored_once(bank):
+    exam = _exams(bank)[0]
+    exam['questions'][1]['options'][0]['text'] = exam['questions'][0]['options'][0]['text']
+    encoded = builder.encode_exam_compact(exam)
+    assert len(encoded['strings']) == len(set(encoded['strings']))
+    assert encoded['questions'][0][2][0] == encoded['questions'][1][2][0]
+
+
+def test_option_ids_only_when_not_positional():
+    exam = builder.prepare_exams({'1': {'questions': [
+        {'question_number': 1, 'question_text': 'a', 'options': {'1': 'x', '2': 'y'}, 'answer': 1},
+        {'question_number': 2, 'question_text': 'b', 'options': {'2': 'x', '4': 'y'}, 'answer': 4},
+    ]}})[0]
+    first, second = builder.encode_exam_compact(exam)['questions']
+    assert len(first) == 5
+    assert second[5] == [2, 4]
+
+
+def test_page_decodes_to_the_processed_exam(bank, run_js):
+    exams = _exams(bank)
+    exams[0]['questions'][0]['options'].reverse()
+    encoded = [builder.encode_exam_compact(exam) for exam in exams]
+    decoded = run_js(f"""
+const quizConfig = {{encoding: 'compact'}};
+{quiz_bench._extract_functions(builder._PAGE_TEMPLATE, ['decodeExam'])}
+console.log(JSON.stringify({json.dumps(encoded, ensure_ascii=False)}.map(decodeExam)));
+""")
+    assert decoded == json.loads(json.dumps(exams, ensure_ascii=False))
+
+
+def test_compact_page_is_smaller(bank):
+    plain = builder.create_html_quiz_page(bank)
+    compact = builder.create_html_quiz_page(bank, builder.PageOptions(encoding='compact'))
+    assert len(compact) < len(plain)
@@ -0,0 +1,43 @@
+import base64
+import json
+import re
+import zlib
+
+import create_quiz_page as builder
+import quiz_bench
+
+INFLATE_FUNCTIONS = ['inflateExam', 'startMeasure', 'endMeasure', 'measured']
+
+
+def _payloads(page):
+    manifest = re.findall(r'<script type="application/json" id="exam-([^"]+)">(.*?)</script>', page, re.S)
+    return {exam_id: json.loads(payload) for exam_id, payload in manifest}
+
+
+def test_compress_payload_round_trip():
+    payload = json.dumps({'text': '區塊鏈 <script>' * 20}, ensure_ascii=False)
+    literal = builder.compress_payload(payload)
+    assert re.fullmatch(r'"[A-Za-z0-9+/=]+"', literal)
+    assert zlib.decompress(base64.b64decode(json.loads(literal))).decode('utf-8') == payload
+    assert len(literal) < len(payload.encode('utf-8'))
+
+
+def test_compressed_chunks_hold_the_plain_chunks(bank):
+    plain = _payloads(builder.create_html_quiz_page(bank, builder.PageOptions(split='inline')))
+    compressed = _payloads(builder.create_html_quiz_page(bank, builder.PageOptions(split='inline', compress=True)))
+    assert list(compressed) == list(plain) == list(bank)
+    for exam_id, data in compressed.items():
+        assert isinstance(data, str)
+        assert json.loads(zlib.decompress(base64.b64decode(data))) == plain[exam_id]
+
+
+def test_page_inflates_the_payload(bank, run_js):
+    exam = builder.prepare_exams(bank)[0]
+    payload = json.dumps(exam, ensure_ascii=False)
+    inflated = run_js(f"""
+const quizConfig = {{compression: 'deflate'}};
+const canMeasure = false;
+{quiz_bench._extract_functions(builder._PAGE_TEMPLATE, INFLATE_FUNCTIONS)}
+inflateExam({builder.compress_payload(payload)}, 'x').then(exam => console.log(JSON.stringify(exam)));
+""")
+    assert inflated == json.loads(payload)
@@ -0,0 +1,59 @@
+import copy
+import itertools
+import json
+
+import create_quiz_page as builder
+import quiz_dedupe
+
+
+def _questions(bank):
+    return [((exam['exam_id'], question['id']), question)
+            for exam in builder.prepare_exams(bank) for question in exam['questions']]
+
+
+def _with_near_duplicates(bank):
+    """bank with the first question of each exam copied into the next exam, lightly edited."""
+    bank = copy.deepcopy(bank)
+    keys = list(bank)
+    for source_key, target_key in zip(keys, keys[1:]):
+        original = bank[source_key]['questions'][0]
+        target = bank[target_key]['questions'][5]
+        target['question_text'] = '  ' + original['question_text'].replace('，', ', ') + '？'
+        target['options'] = dict(zip(target['options'], reversed(list(original['options'].values()))))
+    return bank
+
+
+def test_normalize_text():
+    assert quiz_dedupe.normalize_text('ＡＢＣ，區塊 鏈_!') == 'abc區塊鏈'
+
+
+def test_finds_edited_copies(bank):
+    questions = _questions(_with_near_duplicates(bank))
+    groups = quiz_dedupe.find_duplicate_groups(questions)
+    found = {tuple(questions[index][0] for index in group['members']) for group in groups}
+    keys = list(bank)
+    for source_key, target_key in zip(keys, keys[1:]):
+        assert any((source_key, 1) in group and (target_key, 6) in group for group in found)
+
+
+def test_groups_match_brute_force(bank):
+    questions = _questions(_with_near_duplicates(bank))
+    shingles = [quiz_dedupe.question_shingles(question) for _key, question in questions]
+    threshold = 0.8
+    expected = {(first, second) for first, second in itertools.combinations(range(len(questions)), 2)
+                if quiz_dedupe.jaccard(shingles[first], shingles[second]) >= threshold}
+    groups = quiz_dedupe.find_duplicate_groups(questions, threshold)
+    grouped = {pair for group in groups for pair in itertools.combinations(group['members'], 2)}
+    assert expected <= grouped
+    assert all(group['similarity'] >= threshold for group in groups)
+
+
+def test_groups_round_trip_through_the_output_file(bank, tmp_path):
+    questions = _questions(_with_near_duplicates(bank))
+    titles = {exam['exam_id']: exam['title'] for exam in builder.prepare_exams(bank)}
+    groups = quiz_dedupe.find_duplicate_groups(questions)
+    path = tmp_path / 'duplicates.json'
+    path.write_text(json.dumps(quiz_dedupe.describe_groups(groups, questions, titles), ensure_ascii=False),
+                    encoding='utf-8')
+    loaded = quiz_dedupe.load_duplicate_groups(path)
+    assert loaded == tuple(tuple(questions[index][0] for index in group['members']) for group in groups)
@@ -0,0 +1,126 @@
+import asyncio
+import json
+import sqlite3
+
+import pytest
+
+import create_quiz_page as builder
+import quiz_grader
+
+
+@pytest.fixture
+def source(bank, tmp_path):
+    path = tmp_path / 'quiz_data.json'
+    path.write_text(json.dumps(bank, ensure_ascii=False), encoding='utf-8')
+    return path
+
+
+@pytest.fixture
+def key(source):
+    key, issues = quiz_grader.AnswerKey.load(source)
+    assert issues == []
+    return key
+
+
+def _answers(exam):
+    return {question['id']: question['answer'] for question in exam['questions']}
+
+
+def test_key_uses_the_page_points(key, bank):
+    for exam in builder.prepare_exams(bank):
+        assert key.max_scores[exam['exam_id']] == sum(builder.question_points(number) for number in _answers(exam))
+        for number, answer in _answers(exam).items():
+            assert key.questions[(exam['exam_id'], number)] == (answer, 2.0 if 41 <= number <= 60 else 1.5)
+    assert len(key.questions) == sum(len(exam['questions']) for exam in bank.values())
+
+
+def test_grade(key, bank):
+    exam = builder.prepare_exams(bank)[0]
+    answers = _answers(exam)
+    wrong = answers[2] % 4 + 1
+    response, row = key.grade({'exam_id': exam['exam_id'], 'attempt_id': 'a1', 'candidate': 'c',
+                               'answers': [[1, answers[1]], [2, wrong], [3, None], [41, answers[41]]]})
+    assert response == {'attempt_id': 'a1', 'exam_id': exam['exam_id'], 'score': 3.5,
+                        'max_score': key.max_scores[exam['exam_id']], 'correct': 2, 'answered': 3,
+                        'results': [1, 0, 0, 1]}
+    assert row[:7] == ('a1', exam['exam_id'], 'c', 3.5, response['max_score'], 2, 3)
+    assert json.loads(row[8]) == [[1, answers[1]], [2, wrong], [3, None], [41, answers[41]]]
+    response, row = key.grade({'exam_id': exam['exam_id'], 'answers': []})
+    assert (response['score'], response['results'], row[2]) == (0.0, [], None)
+    assert response['attempt_id']
+
+
+@pytest.mark.parametrize('submission', [
+    [],
+    {'exam_id': 'missing', 'answers': []},
+    {'exam_id': 1, 'answers': []},
+    {'exam_id': '{exam_id}', 'answers': {}},
+    {'exam_id': '{exam_id}', 'answers': [[1]]},
+    {'exam_id': '{exam_id}', 'answers': [[1, 2, 3]]},
+    {'exam_id': '{exam_id}', 'answers': [['1', 2]]},
+    {'exam_id': '{exam_id}', 'answers': [[True, 2]]},
+    {'exam_id': '{exam_id}', 'answers': [[1, 2.0]]},
+    {'exam_id': '{exam_id}', 'answers': [[1000, 2]]},
+    {'exam_id': '{exam_id}', 'answers': [[1, 2], [1, None]]},
+    {'exam_id': '{exam_id}', 'attempt_id': 5, 'answers': []},
+    {'exam_id': '{exam_id}', 'candidate': 'x' * 201, 'answers': []},
+])
+def test_rejects_malformed_submissions(key, bank, submission):
+    if isinstance(submission, dict) and submission['exam_id'] == '{exam_id}':
+        submission = dict(submission, exam_id=next(iter(bank)))
+    with pytest.raises(quiz_grader.SubmissionError):
+        key.grade(submission)
+
+
+def test_key_refuses_invalid_questions(bank, tmp_path):
+    exam = next(iter(bank.values()))
+    exam['questions'][1]['question_number'] = exam['questions'][0]['question_number']
+    path = tmp_path / 'quiz_data.json'
+    path.write_text(json.dumps(bank, ensure_ascii=False), encoding='utf-8')
+    with pytest.raises(builder.QuizDataError) as raised:
+        quiz_grader.AnswerKey.load(path)
+    assert any('重複' in issue['message'] for issue in raised.value.issues)
+
+
+def test_results_are_committed_in_batches(key, bank, tmp_path):
+    exam_id = next(iter(bank))
+    db = tmp_path / 'results.sqlite'
+
+    async def run():
+        results = quiz_grader.ResultWriter(db, batch_size=4, queue_size=100)
+        await results.start()
+        rows = [key.grade({'exam_id': exam_id, 'attempt_id': f'a{index}', 'answers': [[1, None]]})[1]
+                for index in range(10)]
+        await asyncio.gather(*(results.store(row) for row in rows))
+        await results.close()
+        return results
+
+    results = asyncio.run(run())
+    assert (results.stored, results.batches) == (10, 3)
+    with sqlite3.connect(db) as connection:
+        stored = connection.execute('SELECT attempt_id FROM submissions ORDER BY submission_key').fetchall()
+    assert stored == [(f'a{index}',) for index in range(10)]
+
+
+def test_server_grades_and_stores(key, bank, tmp_path):
+    exam = builder.prepare_exams(bank)[0]
+    body = json.dumps({'exam_id': exam['exam_id'], 'answers': [[1, _answers(exam)[1]]]}).encode()
+
+    async def run():
+        results = quiz_grader.ResultWriter(tmp_path / 'results.sqlite')
+        server = quiz_grader.GradingServer(key, results)
+        await results.start()
+        responses = [await server.respond('POST', '/grade', body, True),
+                     await server.respond('POST', '/grade', b'not json', True),
+                     await server.respond('GET', '/grade', b'', True),
+                     await server.respond('GET', '/stats', b'', True)]
+        await results.close()
+        return responses
+
+    graded, rejected, wrong_method, stats = asyncio.run(run())
+    assert graded.startswith(b'HTTP/1.1 200 ')
+    assert json.loads(graded.partition(b'\r\n\r\n')[2])['score'] == 1.5
+    assert rejected.startswith(b'HTTP/1.1 400 ')
+    assert wrong_method.startswith(b'HTTP/1.1 405 ')
+    assert json.loads(stats.partition(b'\r\n\r\n')[2]) == {'graded': 1, 'rejected': 1, 'stored': 1, 'batches': 1,
+                                                           'queued': 0}
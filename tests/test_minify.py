@@ -0,0 +1,75 @@
+import json
+import re
+
+import pytest
+
+import create_quiz_page as builder
+import quiz_bench
+import quiz_minify
+
+# snippets around the lexer's hard cases: regex vs division, template literals,
+# comments inside strings and automatic semicolon insertion
+SNIPPETS = [
+    "const a = 10, b = 2, g = 5;\nout.push(a / b / g);\nout.push('x/y'.split(/\\//).length);",
+    "const re = /[/\\]]+/g; // not a comment\nout.push('a/]b'.replace(re, '-'));",
+    "const s = 'http://example.com /* not a comment */';\nout.push(s);",
+    "const n = 3;\nout.push(`${n} ${`${n + 1}`} ${ {a: 1}.a } }`);",
+    "let i = 1\nlet j = i\n++j\nout.push(i, j)",
+    "function f() {\n  return\n  1\n}\nout.push(f() === undefined);",
+    "let x = 5\nconst y = x\n-1\nout.push(y);",
+    "const a = [1, 2]\n;[3].forEach(v => out.push(v))\nout.push(a.length)",
+    "out.push(typeof /x/ === 'object', 4 / 2 / 1);\nif (true) /y/.test('y') && out.push('regex after paren');",
+    "const o = { k: 1 }\nout.push(o.k - -1, o.k + +1);",
+]
+
+
+def _run_snippets(run_js, transform):
+    bodies = [json.dumps(transform(snippet)) for snippet in SNIPPETS]
+    return run_js(f"""
+const results = [];
+for (const body of [{', '.join(bodies)}]) {{
+    const out = [];
+    try {{
+        new Function('out', body)(out);
+        results.push(out);
+    }} catch (error) {{
+        results.push('error: ' + error.message);
+    }}
+}}
+console.log(JSON.stringify(results));
+""")
+
+
+def test_snippets_behave_the_same(run_js):
+    assert _run_snippets(run_js, quiz_minify.minify_js) == _run_snippets(run_js, lambda snippet: snippet)
+
+
+def test_minified_page_script_parses(run_js):
+    page = builder.create_html_quiz_page(dict(quiz_bench.generate_bank(120)), builder.PageOptions(minify=True, search=True))
+    script = re.search(r'<script>(.*?)</script>', page, re.S).group(1)
+    assert run_js(f"new Function({json.dumps(script)}); console.log('true');") is True
+
+
+def test_minified_sampling_matches(run_js):
+    minified = builder._template_parts(builder.PageOptions(minify=True))
+    source = ''.join(minified[::2])
+
+    def draws(script):
+        return run_js(f"""
+const duplicateGroups = new Map();
+{quiz_bench._extract_functions(script, quiz_bench.JS_FUNCTIONS)}
+const exams = [0, 1, 2].map(e => ({{ exam_id: String(e), questions: Array.from({{ length: 60 }}, (_, i) => ({{ id: i + 1 }})) }}));
+console.log(JSON.stringify(['', 'exam', 'band'].map(stratify => Array.from(buildQuiz('t', exams, 50, stratify, 42).order))));
+""")
+
+    assert draws(source) == draws(builder._PAGE_TEMPLATE)
+
+
+@pytest.mark.parametrize('css, expected', [
+    # the space before ':' is kept, since "a :hover" isn't "a:hover"
+    ('a  :hover { color: red ; }', 'a :hover{color:red}'),
+    ('/* c */ .x > .y , .z { margin: 0 auto; }', '.x>.y,.z{margin:0 auto}'),
+    ('.q::after { content: "a  ;  b" }', '.q::after{content:"a  ;  b"}'),
+])
+def test_minify_css(css, expected):
+    assert quiz_minify.minify_css(css) == expected
@@ -0,0 +1,60 @@
+import copy
+import html
+import json
+import re
+
+import create_quiz_page as builder
+
+
+def _manifest(page):
+    return json.loads(re.search(r'const quizManifest = (.*);', page).group(1))
+
+
+def test_exam_lists_are_in_the_page(bank):
+    page = builder.create_html_quiz_page(bank, builder.PageOptions(prerender=True))
+    labels = [f"{html.escape(exam['title'])} ({len(exam['questions'])} 題)" for exam in builder.prepare_exams(bank)]
+    options = re.findall(r'<option value="(\d+)">([^<]*)</option>', page)
+    assert options == [(str(index), label) for index, label in enumerate(labels)]
+    checkboxes = re.findall(r'<input type="checkbox" value="(\d+)" checked> ([^<]*)</label>', page)
+    assert checkboxes == options
+    assert json.loads(re.search(r'const quizConfig = (.*);', page).group(1))['prerendered'] is True
+
+
+def test_previews_show_the_escaped_first_question(bank):
+    bank = copy.deepcopy(bank)
+    question = next(iter(bank.values()))['questions'][0]
+    question['question_text'] = '<b>區塊鏈</b> & 共識'
+    question['options']['1'] = '<script>alert(1)</script>'
+    page = builder.create_html_quiz_page(bank, builder.PageOptions(prerender=True))
+    previews = re.search(r'<noscript><div id="exam-previews">(.*?)</div></noscript>', page, re.S).group(1)
+    sections = re.findall(r'<section class="exam-preview">(.*?)</section>', previews)
+    assert len(sections) == len(bank)
+    assert '1. &lt;b&gt;區塊鏈&lt;/b&gt; &amp; 共識 (' in sections[0]
+    assert '<li>(1) &lt;script&gt;alert(1)&lt;/script&gt;</li>' in sections[0]
+    assert '<script>alert(1)</script>' not in previews
+
+
+def test_plain_page_has_no_prerendered_markup(bank):
+    page = builder.create_html_quiz_page(bank)
+    assert 'exam-previews' not in page
+    assert '<option value="0">' not in page
+    assert 'prerendered' not in json.loads(re.search(r'const quizConfig = (.*);', page).group(1))
+
+
+def test_previews_stay_out_of_the_exam_data(bank):
+    for split in (None, 'inline', 'files'):
+        chunks = {}
+        plain = builder.create_html_quiz_page(bank, builder.PageOptions(split=split))
+        page = builder.render_page(bank, builder.PageOptions(split=split, prerender=True),
+                                   lambda entry, payload: chunks.update({entry['exam_id']: payload})).decode('utf-8')
+        assert _manifest(page) == _manifest(plain)
+        assert all('preview' not in entry for entry in _manifest(page))
+        if split == 'files':
+            assert list(chunks) == list(bank)
+            assert all('"preview"' not in payload for payload in chunks.values())
+        else:
+            chunk = r'<script type="application/json" id="exam-[^"]+">.*?</script>'
+            assert re.findall(chunk, page, re.S) == re.findall(chunk, plain, re.S)
+            data = r'const quizExamData = .*;'
+            assert re.search(data, page).group(0) == re.search(data, plain).group(0)
+            assert page[page.index('const quizSearchIndex'):] == plain[plain.index('const quizSearchIndex'):]
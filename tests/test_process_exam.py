@@ -0,0 +1,86 @@
+import pytest
+
+import create_quiz_page as builder
+
+
+def _question(number, answer=1, options=None, text='題目'):
+    return {'question_number': number, 'question_text': text, 'answer': answer,
+            'options': {'1': '甲', '2': '乙', '3': '丙', '4': '丁'} if options is None else options}
+
+
+def _errors(issues):
+    return [issue for issue in issues if issue['severity'] == 'error']
+
+
+def test_points_and_normalized_fields():
+    exam, issues = builder.process_exam('7', {'exam_number': 7, 'questions': [
+        _question(1, answer='2'), _question(41, text=''), _question(60), _question(61)]})
+    assert not issues
+    assert exam['exam_id'] == '7'
+    assert [question['points'] for question in exam['questions']] == [1.5, 2.0, 2.0, 1.5]
+    first = exam['questions'][0]
+    assert first['answer'] == 2
+    assert first['options'][0] == {'option_id': 1, 'text': '甲'}
+    assert exam['questions'][1]['text'] == builder.MISSING_QUESTION_TEXT
+
+
+def test_digit_string_numbers_are_kept_as_ints():
+    exam, issues = builder.process_exam('1', {'questions': [_question('42'), _question(' 3')]})
+    assert not issues
+    assert [(question['id'], question['points']) for question in exam['questions']] == [(42, 2.0), (3, 1.5)]
+
+
+@pytest.mark.parametrize('number', ['A1', None, True, [1]])
+def test_non_numeric_number_is_skipped_with_a_warning(number):
+    exam, issues = builder.process_exam('1', {'questions': [_question(number), _question(2)]})
+    assert [question['id'] for question in exam['questions']] == [2]
+    assert [issue['severity'] for issue in issues] == ['warning']
+    assert issues[0]['question_index'] == 0
+
+
+def test_missing_number_is_an_error():
+    question = _question(1)
+    del question['question_number']
+    _exam, issues = builder.process_exam('1', {'questions': [question]})
+    assert len(_errors(issues)) == 1
+
+
+def test_duplicate_number_is_an_error():
+    _exam, issues = builder.process_exam('1', {'questions': [_question(5), _question('5', answer=2)]})
+    errors = _errors(issues)
+    assert len(errors) == 1 and errors[0]['question_index'] == 1
+
+
+def test_dropped_question_doesnt_count_as_duplicate():
+    source_indexes = []
+    exam, issues = builder.process_exam('1', {'questions': [_question(5, options={}), _question(5), _question(6)]},
+                                        source_indexes)
+    assert not _errors(issues)
+    assert [question['id'] for question in exam['questions']] == [5, 6]
+    assert source_indexes == [1, 2]
+
+
+@pytest.mark.parametrize('question', [
+    _question(1, answer='x'),
+    _question(1, answer=9),
+    _question(1, options={'1': '甲', 'a': '乙'}),
+    'not a question',
+])
+def test_invalid_questions_are_errors(question):
+    _exam, issues = builder.process_exam('1', {'questions': [question, _question(2)]})
+    assert len(_errors(issues)) == 1
+
+
+def test_exam_without_usable_questions():
+    exam, issues = builder.process_exam('1', {'questions': [_question(1, options={})]})
+    assert exam is None
+    assert not _errors(issues)
+    with pytest.raises(builder.QuizDataError):
+        builder.prepare_exams({'1': {'questions': [_question(1, options={})]}})
+
+
+def test_create_html_quiz_page_rejects_invalid_data():
+    with pytest.raises(builder.QuizDataError) as raised:
+        builder.create_html_quiz_page({'1': {'questions': [_question(1, answer=9), _question(2)]},
+                                       '2': {'questions': [_question(1, answer='x')]}})
+    assert len(_errors(raised.value.issues)) == 2
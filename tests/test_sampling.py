@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+import create_quiz_page as builder
+import quiz_bench
+
+EXAM_SIZES = [60, 60, 45, 12]
+
+
+@pytest.fixture
+def sample(run_js):
+    """Calls page functions (see quiz_bench.JS_FUNCTIONS) on a pool of exams with EXAM_SIZES questions."""
+
+    def call(expression, duplicate_groups=()):
+        return run_js(f"""
+const duplicateGroups = new Map({json.dumps([[key, group] for key, group in duplicate_groups])});
+{quiz_bench._extract_functions(builder._PAGE_TEMPLATE, quiz_bench.JS_FUNCTIONS)}
+const exams = {json.dumps(EXAM_SIZES)}.map((size, e) => ({{
+    exam_id: String(e), questions: Array.from({{ length: size }}, (_, i) => ({{ id: i + 1 }}))
+}}));
+const quiz = (count, stratify, seed, avoid) => Array.from(buildQuiz('t', exams, count, stratify, seed, avoid).order);
+console.log(JSON.stringify({expression}));
+""")
+
+    return call
+
+
+@pytest.mark.parametrize('sizes, count', [
+    ([60, 60, 45, 12], 50), ([1, 1, 1], 2), ([5, 0, 7], 12), ([100, 1], 3), ([3, 3, 3], 7), ([40, 20], 60),
+])
+def test_quotas_sum_to_count(sample, sizes, count):
+    quotas = sample(f'allocateQuotas({json.dumps(sizes)}, {count})')
+    assert sum(quotas) == count
+    assert all(0 <= quota <= size for quota, size in zip(quotas, sizes))
+    total = sum(sizes)
+    # largest remainder: every stratum is within one question of its exact share
+    assert all(abs(quota - count * size / total) < 1 for quota, size in zip(quotas, sizes))
+
+
+@pytest.mark.parametrize('stratify', ['', 'exam', 'band'])
+def test_same_seed_same_quiz(sample, stratify):
+    first, second, other = sample(f"[quiz(40, '{stratify}', 7), quiz(40, '{stratify}', 7), quiz(40, '{stratify}', 8)]")
+    assert first == second
+    assert first != other
+    assert len(first) == 40 and len(set(first)) == 40
+    assert all(0 <= pooled < sum(EXAM_SIZES) for pooled in first)
+
+
+def test_stratified_by_exam_follows_quotas(sample):
+    order, quotas = sample("[quiz(50, 'exam', 3), allocateQuotas(" + json.dumps(EXAM_SIZES) + ", 50)]")
+    offsets = [sum(EXAM_SIZES[:e]) for e in range(len(EXAM_SIZES) + 1)]
+    per_exam = [sum(offsets[e] <= pooled < offsets[e + 1] for pooled in order) for e in range(len(EXAM_SIZES))]
+    assert per_exam == quotas
+
+
+def test_stratified_by_band(sample):
+    order = sample("quiz(30, 'band', 11)")
+    offsets = [sum(EXAM_SIZES[:e]) for e in range(len(EXAM_SIZES) + 1)]
+    numbers = [pooled - max(offset for offset in offsets if offset <= pooled) + 1 for pooled in order]
+    band_sizes = [sum(min(size, 40) for size in EXAM_SIZES), sum(max(size - 40, 0) for size in EXAM_SIZES)]
+    expected = sample(f'allocateQuotas({json.dumps(band_sizes)}, 30)')
+    assert [sum(number <= 40 for number in numbers), sum(number > 40 for number in numbers)] == expected
+
+
+def test_count_larger_than_pool(sample):
+    order = sample("quiz(1000, '', 5)")
+    assert sorted(order) == list(range(sum(EXAM_SIZES)))
+
+
+def test_avoid_duplicates_draws_one_per_group(sample):
+    groups = [('0:1', 0), ('1:1', 0), ('2:1', 0), ('0:2', 1), ('3:2', 1)]
+    order = sample("quiz(1000, '', 9, true)", groups)
+    # each group keeps exactly one of its questions
+    assert len(order) == sum(EXAM_SIZES) - 2 - 1
@@ -0,0 +1,75 @@
+import json
+import re
+
+import pytest
+
+import create_quiz_page as builder
+import quiz_bench
+
+TEXTS = [
+    '區塊鏈 Blockchain 與 ＡＰＩ 2024',
+    '金',
+    'KYC／AML：洗錢防制',
+    'ｶﾀｶﾅ と ひらがな',
+    '',
+    'e-KYC, P2P & <script>',
+]
+
+
+def _decode(encoded):
+    doc = 0
+    entries = []
+    for value in encoded:
+        doc += value >> 1
+        entries.append(doc * 2 + (value & 1))
+    return entries
+
+
+def test_search_tokens():
+    assert builder.search_tokens(TEXTS[0]) == ['區塊', '塊鏈', 'blockchain', '與', 'api', '2024']
+    assert builder.search_tokens('金') == ['金']
+
+
+def test_page_tokenizer_matches(run_js):
+    template = builder._PAGE_TEMPLATE
+    pattern = re.search(r'const SEARCH_RUN_PATTERN = .*;', template).group(0)
+    tokens = run_js(f"""
+{pattern}
+{quiz_bench._extract_functions(template, ['searchTokens'])}
+console.log(JSON.stringify({json.dumps(TEXTS, ensure_ascii=False)}.map(searchTokens)));
+""")
+    assert tokens == [builder.search_tokens(text) for text in TEXTS]
+
+
+def test_index_round_trip(bank):
+    exams = builder.prepare_exams(bank)
+    index = builder.build_search_index((len(exam['questions']), builder.exam_search_terms(exam)) for exam in exams)
+    questions = [question for exam in exams for question in exam['questions']]
+    assert index['docs'] == len(questions)
+    assert list(index['terms']) == sorted(index['terms'])
+    for token, encoded in list(index['terms'].items())[::50]:
+        entries = _decode(encoded)
+        docs = [entry >> 1 for entry in entries]
+        assert docs == sorted(set(docs))
+        for entry in entries:
+            question = questions[entry >> 1]
+            in_text = token in builder.search_tokens(question['text'])
+            assert entry & 1 == in_text
+            assert in_text or any(token in builder.search_tokens(option['text']) for option in question['options'])
+
+
+def test_search_is_opt_in(bank):
+    plain = builder.create_html_quiz_page(bank)
+    searchable = builder.create_html_quiz_page(bank, builder.PageOptions(search=True))
+    assert 'const quizSearchIndex = null;' in plain
+    assert 'const quizSearchIndex = {"docs":' in searchable
+    assert all(terms is None for _entry, _payload, terms in builder.prepare_quiz(bank).fragments)
+
+
+def test_prepared_quiz_without_terms_cant_render_search(bank):
+    prepared = builder.prepare_quiz(bank)
+    with pytest.raises(ValueError):
+        builder.render_page(prepared, builder.PageOptions(search=True))
+    searchable = builder.prepare_quiz(bank, builder.PageOptions(search=True))
+    assert builder.render_page(searchable).decode('utf-8') == builder.create_html_quiz_page(
+        bank, builder.PageOptions(search=True))
@@ -0,0 +1,102 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+
+import create_quiz_page as builder
+import quiz_server
+
+
+@pytest.fixture
+def server(bank, tmp_path):
+    source = tmp_path / 'quiz_data.json'
+    source.write_text(json.dumps(bank, ensure_ascii=False), encoding='utf-8')
+    server = quiz_server.QuizServer(source, builder.PageOptions())
+    server.load()
+    return server
+
+
+def _get(server, target, method='GET', **headers):
+    response = server.respond(method, target, {name.replace('_', '-'): value for name, value in headers.items()}, True)
+    head, _, body = response.partition(b'\r\n\r\n')
+    status_line, *lines = head.decode('latin-1').split('\r\n')
+    fields = dict(line.split(': ', 1) for line in lines)
+    return int(status_line.split()[1]), fields, body
+
+
+def test_site_matches_a_split_files_build(server, bank, tmp_path):
+    page = tmp_path / 'site' / 'index.html'
+    builder.build_quiz_page(server.source, page, builder.PageOptions(split='files', chunk_dir=quiz_server.CHUNK_DIR))
+    assert _get(server, '/')[2] == page.read_bytes()
+    for exam_id in bank:
+        chunk = page.parent / quiz_server.CHUNK_DIR / f'exam-{exam_id}.json'
+        assert _get(server, f'/{quiz_server.CHUNK_DIR}/exam-{exam_id}.json')[2] == chunk.read_bytes()
+
+
+def test_compressed_variant(server):
+    status, identity_headers, identity = _get(server, '/')
+    assert status == 200 and 'Content-Encoding' not in identity_headers
+    status, headers, body = _get(server, '/', accept_encoding='br;q=0, gzip')
+    assert headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(body) == identity
+    assert headers['ETag'] != identity_headers['ETag']
+    assert headers['Vary'] == 'Accept-Encoding'
+
+
+def test_not_modified_matches_only_the_sent_variant(server):
+    gzip_etag = _get(server, '/', accept_encoding='gzip')[1]['ETag']
+    identity_etag = _get(server, '/')[1]['ETag']
+    status, headers, body = _get(server, '/', accept_encoding='gzip', if_none_match=gzip_etag)
+    assert (status, headers['ETag'], body) == (304, gzip_etag, b'')
+    # a client holding the gzip copy that now gets the identity variant must not be told to reuse it
+    assert _get(server, '/', if_none_match=gzip_etag)[0] == 200
+    assert _get(server, '/', if_none_match=f'"other", W/{identity_etag}')[0] == 304
+    assert _get(server, '/', if_none_match='*')[0] == 304
+
+
+@pytest.mark.parametrize('header, expected', [
+    (None, {}),
+    ('gzip, deflate, br', {'gzip': 1.0, 'deflate': 1.0, 'br': 1.0}),
+    ('x-gzip;q=0.5, identity;q=0', {'gzip': 0.5, 'identity': 0.0}),
+    ('br;q=oops', {'br': 0.0}),
+])
+def test_parse_accept_encoding(header, expected):
+    assert quiz_server.parse_accept_encoding(header) == expected
+
+
+def test_errors_and_head(server):
+    assert _get(server, '/missing')[0] == 404
+    assert _get(server, '/', method='POST')[0] == 405
+    status, headers, body = _get(server, '/', method='HEAD')
+    assert status == 200 and body == b'' and int(headers['Content-Length']) > 0
+
+
+def _read(data, limit=1024, max_body=0):
+    async def run():
+        reader = asyncio.StreamReader(limit=limit)
+        reader.feed_data(data)
+        reader.feed_eof()
+        return await quiz_server.read_request(reader, max_body)
+
+    return asyncio.run(run())
+
+
+def test_read_request():
+    method, target, version, headers, body = _read(b'POST /grade HTTP/1.1\r\nContent-Length: 2\r\nX-A:  b \r\n\r\nhi',
+                                                    max_body=10)
+    assert (method, target, version, headers['x-a'], body) == ('POST', '/grade', 'HTTP/1.1', 'b', b'hi')
+    assert _read(b'') is None
+
+
+@pytest.mark.parametrize('data, status', [
+    (b'GET /' + b'a' * 4096 + b' HTTP/1.1\r\n\r\n', 400),
+    (b'GET / HTTP/1.1\r\nX-Big: ' + b'a' * 4096 + b'\r\n\r\n', 431),
+    (b'GET / HTTP/1.1\r\nContent-Length: 11\r\n\r\nhello world', 413),
+    (b'GET / HTTP/2\r\n\r\n', 400),
+    (b'GET / HTTP/1.1\r\nno colon\r\n\r\n', 400),
+])
+def test_read_request_errors(data, status):
+    with pytest.raises(quiz_server.HttpError) as raised:
+        _read(data)
+    assert raised.value.status == status
@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+import create_quiz_page as builder
+import quiz_bench
+
+
+def test_extracted_functions_must_be_self_contained():
+    with pytest.raises(ValueError, match='poolOffsets'):
+        quiz_bench._extract_functions(builder._PAGE_TEMPLATE, ['buildQuiz', 'createRandom', 'shuffleArray',
+                                                               'sampleRange', 'allocateQuotas', 'questionBand'])
+    source = quiz_bench._extract_functions(builder._PAGE_TEMPLATE, quiz_bench.JS_FUNCTIONS)
+    assert 'function poolOffsets(' in source
+
+
+def test_session_record_holds_no_question_text(bank, run_js):
+    exams = builder.prepare_exams(bank)[:2]
+    record = run_js(f"""
+const duplicateGroups = new Map();
+const sessionKey = '/quiz/index.html';
+{quiz_bench._extract_functions(builder._PAGE_TEMPLATE, [*quiz_bench.JS_FUNCTIONS, 'sessionRecord'])}
+const exams = {json.dumps(exams, ensure_ascii=False)};
+let currentQuiz = buildQuiz('綜合練習', exams, 30, 'exam', 7);
+currentQuiz.mode = 'practice';
+let currentQuestionIndex = 3;
+let userAnswers = new Array(currentQuiz.order.length).fill(null);
+userAnswers[0] = 2;
+// IndexedDB stores the structured clone of the record
+const saved = structuredClone(sessionRecord());
+const resumed = Uint32Array.from(saved.order);
+const offsets = poolOffsets(exams);
+console.log(JSON.stringify({{
+    record: {{...saved, order: Array.from(saved.order), saved_at: typeof saved.saved_at}},
+    same_order: resumed.every((pooled, i) => pooled === currentQuiz.order[i]),
+    in_range: resumed.every(pooled => pooled < offsets[exams.length]),
+}}));
+""")
+    saved = record['record']
+    assert record['same_order'] and record['in_range']
+    assert saved['page'] == '/quiz/index.html' and saved['saved_at'] == 'string'
+    assert (saved['mode'], saved['title'], saved['seed'], saved['index']) == ('practice', '綜合練習', 7, 3)
+    assert saved['exam_ids'] == [exam['exam_id'] for exam in exams]
+    assert saved['question_counts'] == [len(exam['questions']) for exam in exams]
+    assert len(saved['order']) == len(saved['answers']) == 30
+    assert saved['answers'][0] == 2
+    texts = [question['text'] for exam in exams for question in exam['questions']]
+    assert not any(text in json.dumps(saved, ensure_ascii=False) for text in texts)
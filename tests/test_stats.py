@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+import quiz_stats
+
+
+def _record(responses, mode='exam', exam_ids=('1',)):
+    return {'v': 1, 'attempt_id': 'a', 'mode': mode, 'exam_ids': list(exam_ids), 'score': 1.5, 'max_score': 3.0,
+            'responses': responses}
+
+
+GOOD = _record([['1', 1, 2, 2, 1.5], ['1', 2, None, 3, 1.5]])
+MALFORMED = [
+    '[1, 2]',
+    '"text"',
+    '42',
+    'not json',
+    json.dumps({'v': 2, 'responses': []}),
+    json.dumps(_record([['1', 1, 'x', 2, 1.5]])),
+    json.dumps(_record([['1', 1, True, 2, 1.5]])),
+    json.dumps(_record([['1', 1, 2, '2', 1.5]])),
+    json.dumps(_record([['1', 'one', 2, 2, 1.5]])),
+    json.dumps(_record([['1', 1, 2]])),
+    json.dumps({k: v for k, v in GOOD.items() if k != 'score'}),
+]
+
+
+@pytest.fixture
+def shard(tmp_path):
+    path = tmp_path / 'attempts.jsonl'
+    path.write_text('\n'.join([json.dumps(GOOD), *MALFORMED, json.dumps(GOOD)]) + '\n', encoding='utf-8')
+    return path
+
+
+def test_stats_skips_malformed_lines(shard):
+    state = quiz_stats.new_state()
+    assert quiz_stats.ingest_shard(state, shard) == 2
+    assert state['skipped_lines'] == len(MALFORMED)
+    report = quiz_stats.summarize(state)
+    assert report['attempts'] == 2
+    first = next(question for question in report['questions'] if question['question'] == 1)
+    assert first['correct_rate'] == 1.0
+
+
+def test_stats_state_round_trip(shard, tmp_path):
+    state_path = tmp_path / 'state.json'
+    quiz_stats.main([str(shard), '--state', str(state_path)])
+    quiz_stats.main([str(shard), '--state', str(state_path)])
+    state = quiz_stats.load_state(state_path)
+    assert quiz_stats.summarize(state)['attempts'] == 2
+
+
+def test_stats_partial_last_line_is_left_for_later(tmp_path):
+    path = tmp_path / 'growing.jsonl'
+    line = json.dumps(GOOD)
+    path.write_text(line + '\n' + line[:20], encoding='utf-8')
+    state = quiz_stats.new_state()
+    assert quiz_stats.ingest_shard(state, path) == 1
+    path.write_text(line + '\n' + line + '\n', encoding='utf-8')
+    assert quiz_stats.ingest_shard(state, path) == 1
+    assert state['skipped_lines'] == 0
+
@@ -0,0 +1,87 @@
+import copy
+import json
+
+import pytest
+
+import create_quiz_page as builder
+import quiz_store
+
+
+@pytest.fixture
+def store(tmp_path):
+    with quiz_store.QuizStore(tmp_path / 'bank.sqlite') as store:
+        yield store
+
+
+def _write(path, data):
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+    return path
+
+
+def test_stored_bank_renders_the_same_page(store, bank, tmp_path):
+    stats = store.import_file(_write(tmp_path / 'quiz_data.json', bank))
+    assert stats['exams'] == len(bank)
+    assert stats['questions'] == sum(len(exam['questions']) for exam in bank.values())
+    assert [exam_id for exam_id, _title, _count in store.exams()] == list(bank)
+    assert builder.create_html_quiz_page(store.query()) == builder.create_html_quiz_page(bank)
+
+
+def test_query_filters(store, bank, tmp_path):
+    store.import_file(_write(tmp_path / 'quiz_data.json', bank))
+    exam_ids = list(bank)[1:3]
+    query = store.query(exam_ids, (5, 10))
+    assert list(query) == exam_ids
+    for exam_id in exam_ids:
+        assert [q['question_number'] for q in query[exam_id]['questions']] == list(range(5, 11))
+    assert list(store.query(questions=(1000, None))) == []
+    with pytest.raises(KeyError):
+        query[list(bank)[0]]
+
+
+def test_failed_import_changes_nothing(store, bank, tmp_path):
+    store.import_file(_write(tmp_path / 'quiz_data.json', bank))
+    before = store.exams()
+    broken = copy.deepcopy(bank)
+    exam_id = list(broken)[-1]
+    broken[list(broken)[0]]['title'] = 'changed'
+    broken[exam_id]['questions'][0]['answer'] = '9'
+    with pytest.raises(builder.QuizDataError):
+        store.import_file(_write(tmp_path / 'broken.json', broken))
+    assert store.exams() == before
+
+
+def test_reimport_replaces_exams(store, bank, tmp_path):
+    source = _write(tmp_path / 'quiz_data.json', bank)
+    store.import_file(source)
+    edited = copy.deepcopy(bank)
+    exam_id = next(iter(edited))
+    del edited[exam_id]['questions'][10:]
+    store.import_file(_write(source, {exam_id: edited[exam_id]}))
+    counts = {exam_id: count for exam_id, _title, count in store.exams()}
+    assert counts[exam_id] == 10
+    assert sum(counts.values()) == sum(len(exam['questions']) for exam in edited.values())
+
+
+def test_sources_follow_their_own_question(store, tmp_path):
+    options = {'1': '甲', '2': '乙'}
+    bank = {'1': {'exam_number': 1, 'questions': [
+        {'question_number': 5, 'question_text': 'dropped', 'options': {}, 'answer': 1, 'question_sources': ['x']},
+        {'question_number': 5, 'question_text': 'kept', 'options': options, 'answer': 1,
+         'question_sources': ['a', 'b'], 'answer_sources': ['c']},
+    ]}}
+    store.import_file(_write(tmp_path / 'quiz_data.json', bank))
+    question, = store.query()['1']['questions']
+    assert (question['question_text'], question['question_sources'], question['answer_sources']) == (
+        'kept', ['a', 'b'], ['c'])
+
+
+def test_build_from_empty_query_writes_nothing(store, bank, tmp_path, capsys):
+    store.import_file(_write(tmp_path / 'quiz_data.json', bank))
+    with pytest.raises(builder.QuizDataError):
+        quiz_store.build_from_store(store.query(['missing']), None)
+    assert capsys.readouterr().out == ''
+    output = tmp_path / 'subset.html'
+    stats = quiz_store.build_from_store(store.query(list(bank)[:2]), output)
+    assert stats['exams'] == 2
+    assert output.read_text(encoding='utf-8') == builder.create_html_quiz_page(
+        {exam_id: bank[exam_id] for exam_id in list(bank)[:2]}) + '\n'
@@ -0,0 +1,57 @@
+import io
+import json
+
+import pytest
+
+import create_quiz_page as builder
+
+READ_SIZES = (1, 2, 3, 7, 64, 65536)
+
+
+def _stream(text, read_size):
+    return list(builder.iter_quiz_exams(io.StringIO(text), read_size))
+
+
+@pytest.mark.parametrize('read_size', READ_SIZES)
+def test_matches_json_load(bank, read_size):
+    text = json.dumps(bank, ensure_ascii=False, indent=2)
+    assert _stream(text, read_size) == list(json.loads(text).items())
+
+
+@pytest.mark.parametrize('read_size', range(1, 12))
+def test_values_split_across_chunks(read_size):
+    # numbers, escapes and surrogate pairs that a chunk boundary can cut in the middle
+    text = ('{"1": 1234567, "2": [1.5e3, -0.25, true, false, null], "3": "a\\"b\\\\c\\u00e9\\ud83d\\ude00",'
+            ' "4": {"x": [[], {}]}, "5": 9}')
+    assert _stream(text, read_size) == list(json.loads(text).items())
+
+
+@pytest.mark.parametrize('text', [
+    '{"1": {"a": 1}',
+    '{"1": 1 "2": 2}',
+    '{"1": 1,}',
+    '{"1": 1} x',
+    '{1: 2}',
+    '{"1" 2}',
+    '{"1": [1, 2}',
+    '{"1": tru}',
+])
+@pytest.mark.parametrize('read_size', (1, 5, 65536))
+def test_malformed_json(text, read_size):
+    with pytest.raises(json.JSONDecodeError):
+        _stream(text, read_size)
+
+
+def test_error_position_is_file_position():
+    text = '{\n "1": 1,\n "2": [1, 2,, 3]\n}'
+    with pytest.raises(json.JSONDecodeError) as stream_error:
+        _stream(text, 2)
+    with pytest.raises(json.JSONDecodeError) as load_error:
+        json.loads(text)
+    assert (stream_error.value.lineno, stream_error.value.colno) == (load_error.value.lineno, load_error.value.colno)
+
+
+@pytest.mark.parametrize('text', ['[1, 2]', '"exams"', '{}', '{"1": 1, "1": 2}'])
+def test_invalid_top_level(text):
+    with pytest.raises(ValueError):
+        _stream(text, 4)
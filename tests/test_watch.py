@@ -0,0 +1,75 @@
+import copy
+import json
+
+import pytest
+
+import create_quiz_page as builder
+import quiz_watch
+
+OPTIONS = [
+    builder.PageOptions(),
+    builder.PageOptions(search=True, encoding='compact'),
+    builder.PageOptions(split='inline', search=True),
+    builder.PageOptions(split='files', search=True),
+    builder.PageOptions(search=True, minify=True, compress=True, prerender=True),
+]
+
+
+def _edits(bank):
+    """Successive versions of bank, each a typical edit of the source file."""
+    keys = list(bank)
+    edited = copy.deepcopy(bank)
+    edited[keys[1]]['questions'][3]['question_text'] += '（修訂）'
+    yield 'text', edited
+    edited = copy.deepcopy(edited)
+    del edited[keys[2]]['questions'][-1]
+    yield 'question count', edited
+    edited = copy.deepcopy(edited)
+    question = edited[keys[1]]['questions'][0]
+    question['options'] = dict(reversed(list(question['options'].items())))
+    yield 'option order', edited
+    edited = copy.deepcopy(edited)
+    del edited[keys[0]]
+    yield 'removed exam', edited
+    edited = dict(reversed(list(edited.items())))
+    yield 'reordered', edited
+    yield 'unchanged', edited
+
+
+def _page_files(output):
+    files = {'page': output.read_bytes()}
+    chunk_dir = output.parent / 'quiz-data'
+    if chunk_dir.is_dir():
+        files.update({path.name: path.read_bytes() for path in chunk_dir.iterdir()})
+    return files
+
+
+@pytest.mark.parametrize('options', OPTIONS, ids=lambda options: repr(options)[12:60])
+def test_rebuild_matches_clean_build(bank, tmp_path, options):
+    source = tmp_path / 'quiz_data.json'
+    watched = tmp_path / 'watched' / 'index.html'
+    page = quiz_watch.IncrementalPage(options)
+    for step, (name, version) in enumerate([('initial', bank), *_edits(bank)]):
+        # a fresh directory, so chunk files a rebuild should have deleted show up as a difference
+        clean = tmp_path / f'clean-{step}' / 'index.html'
+        source.write_text(json.dumps(version, ensure_ascii=False), encoding='utf-8')
+        changed, removed, _seconds = quiz_watch.rebuild(page, source, watched)
+        if name == 'unchanged':
+            assert not changed and not removed
+        builder.build_quiz_page(source, clean, options)
+        assert _page_files(watched) == _page_files(clean), name
+
+
+def test_invalid_edit_keeps_previous_page(bank, tmp_path):
+    source = tmp_path / 'quiz_data.json'
+    output = tmp_path / 'index.html'
+    page = quiz_watch.IncrementalPage(builder.PageOptions())
+    source.write_text(json.dumps(bank, ensure_ascii=False), encoding='utf-8')
+    quiz_watch.rebuild(page, source, output)
+    before = output.read_bytes()
+    broken = copy.deepcopy(bank)
+    broken[next(iter(broken))]['questions'][0]['answer'] = '9'
+    source.write_text(json.dumps(broken, ensure_ascii=False), encoding='utf-8')
+    with pytest.raises(builder.QuizDataError):
+        quiz_watch.rebuild(page, source, output)
+    assert output.read_bytes() == before